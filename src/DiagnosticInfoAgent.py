@@ -4,17 +4,23 @@ Handles lab test and diagnostic information queries using Pandas DataFrame
 Based on Week 5B implementation
 """
 
+import json
 import os
 import pandas as pd
 import httpx
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, AsyncIterator
 
 from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
 from langchain_openai import ChatOpenAI
 from langchain.agents.agent_types import AgentType
 from langchain_core.prompts import SystemMessagePromptTemplate, ChatPromptTemplate
 
+from src.agent_callbacks import MetricsCallbackHandler, TracingCallbackHandler
+from src.chat_stream import stream_agent_events, stream_cached
 from src.constants import MODEL_NAME, OPENAI_API_KEY
+from src.metrics import track_agent_query
+from src.response_cache import get_response_cache
+from src.session_store import with_context
 
 
 class DiagnosticInfoAgent:
@@ -75,7 +81,8 @@ class DiagnosticInfoAgent:
                 temperature=0,
                 model=self.model_name,
                 max_tokens=500,
-                http_client=httpx.Client(verify=False)
+                http_client=httpx.Client(verify=False),
+                http_async_client=httpx.AsyncClient(verify=False)
             )
 
             # Create system message with detailed instructions
@@ -118,18 +125,31 @@ class DiagnosticInfoAgent:
                 agent_type=AgentType.OPENAI_FUNCTIONS
             )
 
+            # Passed on every run: metrics (LLM latency, round-trips, tokens, pandas time)
+            # and structured step traces (see /debug/traces)
+            self.run_config = {
+                "callbacks": [MetricsCallbackHandler("diagnostic"), TracingCallbackHandler("diagnostic")]
+            }
+
             print("✅ Diagnostic Info Agent initialized successfully")
 
         except Exception as e:
             print(f"❌ Error setting up agent: {e}")
             raise
 
-    def query(self, user_input: str) -> Dict[str, Any]:
+    def _invoke(self, user_input: str) -> str:
+        """Run the pandas agent and extract its output text"""
+        result = self.agent.invoke(user_input, config=self.run_config)
+        # Extract output (different structure than SQL agent)
+        return result.get("output", str(result)) if isinstance(result, dict) else str(result)
+
+    def query(self, user_input: str, context: str = "") -> Dict[str, Any]:
         """
         Process user query about diagnostic tests and lab information
 
         Args:
             user_input: User's natural language query
+            context: Compact conversation context (see src.session_store.format_context)
 
         Returns:
             Dict containing response and metadata
@@ -142,18 +162,78 @@ class DiagnosticInfoAgent:
                     "output": None
                 }
 
-            # Invoke agent
-            result = self.agent.invoke(user_input)
-
-            # Extract output (different structure than SQL agent)
-            output = result.get("output", str(result)) if isinstance(result, dict) else str(result)
+            # Invoke agent; answers are cached under the bare question until the
+            # CSV changes. Follow-ups asked with context bypass the cache
+            with track_agent_query("diagnostic") as scope:
+                cache = get_response_cache()
+                output, cache_hit = cache.get_or_compute(
+                    f"diagnostic:{self.model_name}",
+                    user_input,
+                    lambda: self._invoke(with_context(user_input, context)),
+                    version=cache.data_version(self.diagnostic_csv_path),
+                    cacheable=not context
+                )
+                scope.cache = "hit" if cache_hit is not None else "miss"
 
             return {
                 "success": True,
                 "output": output,
+                "input": user_input,
+                "cached": cache_hit is not None
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "output": None,
                 "input": user_input
             }
 
+    async def aquery(self, user_input: str, context: str = "") -> Dict[str, Any]:
+        """
+        Async query(): awaits the pandas agent's ainvoke; its Python REPL tool
+        runs on the loop's (bounded) default executor
+
+        Args:
+            user_input: User's natural language query
+            context: Compact conversation context (see src.session_store.format_context)
+
+        Returns:
+            Dict containing response and metadata
+        """
+        try:
+            if not user_input or not user_input.strip():
+                return {
+                    "success": False,
+                    "error": "Query cannot be empty",
+                    "output": None
+                }
+
+            agent_input = with_context(user_input, context)
+
+            async def compute():
+                result = await self.agent.ainvoke(agent_input, config=self.run_config)
+                return result.get("output", str(result)) if isinstance(result, dict) else str(result)
+
+            with track_agent_query("diagnostic") as scope:
+                cache = get_response_cache()
+                output, cache_hit = await cache.aget_or_compute(
+                    f"diagnostic:{self.model_name}",
+                    user_input,
+                    compute,
+                    version=cache.data_version(self.diagnostic_csv_path),
+                    cacheable=not context
+                )
+                scope.cache = "hit" if cache_hit is not None else "miss"
+
+            return {
+                "success": True,
+                "output": output,
+                "input": user_input,
+                "cached": cache_hit is not None
+            }
+
         except Exception as e:
             return {
                 "success": False,
@@ -162,17 +242,128 @@ class DiagnosticInfoAgent:
                 "input": user_input
             }
 
-    def get_lab_test_info(self, test_name: str) -> Dict[str, Any]:
+    async def astream(self, user_input: str, context: str = "") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming aquery(): yields the pandas agent's Python tool steps,
+        answer token deltas and a final event as they are produced
+
+        Args:
+            user_input: User's natural language query
+            context: Compact conversation context (see src.session_store.format_context)
+
+        Yields:
+            Event dicts from src.chat_stream
+        """
+        cache = get_response_cache()
+        with track_agent_query("diagnostic") as scope:
+            async for event in stream_cached(
+                cache,
+                f"diagnostic:{self.model_name}",
+                user_input,
+                cache.data_version(self.diagnostic_csv_path),
+                lambda: stream_agent_events(self.agent, {"input": with_context(user_input, context)}, self.run_config),
+                cacheable=not context
+            ):
+                if event["event"] == "final" and event.get("cached"):
+                    scope.cache = "hit"
+                yield event
+
+    def narrate(self, question: str, facts: Any) -> Dict[str, Any]:
+        """
+        Answer a question in prose from precomputed catalog facts
+
+        The facts go straight into the prompt, so no pandas code is generated
+        or executed
+
+        Args:
+            question: What the summary should cover
+            facts: JSON-serializable data to summarize
+
+        Returns:
+            Dict containing response and metadata
+        """
+        try:
+            with track_agent_query("diagnostic"):
+                result = self.llm.invoke(self._narrative_prompt(question, facts), config=self.run_config)
+            return {
+                "success": True,
+                "output": getattr(result, "content", str(result)),
+                "input": question
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "output": None,
+                "input": question
+            }
+
+    async def anarrate(self, question: str, facts: Any) -> Dict[str, Any]:
+        """Async narrate()"""
+        try:
+            with track_agent_query("diagnostic"):
+                result = await self.llm.ainvoke(self._narrative_prompt(question, facts), config=self.run_config)
+            return {
+                "success": True,
+                "output": getattr(result, "content", str(result)),
+                "input": question
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "output": None,
+                "input": question
+            }
+
+    @staticmethod
+    def _narrative_prompt(question: str, facts: Any) -> str:
+        return (
+            "You are a healthcare assistant. Using only the lab test data below, "
+            f"{question}\n\nData:\n{json.dumps(facts, default=str)}"
+        )
+
+    async def aget_lab_test_info(self, test_name: str, details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Async get_lab_test_info()"""
+        if details is not None:
+            return await self.anarrate(
+                f"summarize the {test_name} test: how to prepare, which packages include it "
+                "and where it is offered.",
+                details
+            )
+        return await self.aquery(f"Tell me about the {test_name} test. What hospitals offer it and what's the price?")
+
+    async def aget_health_screening_packages(self, packages: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Async get_health_screening_packages()"""
+        if packages is not None:
+            return await self.anarrate(
+                "describe the available health screening packages and what each covers.",
+                packages
+            )
+        return await self.aquery("What health screening packages are available? List the comprehensive ones.")
+
+    def get_lab_test_info(self, test_name: str, details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Get information about a specific lab test
 
         Args:
             test_name: Name of the lab test
+            details: Catalog details for the test; when given, they are
+                summarized instead of querying the dataframe
 
         Returns:
             Dict with test information
         """
         try:
+            if details is not None:
+                return self.narrate(
+                    f"summarize the {test_name} test: how to prepare, which packages include it "
+                    "and where it is offered.",
+                    details
+                )
+
             query = f"Tell me about the {test_name} test. What hospitals offer it and what's the price?"
             return self.query(query)
 
@@ -225,14 +416,24 @@ class DiagnosticInfoAgent:
                 "output": None
             }
 
-    def get_health_screening_packages(self) -> Dict[str, Any]:
+    def get_health_screening_packages(self, packages: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Get available health screening packages
 
+        Args:
+            packages: Catalog package list; when given, it is summarized
+                instead of querying the dataframe
+
         Returns:
             Dict with package information
         """
         try:
+            if packages is not None:
+                return self.narrate(
+                    "describe the available health screening packages and what each covers.",
+                    packages
+                )
+
             query = "What health screening packages are available? List the comprehensive ones."
             return self.query(query)
 
@@ -4,24 +4,78 @@ Handles doctor appointment queries and booking using SQL database
 Based on Week 4 implementation
 """
 
-import os
-import sqlite3
-import pandas as pd
-from typing import Optional, Dict, Any
-
-from langchain.agents import AgentExecutor, create_openai_tools_agent
-from langchain_community.agent_toolkits import SQLDatabaseToolkit
-from langchain_community.agent_toolkits.sql.prompt import SQL_FUNCTIONS_SUFFIX
-from langchain_community.utilities import SQLDatabase
-from langchain_core.messages import AIMessage
-from langchain_core.prompts.chat import (
-    ChatPromptTemplate,
-    HumanMessagePromptTemplate,
-    MessagesPlaceholder,
-)
+import re
+from typing import Optional, Dict, Any, AsyncIterator, List
+
+from langchain_core.tools import StructuredTool
 from langchain_openai import ChatOpenAI
 
-from src.constants import MODEL_NAME, OPENAI_API_KEY
+from src.agent_callbacks import MetricsCallbackHandler, TracingCallbackHandler
+from src.booking import BookingEngine, BookingError
+from src.chat_stream import stream_agent_events, stream_cached
+from src.concurrency import run_blocking
+from src.constants import MODEL_NAME, OPENAI_API_KEY, SQL_FAST_PATH_ENABLED
+from src.ingestion import DOCTORS_TABLE, SLOTS_TABLE, ingest_doctor_data
+from src.metrics import track_agent_query
+from src.response_cache import get_response_cache
+from src.session_store import with_context
+from src.sql_agent import SQLFastPath, build_sql_agent, connect_database
+
+# Requests that change the slots table through the SQL agent
+_WRITE_INTENT = re.compile(r"\b(book|cancel|reschedule|reserve)\b", re.IGNORECASE)
+
+# Query rules shared by the agent and the direct-SQL fast path
+_QUERY_RULES = "Use LIKE operator with lowercase when matching a name.\n"
+
+_BOOKING_RULES = (
+    "The database is read-only. To book a slot, find its id with sql_db_query and call book_appointment "
+    "with the patient's name and email; if the user has not given them, ask for them instead of booking. "
+    "To cancel, call cancel_appointment with the confirmation ID. Always give the user the confirmation ID, "
+    "and report the slot as taken if booking fails.\n"
+)
+
+
+def _booking_tools(booking_engine: BookingEngine) -> List[StructuredTool]:
+    """
+    book_appointment / cancel_appointment tools backed by the booking engine,
+    so chat bookings get an appointments row and a confirmation ID like the API's
+    """
+
+    def book_appointment(
+        slot_id: int,
+        patient_name: str,
+        patient_email: str,
+        patient_phone: Optional[str] = None,
+        reason: Optional[str] = None
+    ) -> str:
+        """Book an available slot (slots.id) for a patient. Returns the confirmation ID."""
+        try:
+            booked = booking_engine.book(
+                slot_id, patient_name, patient_email, patient_phone=patient_phone, reason=reason
+            )
+        except BookingError as e:
+            return f"Booking failed: {e}"
+        return (f"Booked slot {slot_id} at {booked['slot_datetime']} for {patient_name}. "
+                f"Confirmation ID: {booked['confirmation_id']}")
+
+    def cancel_appointment(confirmation_id: str) -> str:
+        """Cancel a booked appointment by its confirmation ID and release the slot."""
+        try:
+            cancelled = booking_engine.cancel(confirmation_id.strip())
+        except BookingError as e:
+            return f"Cancellation failed: {e}"
+        return f"Cancelled appointment {confirmation_id}; slot {cancelled['slot_id']} is available again"
+
+    async def abook_appointment(**kwargs: Any) -> str:
+        return await run_blocking(book_appointment, **kwargs)
+
+    async def acancel_appointment(**kwargs: Any) -> str:
+        return await run_blocking(cancel_appointment, **kwargs)
+
+    return [
+        StructuredTool.from_function(book_appointment, coroutine=abook_appointment),
+        StructuredTool.from_function(cancel_appointment, coroutine=acancel_appointment),
+    ]
 
 
 class DoctorInfoAgent:
@@ -41,7 +95,8 @@ class DoctorInfoAgent:
         slots_csv_path: str = "data/doctors_slots_data.csv",
         db_path: str = "src/appointments.db",
         model_name: str = MODEL_NAME,
-        api_key: str = OPENAI_API_KEY
+        api_key: str = OPENAI_API_KEY,
+        booking_engine: Optional[BookingEngine] = None
     ):
         """
         Initialize Doctor Info Agent
@@ -52,61 +107,28 @@ class DoctorInfoAgent:
             db_path: Path to SQLite database
             model_name: OpenAI model name
             api_key: OpenAI API key
+            booking_engine: Shared booking engine on db_path (one is created if omitted)
         """
         self.doctors_csv_path = doctors_csv_path
         self.slots_csv_path = slots_csv_path
         self.db_path = db_path
         self.model_name = model_name
         self.api_key = api_key
+        self.booking_engine = booking_engine
 
         # Initialize database and agent
         self._setup_database()
         self._setup_agent()
 
     def _setup_database(self):
-        """Setup SQLite database with doctors and slots tables"""
+        """Setup SQLite database with doctors and slots tables (incremental ingest)"""
         try:
-            # Create database connection
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Create doctors table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS doctors (
-                id INTEGER,
-                name TEXT NOT NULL,
-                specialization TEXT NOT NULL,
-                contact TEXT NOT NULL
-            )
-            """)
-
-            # Create slots table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS slots (
-                id INTEGER,
-                doctor_id INTEGER NOT NULL,
-                datetime TEXT NOT NULL,
-                is_available BOOLEAN NOT NULL
-            )
-            """)
-
-            # Load and insert data if CSV files exist
-            if os.path.exists(self.doctors_csv_path):
-                df_doctors = pd.read_csv(self.doctors_csv_path)
-                df_doctors.to_sql("doctors", conn, if_exists="replace", index=False)
-                print(f"✅ Loaded {len(df_doctors)} doctors into database")
-            else:
-                print(f"⚠️ Doctors CSV not found: {self.doctors_csv_path}")
-
-            if os.path.exists(self.slots_csv_path):
-                df_slots = pd.read_csv(self.slots_csv_path)
-                df_slots.to_sql("slots", conn, if_exists="replace", index=False)
-                print(f"✅ Loaded {len(df_slots)} appointment slots into database")
-            else:
-                print(f"⚠️ Slots CSV not found: {self.slots_csv_path}")
-
-            conn.commit()
-            conn.close()
+            # Reload only the CSVs that changed; bookings in `slots` survive restarts
+            ingest_doctor_data(self.doctors_csv_path, self.slots_csv_path, self.db_path)
+            if self.booking_engine is None:
+                self.booking_engine = BookingEngine(self.db_path, self.doctors_csv_path, self.slots_csv_path)
+            elif self.booking_engine.db_path != self.db_path:
+                raise ValueError(f"Booking engine writes to {self.booking_engine.db_path}, not {self.db_path}")
 
             print(f"✅ Database setup complete: {self.db_path}")
 
@@ -115,7 +137,7 @@ class DoctorInfoAgent:
             raise
 
     def _setup_agent(self):
-        """Setup LangChain SQL agent for querying database"""
+        """Setup LangChain SQL agent and the direct-SQL fast path for read-only questions"""
         try:
             # Initialize OpenAI LLM
             self.llm = ChatOpenAI(
@@ -124,53 +146,49 @@ class DoctorInfoAgent:
                 openai_api_key=self.api_key
             )
 
-            # Connect to database via LangChain
-            self.db = SQLDatabase.from_uri(f"sqlite:///{self.db_path}")
-
-            # Create SQL Toolkit
-            self.toolkit = SQLDatabaseToolkit(db=self.db, llm=self.llm)
-
-            # Get context and tools
-            context = self.toolkit.get_context()
-            tools = self.toolkit.get_tools()
-
-            # Define prompt messages
-            messages = [
-                HumanMessagePromptTemplate.from_template("{input}"),
-                AIMessage(
-                    content=SQL_FUNCTIONS_SUFFIX +
-                    "\nUse LIKE operator with lowercase when matching a name.\n"
-                    "When a user requests to book slots, delete the corresponding row from the table.\n"
-                ),
-                MessagesPlaceholder(variable_name="agent_scratchpad")
-            ]
-
-            # Create prompt template
-            prompt = ChatPromptTemplate.from_messages(messages)
-            prompt = prompt.partial(**context)
-
-            # Create agent
-            agent = create_openai_tools_agent(self.llm, tools, prompt)
-
-            # Create agent executor
-            self.agent_executor = AgentExecutor(
-                agent=agent,
-                tools=tools,
-                verbose=True
+            # Connect to database via LangChain (only the tables questions are about)
+            self.db = connect_database(self.db_path, [DOCTORS_TABLE.name, SLOTS_TABLE.name])
+
+            # Schema and sample rows computed once and embedded in the prompts, so
+            # no query spends round-trips listing tables or fetching schemas
+            self.schema = self.db.get_table_info()
+
+            # Budgeted tool-calling agent: bookings, and reads the fast path can't answer.
+            # Its SQL connection is read-only; bookings go through the booking engine
+            self.agent_executor = build_sql_agent(
+                self.llm, self.db, self.schema, _QUERY_RULES + _BOOKING_RULES,
+                extra_tools=_booking_tools(self.booking_engine)
             )
 
+            # Reads: one call writes a validated SELECT, one phrases its rows
+            self.fast_path = SQLFastPath(
+                "doctor", self.llm, self.db, self.db_path, self.schema, self.agent_executor, _QUERY_RULES
+            )
+            self.read_runnable = self.fast_path.runnable if SQL_FAST_PATH_ENABLED else self.agent_executor
+
+            # Passed on every run: metrics (LLM latency, round-trips, tokens, SQL time)
+            # and structured step traces (see /debug/traces)
+            self.run_config = {
+                "callbacks": [MetricsCallbackHandler("doctor"), TracingCallbackHandler("doctor")]
+            }
+
             print("✅ Doctor Info Agent initialized successfully")
 
         except Exception as e:
             print(f"❌ Error setting up agent: {e}")
             raise
 
-    def query(self, user_input: str) -> Dict[str, Any]:
+    def _runnable(self, writes: bool) -> Any:
+        """The agent loop for bookings and cancellations, otherwise the read path"""
+        return self.agent_executor if writes else self.read_runnable
+
+    def query(self, user_input: str, context: str = "") -> Dict[str, Any]:
         """
         Process user query about doctors or appointments
 
         Args:
             user_input: User's natural language query
+            context: Compact conversation context (see src.session_store.format_context)
 
         Returns:
             Dict containing response and metadata
@@ -183,15 +201,93 @@ class DoctorInfoAgent:
                     "output": None
                 }
 
-            # Invoke agent
-            result = self.agent_executor.invoke({"input": user_input})
+            # Invoke agent; repeated and near-identical questions against unchanged
+            # data are answered from the shared response cache, keyed on the bare
+            # question. A follow-up's answer depends on the conversation, so
+            # questions asked with context bypass the cache
+            with track_agent_query("doctor") as scope:
+                cache = get_response_cache()
+                # Never replay a booking or cancellation confirmation
+                writes = bool(_WRITE_INTENT.search(user_input))
+                output, cache_hit = cache.get_or_compute(
+                    f"doctor:{self.model_name}",
+                    user_input,
+                    lambda: self._runnable(writes).invoke(
+                        {"input": with_context(user_input, context)}, config=self.run_config
+                    ).get("output", "No response generated"),
+                    version=cache.data_version(self.db_path),
+                    cacheable=not writes and not context
+                )
+                scope.cache = "hit" if cache_hit is not None else "miss"
+                if writes:
+                    # The booking tools may have updated slots
+                    cache.bump(self.db_path)
 
             return {
                 "success": True,
-                "output": result.get("output", "No response generated"),
+                "output": output,
+                "input": user_input,
+                "cached": cache_hit is not None
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "output": None,
                 "input": user_input
             }
 
+    async def aquery(self, user_input: str, context: str = "") -> Dict[str, Any]:
+        """
+        Async query(): awaits the agent's ainvoke so the event loop keeps
+        serving other requests during the OpenAI round-trips; the sync SQL
+        tools run on the loop's (bounded) default executor
+
+        Args:
+            user_input: User's natural language query about doctors or appointments
+            context: Compact conversation context (see src.session_store.format_context)
+
+        Returns:
+            Dict containing response and metadata
+        """
+        try:
+            if not user_input or not user_input.strip():
+                return {
+                    "success": False,
+                    "error": "Query cannot be empty",
+                    "output": None
+                }
+
+            # Never replay a booking or cancellation confirmation, nor an answer
+            # that depended on the conversation so far
+            writes = bool(_WRITE_INTENT.search(user_input))
+            agent_input = with_context(user_input, context)
+
+            async def compute():
+                result = await self._runnable(writes).ainvoke({"input": agent_input}, config=self.run_config)
+                return result.get("output", "No response generated")
+
+            with track_agent_query("doctor") as scope:
+                cache = get_response_cache()
+                output, cache_hit = await cache.aget_or_compute(
+                    f"doctor:{self.model_name}",
+                    user_input,
+                    compute,
+                    version=cache.data_version(self.db_path),
+                    cacheable=not writes and not context
+                )
+                scope.cache = "hit" if cache_hit is not None else "miss"
+                if writes:
+                    cache.bump(self.db_path)
+
+            return {
+                "success": True,
+                "output": output,
+                "input": user_input,
+                "cached": cache_hit is not None
+            }
+
         except Exception as e:
             return {
                 "success": False,
@@ -200,6 +296,36 @@ class DoctorInfoAgent:
                 "input": user_input
             }
 
+    async def astream(self, user_input: str, context: str = "") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming aquery(): yields tool steps (SQL executed, rows returned),
+        answer token deltas and a final event as the agent produces them
+
+        Args:
+            user_input: User's natural language query about doctors or appointments
+            context: Compact conversation context (see src.session_store.format_context)
+
+        Yields:
+            Event dicts from src.chat_stream
+        """
+        cache = get_response_cache()
+        writes = bool(_WRITE_INTENT.search(user_input))
+        agent_input = with_context(user_input, context)
+        with track_agent_query("doctor") as scope:
+            async for event in stream_cached(
+                cache,
+                f"doctor:{self.model_name}",
+                user_input,
+                cache.data_version(self.db_path),
+                lambda: stream_agent_events(self._runnable(writes), {"input": agent_input}, self.run_config),
+                cacheable=not writes and not context
+            ):
+                if event["event"] == "final" and event.get("cached"):
+                    scope.cache = "hit"
+                yield event
+        if writes:
+            cache.bump(self.db_path)
+
     def get_available_doctors(self, specialization: Optional[str] = None) -> Dict[str, Any]:
         """
         Get list of available doctors
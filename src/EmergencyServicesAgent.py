@@ -4,24 +4,25 @@ Handles emergency service queries using SQL database
 Based on Week 5A implementation
 """
 
-import os
-import sqlite3
-import pandas as pd
-from typing import Optional, Dict, Any
-
-from langchain.agents import AgentExecutor, create_openai_tools_agent
-from langchain_community.agent_toolkits import SQLDatabaseToolkit
-from langchain_community.agent_toolkits.sql.prompt import SQL_FUNCTIONS_SUFFIX
-from langchain_community.utilities import SQLDatabase
-from langchain_core.messages import AIMessage
-from langchain_core.prompts.chat import (
-    ChatPromptTemplate,
-    HumanMessagePromptTemplate,
-    MessagesPlaceholder,
-)
+from typing import Optional, Dict, Any, AsyncIterator
+
 from langchain_openai import ChatOpenAI
 
-from src.constants import MODEL_NAME, OPENAI_API_KEY
+from src.agent_callbacks import MetricsCallbackHandler, TracingCallbackHandler
+from src.chat_stream import stream_agent_events, stream_cached
+from src.constants import MODEL_NAME, OPENAI_API_KEY, SQL_FAST_PATH_ENABLED
+from src.ingestion import EMERGENCY_DIRECTORY_TABLE, ingest_emergency_data
+from src.metrics import track_agent_query
+from src.response_cache import get_response_cache
+from src.session_store import with_context
+from src.sql_agent import SQLFastPath, build_sql_agent, connect_database
+
+# Query rules shared by the agent and the direct-SQL fast path
+_QUERY_RULES = (
+    "Use LIKE operator when matching zip codes or hospital names.\n"
+    "Focus on finding nearest emergency services based on zip code.\n"
+    "Prioritize hospitals with ambulance availability.\n"
+)
 
 
 class EmergencyServicesAgent:
@@ -61,32 +62,10 @@ class EmergencyServicesAgent:
         self._setup_agent()
 
     def _setup_database(self):
-        """Setup SQLite database with emergency directory table"""
+        """Setup SQLite database with emergency directory table (incremental ingest)"""
         try:
-            # Create database connection
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Create emergency_directory table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS emergency_directory (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                zip_code TEXT NOT NULL,
-                hospital_name TEXT NOT NULL,
-                ambulance_available TEXT NOT NULL
-            )
-            """)
-
-            # Load and insert data if CSV exists
-            if os.path.exists(self.emergency_csv_path):
-                df = pd.read_csv(self.emergency_csv_path)
-                df.to_sql("emergency_directory", conn, if_exists="replace", index=False)
-                print(f"✅ Loaded {len(df)} emergency records into database")
-            else:
-                print(f"⚠️ Emergency CSV not found: {self.emergency_csv_path}")
-
-            conn.commit()
-            conn.close()
+            # Reload only when the CSV changed since the last ingest
+            ingest_emergency_data(self.emergency_csv_path, self.db_path)
 
             print(f"✅ Emergency database setup complete: {self.db_path}")
 
@@ -95,7 +74,7 @@ class EmergencyServicesAgent:
             raise
 
     def _setup_agent(self):
-        """Setup LangChain SQL agent for querying emergency database"""
+        """Setup LangChain SQL agent and the direct-SQL fast path for querying emergency database"""
         try:
             # Initialize OpenAI LLM
             self.llm = ChatOpenAI(
@@ -104,41 +83,27 @@ class EmergencyServicesAgent:
                 openai_api_key=self.api_key
             )
 
-            # Connect to database via LangChain
-            self.db = SQLDatabase.from_uri(f"sqlite:///{self.db_path}")
-
-            # Create SQL Toolkit
-            self.toolkit = SQLDatabaseToolkit(db=self.db, llm=self.llm)
-
-            # Get context and tools
-            context = self.toolkit.get_context()
-            tools = self.toolkit.get_tools()
-
-            # Define prompt messages
-            messages = [
-                HumanMessagePromptTemplate.from_template("{input}"),
-                AIMessage(
-                    content=SQL_FUNCTIONS_SUFFIX +
-                    "\nUse LIKE operator when matching zip codes or hospital names.\n"
-                    "Focus on finding nearest emergency services based on zip code.\n"
-                    "Prioritize hospitals with ambulance availability.\n"
-                ),
-                MessagesPlaceholder(variable_name="agent_scratchpad")
-            ]
+            # Connect to database via LangChain (only the emergency directory)
+            self.db = connect_database(self.db_path, [EMERGENCY_DIRECTORY_TABLE.name])
 
-            # Create prompt template
-            prompt = ChatPromptTemplate.from_messages(messages)
-            prompt = prompt.partial(**context)
+            # Schema and sample rows computed once and embedded in the prompts, so
+            # no query spends round-trips listing tables or fetching schemas
+            self.schema = self.db.get_table_info()
 
-            # Create agent
-            agent = create_openai_tools_agent(self.llm, tools, prompt)
+            # Budgeted tool-calling agent for questions the fast path can't answer
+            self.agent_executor = build_sql_agent(self.llm, self.db, self.schema, _QUERY_RULES)
 
-            # Create agent executor
-            self.agent_executor = AgentExecutor(
-                agent=agent,
-                tools=tools,
-                verbose=True
+            # One call writes a validated SELECT, one phrases its rows
+            self.fast_path = SQLFastPath(
+                "emergency", self.llm, self.db, self.db_path, self.schema, self.agent_executor, _QUERY_RULES
             )
+            self.read_runnable = self.fast_path.runnable if SQL_FAST_PATH_ENABLED else self.agent_executor
+
+            # Passed on every run: metrics (LLM latency, round-trips, tokens, SQL time)
+            # and structured step traces (see /debug/traces)
+            self.run_config = {
+                "callbacks": [MetricsCallbackHandler("emergency"), TracingCallbackHandler("emergency")]
+            }
 
             print("✅ Emergency Services Agent initialized successfully")
 
@@ -146,12 +111,13 @@ class EmergencyServicesAgent:
             print(f"❌ Error setting up agent: {e}")
             raise
 
-    def query(self, user_input: str) -> Dict[str, Any]:
+    def query(self, user_input: str, context: str = "") -> Dict[str, Any]:
         """
         Process user query about emergency services
 
         Args:
             user_input: User's natural language query
+            context: Compact conversation context (see src.session_store.format_context)
 
         Returns:
             Dict containing response and metadata
@@ -164,15 +130,83 @@ class EmergencyServicesAgent:
                     "output": None
                 }
 
-            # Invoke agent
-            result = self.agent_executor.invoke({"input": user_input})
+            # Invoke agent; repeated and near-identical questions against unchanged
+            # data are answered from the shared response cache, keyed on the bare
+            # question. A follow-up's answer depends on the conversation, so
+            # questions asked with context bypass the cache
+            with track_agent_query("emergency") as scope:
+                cache = get_response_cache()
+                output, cache_hit = cache.get_or_compute(
+                    f"emergency:{self.model_name}",
+                    user_input,
+                    lambda: self.read_runnable.invoke(
+                        {"input": with_context(user_input, context)}, config=self.run_config
+                    ).get("output", "No response generated"),
+                    version=cache.data_version(self.db_path),
+                    cacheable=not context
+                )
+                scope.cache = "hit" if cache_hit is not None else "miss"
 
             return {
                 "success": True,
-                "output": result.get("output", "No response generated"),
+                "output": output,
+                "input": user_input,
+                "cached": cache_hit is not None
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "output": None,
                 "input": user_input
             }
 
+    async def aquery(self, user_input: str, context: str = "") -> Dict[str, Any]:
+        """
+        Async query(): awaits the agent's ainvoke so the event loop keeps
+        serving other requests during the OpenAI round-trips; the sync SQL
+        tools run on the loop's (bounded) default executor
+
+        Args:
+            user_input: User's natural language query about emergency services
+            context: Compact conversation context (see src.session_store.format_context)
+
+        Returns:
+            Dict containing response and metadata
+        """
+        try:
+            if not user_input or not user_input.strip():
+                return {
+                    "success": False,
+                    "error": "Query cannot be empty",
+                    "output": None
+                }
+
+            agent_input = with_context(user_input, context)
+
+            async def compute():
+                result = await self.read_runnable.ainvoke({"input": agent_input}, config=self.run_config)
+                return result.get("output", "No response generated")
+
+            with track_agent_query("emergency") as scope:
+                cache = get_response_cache()
+                output, cache_hit = await cache.aget_or_compute(
+                    f"emergency:{self.model_name}",
+                    user_input,
+                    compute,
+                    version=cache.data_version(self.db_path),
+                    cacheable=not context
+                )
+                scope.cache = "hit" if cache_hit is not None else "miss"
+
+            return {
+                "success": True,
+                "output": output,
+                "input": user_input,
+                "cached": cache_hit is not None
+            }
+
         except Exception as e:
             return {
                 "success": False,
@@ -181,6 +215,32 @@ class EmergencyServicesAgent:
                 "input": user_input
             }
 
+    async def astream(self, user_input: str, context: str = "") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming aquery(): yields tool steps (SQL executed, rows returned),
+        answer token deltas and a final event as the agent produces them
+
+        Args:
+            user_input: User's natural language query about emergency services
+            context: Compact conversation context (see src.session_store.format_context)
+
+        Yields:
+            Event dicts from src.chat_stream
+        """
+        cache = get_response_cache()
+        with track_agent_query("emergency") as scope:
+            async for event in stream_cached(
+                cache,
+                f"emergency:{self.model_name}",
+                user_input,
+                cache.data_version(self.db_path),
+                lambda: stream_agent_events(self.read_runnable, {"input": with_context(user_input, context)}, self.run_config),
+                cacheable=not context
+            ):
+                if event["event"] == "final" and event.get("cached"):
+                    scope.cache = "hit"
+                yield event
+
     def find_emergency_services(self, zip_code: str) -> Dict[str, Any]:
         """
         Find emergency services in a specific zip code
@@ -227,19 +287,50 @@ class EmergencyServicesAgent:
                 "output": None
             }
 
-    def get_nearest_emergency(self, zip_code: str) -> Dict[str, Any]:
+    async def afind_emergency_services(self, zip_code: str) -> Dict[str, Any]:
+        """Async find_emergency_services()"""
+        return await self.aquery(f"Find all emergency services in zip code {zip_code}")
+
+    async def afind_ambulance_services(self, zip_code: Optional[str] = None) -> Dict[str, Any]:
+        """Async find_ambulance_services()"""
+        if zip_code:
+            return await self.aquery(f"Show me all hospitals with ambulance services in zip code {zip_code}")
+        return await self.aquery("Show me all hospitals with ambulance services")
+
+    def get_nearest_emergency(self, zip_code: str, k: int = 5) -> Dict[str, Any]:
         """
-        Get nearest emergency facility
+        Get nearest emergency facilities
+
+        Answered by the shared geo index (facility coordinates + KD-tree); the LLM is
+        only used if that index is unavailable
 
         Args:
             zip_code: User's zip code
+            k: Number of facilities to return
 
         Returns:
             Dict with nearest emergency facility info
         """
         try:
-            query = f"What is the nearest emergency facility to zip code {zip_code}?"
-            return self.query(query)
+            # Imported here: the registry itself imports this module
+            from src.agent_registry import registry
+
+            nearest_facilities = registry.get("nearest_facilities")
+            if nearest_facilities is None:
+                query = f"What is the nearest emergency facility to zip code {zip_code}?"
+                return self.query(query)
+
+            result = nearest_facilities.nearest(zip_code, k)
+            lines = [
+                f"{i}. {f['name']} - {f['distance_miles']:.1f} miles ({f['address']})"
+                for i, f in enumerate(result["facilities"], 1)
+            ]
+            return {
+                "success": True,
+                "output": f"Nearest emergency facilities to ZIP code {result['zip_code']}:\n" + "\n".join(lines),
+                "facilities": result["facilities"],
+                "location_precision": result["location_precision"]
+            }
 
         except Exception as e:
             return {
@@ -4,20 +4,24 @@ Compares hospitals based on various parameters like location, specialties, ratin
 """
 
 from langchain_openai import ChatOpenAI
-import pandas as pd
 import os
 
+from src.concurrency import run_blocking
+from src.hospital_store import HospitalStore
+from src.metrics import TOOL_SECONDS, track_agent_query
+
 # Custom Tool class (replaces CrewAI BaseTool to avoid Pydantic issues)
 class PandasTool:
     """Custom tool for querying and analyzing hospital data using pandas"""
-    def __init__(self):
+    def __init__(self, hospital_store=None):
         self.name = "pandas_tool"
         self.description = "Query and analyze hospital data using pandas"
+        self.hospital_store = hospital_store or HospitalStore()
 
     def run(self, query: str) -> str:
         """Execute a pandas query on hospital data"""
         try:
-            df = pd.read_csv("data/Hospital_General_Information.csv")
+            df = self.hospital_store.frame
             return f"Running query: {query}\nDataset shape: {df.shape}"
         except Exception as e:
             return f"Error running query: {str(e)}"
@@ -46,12 +50,18 @@ class HospitalComparisonAgent:
     """
     Hospital Comparison Agent for analyzing and comparing hospitals
     """
-    def __init__(self):
+    def __init__(self, hospital_store=None, hospital_scorecards=None):
+        """
+        Args:
+            hospital_store: Shared HospitalStore; a private one is created if omitted
+            hospital_scorecards: Shared HospitalScorecards for ranking questions (optional)
+        """
+        self.hospital_scorecards = hospital_scorecards
         self.hospital_info_agent = Agent(
             role='Hospital Information Analyst',
             goal='Compare hospitals based on various parameters',
             backstory='Expert in evaluating hospital data, patient reviews, and healthcare metrics',
-            tools=[PandasTool()],
+            tools=[PandasTool(hospital_store)],
             verbose=True
         )
 
@@ -65,4 +75,19 @@ class HospitalComparisonAgent:
         Returns:
             str: Comparison results
         """
-        return self.hospital_info_agent.run(query)
+        # No LLM here: the whole answer is pandas work over the hospital frame
+        with track_agent_query("hospital"), TOOL_SECONDS.time(agent="hospital", kind="pandas"):
+            # "Best hospitals in X" is a lookup in the precomputed rankings
+            if self.hospital_scorecards is not None:
+                answer = self.hospital_scorecards.answer(query)
+                if answer:
+                    return answer
+
+            return self.hospital_info_agent.run(query)
+
+    async def acompare_hospitals(self, query: str) -> str:
+        """
+        Async compare_hospitals(); runs on the bounded executor because the
+        first ranking question may build the scorecards artifact
+        """
+        return await run_blocking(self.compare_hospitals, query)
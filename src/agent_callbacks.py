@@ -0,0 +1,366 @@
+"""
+Agent Callbacks
+LangChain callback handlers shared by the agents
+MetricsCallbackHandler feeds src.metrics; TracingCallbackHandler records structured spans into src.trace_store
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from src.chat_stream import STEP_PREVIEW_CHARS, count_rows
+from src.constants import TRACE_MAX_SPANS
+from src.metrics import TOOL_SECONDS, record_llm_call, tool_kind
+from src.session_store import redact_context
+from src.trace_store import TraceStore, get_trace_store
+
+
+def token_usage(response: LLMResult) -> Dict[str, int]:
+    """
+    Prompt / completion token counts of an LLM response
+
+    OpenAI chat completions report them in llm_output["token_usage"];
+    streamed runs only carry usage_metadata on the generated message
+
+    Returns:
+        {"prompt": int, "completion": int} (zeros when the provider reported nothing)
+    """
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    prompt = usage.get("prompt_tokens", 0) or 0
+    completion = usage.get("completion_tokens", 0) or 0
+    if not (prompt or completion):
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt += metadata.get("input_tokens", 0) or 0
+                completion += metadata.get("output_tokens", 0) or 0
+    return {"prompt": int(prompt), "completion": int(completion)}
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records LLM latency, LLM round-trips, token usage and tool time for one agent
+
+    Features:
+    - Runs inline (no executor hop) and only does dict and histogram updates
+    - Keyed by LangChain run_id, so concurrent queries sharing the handler don't mix
+    - Round-trips are added to the agent query open in the caller's context
+      (src.metrics.track_agent_query)
+    """
+
+    # Cheap enough to run on the event loop thread
+    run_inline = True
+
+    def __init__(self, agent: str):
+        """
+        Args:
+            agent: Metric label of the owning agent
+        """
+        self.agent = agent
+        self._llm_starts: Dict[UUID, float] = {}
+        self._tool_starts: Dict[UUID, tuple] = {}
+
+    # LLM requests
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any):
+        self._llm_starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID, **kwargs: Any):
+        self._llm_starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        start = self._llm_starts.pop(run_id, None)
+        if start is None:
+            return
+        usage = token_usage(response)
+        record_llm_call(self.agent, time.perf_counter() - start, usage["prompt"], usage["completion"])
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        start = self._llm_starts.pop(run_id, None)
+        if start is not None:
+            record_llm_call(self.agent, time.perf_counter() - start)
+
+    # Tools (SQL queries, pandas REPL)
+
+    def on_tool_start(self, serialized: Optional[Dict[str, Any]], input_str: str, *, run_id: UUID, **kwargs: Any):
+        name = (serialized or {}).get("name") or kwargs.get("name")
+        self._tool_starts[run_id] = (tool_kind(name), time.perf_counter())
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id)
+
+    def _finish_tool(self, run_id: UUID):
+        started = self._tool_starts.pop(run_id, None)
+        if started is not None:
+            kind, start = started
+            TOOL_SECONDS.observe(time.perf_counter() - start, agent=self.agent, kind=kind)
+
+
+# Unfinished traces kept per handler before the oldest is assumed abandoned
+MAX_OPEN_TRACES = 256
+
+# Tools whose arguments and results carry patient details; traced without them
+REDACTED_TOOLS = frozenset({"book_appointment", "cancel_appointment"})
+REDACTED = "[redacted]"
+
+
+def _preview(value: Any) -> str:
+    """Truncated text of a traced value, with any conversation context redacted"""
+    text = redact_context(value if isinstance(value, str) else str(getattr(value, "content", value)))
+    return text if len(text) <= STEP_PREVIEW_CHARS else text[:STEP_PREVIEW_CHARS] + "..."
+
+
+def _run_name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> str:
+    return kwargs.get("name") or (serialized or {}).get("name") or "unknown"
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Records every chain, LLM and tool step of an agent run as structured spans
+
+    Features:
+    - One trace per top-level run (AgentExecutor invoke or bare LLM call), stored
+      in the shared TraceStore when the run finishes
+    - Spans carry start offset and duration; tool spans carry the SQL and row
+      count, LLM spans carry prompt / completion tokens
+    - Per-trace totals (LLM calls, tool calls, SQL queries, tokens) for spotting
+      agent loops that take many tool hops
+    - Bounded: at most max_spans spans per trace, the rest are only counted
+    - Conversation context and booking tool arguments / results are redacted
+      before anything is stored (including the JSONL sink)
+    """
+
+    run_inline = True
+
+    def __init__(self, agent: str, store: Optional[TraceStore] = None, max_spans: int = TRACE_MAX_SPANS):
+        """
+        Args:
+            agent: Agent label stored on every trace
+            store: Destination TraceStore (defaults to the process-wide one)
+            max_spans: Spans kept per trace
+        """
+        self.agent = agent
+        self.store = store or get_trace_store()
+        self.max_spans = max_spans
+        # root run_id -> (trace, perf_counter at start)
+        self._traces: Dict[UUID, tuple] = {}
+        # run_id -> (root run_id, span or None, perf_counter at start, name, nearest visible span id)
+        self._runs: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _open(self, run_id: UUID, parent_run_id: Optional[UUID], kind: str, name: str,
+              root_input: Any = None, hidden: bool = False, **fields: Any):
+        start = time.perf_counter()
+        with self._lock:
+            parent = self._runs.get(parent_run_id) if parent_run_id is not None else None
+            if parent is None:
+                if len(self._traces) >= MAX_OPEN_TRACES:
+                    self._discard_oldest()
+                trace = {
+                    "trace_id": str(run_id), "agent": self.agent, "name": name,
+                    "input": _preview(root_input) if root_input is not None else None,
+                    "started_at": time.time(), "duration_ms": None, "error": None,
+                    "llm_calls": 0, "tool_calls": 0, "sql_queries": 0,
+                    "prompt_tokens": 0, "completion_tokens": 0, "span_count": 0, "spans": []
+                }
+                self._traces[run_id] = (trace, start)
+                root_id = run_id
+            else:
+                root_id = parent[0]
+            trace, trace_start = self._traces[root_id]
+
+            span = None
+            if not hidden:
+                trace["span_count"] += 1
+                if len(trace["spans"]) < self.max_spans:
+                    span = {
+                        "span_id": str(run_id),
+                        "parent_id": parent[4] if parent is not None else None,
+                        "kind": kind, "name": name,
+                        "start_ms": round((start - trace_start) * 1000, 2), "duration_ms": None,
+                        **fields
+                    }
+                    trace["spans"].append(span)
+            visible_id = parent[4] if hidden and parent is not None else str(run_id)
+            self._runs[run_id] = (root_id, span, start, name, visible_id)
+
+    def _discard_oldest(self):
+        """Forget the oldest unfinished trace (a run abandoned without an end callback)"""
+        root_id = next(iter(self._traces))
+        del self._traces[root_id]
+        for run_id in [run_id for run_id, run in self._runs.items() if run[0] == root_id]:
+            del self._runs[run_id]
+
+    def _close(self, run_id: UUID, error: Optional[BaseException] = None,
+               counts: Optional[Dict[str, int]] = None, **fields: Any):
+        """Finish a span, add `counts` to its trace totals and store the trace if this was its root"""
+        end = time.perf_counter()
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+            if run is None:
+                return
+            root_id, span, start = run[:3]
+            trace, trace_start = self._traces[root_id]
+            for key, amount in (counts or {}).items():
+                trace[key] += amount
+            if span is not None:
+                span["duration_ms"] = round((end - start) * 1000, 2)
+                span.update(fields)
+                if error is not None:
+                    span["error"] = f"{type(error).__name__}: {error}"
+            if run_id != root_id:
+                return
+            del self._traces[root_id]
+            trace["duration_ms"] = round((end - trace_start) * 1000, 2)
+            if error is not None:
+                trace["error"] = f"{type(error).__name__}: {error}"
+        self.store.add(trace)
+
+    # Chains
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, tags: Optional[list] = None, **kwargs: Any):
+        root_input = inputs.get("input", inputs) if isinstance(inputs, dict) else inputs
+        self._open(run_id, parent_run_id, "chain", _run_name(serialized, kwargs), root_input=root_input,
+                   hidden="langsmith:hidden" in (tags or []))
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id, error)
+
+    # LLM requests
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        metadata = kwargs.get("metadata") or {}
+        prompt = messages[0][-1].content if messages and messages[0] else None
+        self._open(run_id, parent_run_id, "llm", _run_name(serialized, kwargs), root_input=prompt,
+                   model=metadata.get("ls_model_name"), messages=len(messages[0]) if messages else 0)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID,
+                     parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        metadata = kwargs.get("metadata") or {}
+        self._open(run_id, parent_run_id, "llm", _run_name(serialized, kwargs),
+                   root_input=prompts[0] if prompts else None, model=metadata.get("ls_model_name"))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        usage = token_usage(response)
+        counts = {"llm_calls": 1, "prompt_tokens": usage["prompt"], "completion_tokens": usage["completion"]}
+        self._close(run_id, counts=counts, prompt_tokens=usage["prompt"], completion_tokens=usage["completion"])
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id, error, counts={"llm_calls": 1})
+
+    # Tools (SQL queries, pandas REPL)
+
+    def on_tool_start(self, serialized: Optional[Dict[str, Any]], input_str: str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, inputs: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        name = _run_name(serialized, kwargs)
+        if name in REDACTED_TOOLS:
+            input_str = REDACTED
+        fields = {"input": _preview(input_str)}
+        if tool_kind(name) == "sql":
+            fields["sql"] = (inputs or {}).get("query") or input_str
+        self._open(run_id, parent_run_id, "tool", name, root_input=input_str, **fields)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        run = self._runs.get(run_id)
+        fields = {"output": REDACTED if run is not None and run[3] in REDACTED_TOOLS else _preview(output)}
+        if self._is_sql_query(run_id):
+            fields["rows"] = count_rows(output)
+        self._close(run_id, counts=self._tool_counts(run_id), **fields)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id, error, counts=self._tool_counts(run_id))
+
+    def _is_sql_query(self, run_id: UUID) -> bool:
+        run = self._runs.get(run_id)
+        return run is not None and run[3] == "sql_db_query"
+
+    def _tool_counts(self, run_id: UUID) -> Dict[str, int]:
+        return {"tool_calls": 1, "sql_queries": int(self._is_sql_query(run_id))}
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import uuid
+
+    from langchain_core.messages import AIMessage, HumanMessage
+    from langchain_core.outputs import ChatGeneration
+
+    from src.metrics import LLM_ROUND_TRIPS, LLM_TOKENS, track_agent_query
+
+    print("\n" + "="*80)
+    print("AGENT CALLBACK HANDLERS")
+    print("="*80)
+
+    response = LLMResult(generations=[[ChatGeneration(message=AIMessage(content="ok"))]],
+                         llm_output={"token_usage": {"prompt_tokens": 850, "completion_tokens": 60}})
+    store = TraceStore(max_traces=100, jsonl_path=None)
+    handlers = [MetricsCallbackHandler("doctor"), TracingCallbackHandler("doctor", store=store)]
+    messages = [[HumanMessage(content="cardiologists free tomorrow?")]]
+
+    def agent_run(sql_calls: int):
+        """Replay the callbacks of an SQL agent run: (plan -> tool) * sql_calls -> answer"""
+        root = uuid.uuid4()
+        for handler in handlers:
+            handler.on_chain_start({"name": "AgentExecutor"}, {"input": "cardiologists free tomorrow?"},
+                                   run_id=root, parent_run_id=None)
+        for step in range(sql_calls + 1):
+            llm_run = uuid.uuid4()
+            for handler in handlers:
+                handler.on_chat_model_start({"name": "ChatOpenAI"}, messages,
+                                            run_id=llm_run, parent_run_id=root)
+                handler.on_llm_end(response, run_id=llm_run)
+            if step < sql_calls:
+                tool_run = uuid.uuid4()
+                sql = "SELECT name FROM doctors WHERE specialization LIKE '%cardio%'"
+                for handler in handlers:
+                    handler.on_tool_start({"name": "sql_db_query"}, str({"query": sql}), run_id=tool_run,
+                                          parent_run_id=root, inputs={"query": sql})
+                    handler.on_tool_end("[('Dr. Moore',), ('Dr. Chen',)]", run_id=tool_run)
+        for handler in handlers:
+            handler.on_chain_end({"output": "Dr. Moore and Dr. Chen"}, run_id=root)
+
+    queries = 2000
+    start = time.perf_counter()
+    for i in range(queries):
+        with track_agent_query("doctor"):
+            agent_run(sql_calls=1 + i % 5)
+    per_query = (time.perf_counter() - start) / queries * 1e6
+
+    _, round_trips, count = LLM_ROUND_TRIPS.snapshot(agent="doctor")
+    slowest = store.slowest(1, min_tool_calls=5)[0]
+    trace = store.get(slowest["trace_id"])
+    sql_span = next(span for span in trace["spans"] if span["kind"] == "tool")
+    assert trace["sql_queries"] == 5 and trace["llm_calls"] == 6 and sql_span["rows"] == 2
+    assert all(span["duration_ms"] is not None for span in trace["spans"])
+
+    # Patient details never reach the store: context prefix and booking tool arguments / results
+    from src.session_store import with_context
+    tracer = TracingCallbackHandler("doctor", store=store)
+    root, tool_run = uuid.uuid4(), uuid.uuid4()
+    tracer.on_chain_start({"name": "AgentExecutor"},
+                          {"input": with_context("book slot 7", "user: I'm Jane Roe, jane@example.com")},
+                          run_id=root, parent_run_id=None)
+    tracer.on_tool_start({"name": "book_appointment"}, str({"slot_id": 7, "patient_email": "jane@example.com"}),
+                         run_id=tool_run, parent_run_id=root)
+    tracer.on_tool_end("Booked slot 7 for Jane Roe. Confirmation ID: APT-1", run_id=tool_run)
+    tracer.on_chain_end({"output": "Booked"}, run_id=root)
+    booked = store.get(str(root))
+    assert "Jane" not in str(booked) and "jane@" not in str(booked) and booked["input"].endswith("book slot 7")
+
+    print(f"round trips per query: {round_trips / count:.1f}")
+    print(f"prompt tokens: {LLM_TOKENS.value(agent='doctor', kind='prompt'):.0f}")
+    print(f"slowest 5-tool trace: {slowest['duration_ms']:.2f} ms, {trace['span_count']} spans, SQL: {sql_span['sql']}")
+    print(f"metrics + tracing bookkeeping: {per_query:.1f} µs per query (avg 4 LLM calls + 3 SQL tools)")
+    print("\n✅ Callback handlers add well under a millisecond to queries whose LLM calls take seconds")
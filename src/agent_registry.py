@@ -0,0 +1,273 @@
+"""
+Agent Registry
+Process-wide registry that lazily constructs each agent and shared data service
+at most once. Shared by all API routers and the chat orchestrator
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.booking import BookingEngine
+from src.concurrency import run_blocking
+from src.constants import AGENT_RETRY_SECONDS
+from src.condition_recommender import ConditionRecommender
+from src.DiagnosticInfoAgent import DiagnosticInfoAgent
+from src.DoctorInfoAgent import DoctorInfoAgent
+from src.doctor_directory import DoctorDirectory
+from src.emergency_index import EmergencyIndex
+from src.EmergencyServicesAgent import EmergencyServicesAgent
+from src.geo_index import NearestFacilityIndex
+from src.HospitalComparisonAgent import HospitalComparisonAgent
+from src.hospital_compare import HospitalComparator
+from src.hospital_scorecards import HospitalScorecards
+from src.hospital_search import HospitalSearch
+from src.hospital_store import HospitalStore
+from src.intent_classifier import IntentClassifier
+from src.lab_catalog import LabCatalog
+from src.session_store import SessionStore
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """Resident set size of this process (from /proc), or None where it is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class AgentRegistry:
+    """
+    Lazy, thread-safe registry of shared agent instances
+
+    Features:
+    - Agents are built on first use instead of at import time
+    - Each agent is built at most once per process, even under concurrent requests
+    - Construction failures are remembered for retry_seconds so requests fail
+      fast, then construction is retried
+    - Construction time and resident-memory growth are recorded per agent
+    """
+
+    def __init__(self, track_memory: bool = True, retry_seconds: float = AGENT_RETRY_SECONDS):
+        """
+        Initialize an empty registry
+
+        Args:
+            track_memory: Record the process's RSS growth while each agent is
+                constructed (approximate: other threads allocate meanwhile)
+            retry_seconds: How long a failed construction is remembered before it is retried
+        """
+        self.track_memory = track_memory
+        self.retry_seconds = retry_seconds
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._errors: Dict[str, str] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """
+        Register a factory that builds the agent called `name`
+
+        Args:
+            name: Registry key (e.g. "doctor")
+            factory: Zero-argument callable returning the agent instance
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+            self._instances.pop(name, None)
+            self._errors.pop(name, None)
+            self._retry_at.pop(name, None)
+            self._stats.pop(name, None)
+
+    def _failed_recently(self, name: str) -> bool:
+        """Whether the last construction of `name` failed less than retry_seconds ago"""
+        return name in self._errors and time.monotonic() < self._retry_at.get(name, 0.0)
+
+    def get(self, name: str) -> Optional[Any]:
+        """
+        Get the shared instance of an agent, building it on first use
+
+        Args:
+            name: Registry key
+
+        Returns:
+            The agent instance, or None if it could not be constructed (a failed
+            construction is retried once retry_seconds have passed)
+        """
+        # Fast path: already built (no locking needed for a dict read)
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self._factories:
+            raise KeyError(f"Unknown agent: {name}")
+
+        with self._locks[name]:
+            # Another thread may have finished (or failed) construction while we waited
+            instance = self._instances.get(name)
+            if instance is not None or self._failed_recently(name):
+                return instance
+            return self._construct(name)
+
+    async def aget(self, name: str) -> Optional[Any]:
+        """
+        Async get(): a built instance is returned directly; first-time
+        construction runs on the bounded executor instead of the event loop
+
+        Args:
+            name: Registry key
+
+        Returns:
+            The agent instance, or None if it could not be constructed
+        """
+        instance = self._instances.get(name)
+        if instance is not None or self._failed_recently(name):
+            return instance
+        return await run_blocking(self.get, name)
+
+    def _construct(self, name: str) -> Optional[Any]:
+        """Build an agent and record how long it took and how much the process grew"""
+        memory_before = resident_memory_bytes() if self.track_memory else None
+
+        start = time.perf_counter()
+        try:
+            instance = self._factories[name]()
+            error = None
+        except Exception as e:
+            instance = None
+            error = str(e)
+        elapsed = time.perf_counter() - start
+
+        memory_bytes = None
+        if memory_before is not None:
+            memory_after = resident_memory_bytes()
+            if memory_after is not None:
+                memory_bytes = max(memory_after - memory_before, 0)
+
+        self._stats[name] = {
+            "construction_seconds": round(elapsed, 4),
+            "memory_bytes": memory_bytes,
+            "constructed_at": time.time(),
+        }
+
+        if error is not None:
+            self._errors[name] = error
+            self._retry_at[name] = time.monotonic() + self.retry_seconds
+            print(f"Warning: Could not initialize {name}: {error} (retrying in {self.retry_seconds:g}s)")
+        else:
+            self._errors.pop(name, None)
+            self._retry_at.pop(name, None)
+            self._instances[name] = instance
+            memory_text = f", {memory_bytes / 1024 / 1024:.1f} MB" if memory_bytes is not None else ""
+            print(f"{name} initialized in {elapsed:.2f}s{memory_text}")
+
+        return instance
+
+    def is_loaded(self, name: str) -> bool:
+        """Check whether an agent has already been constructed"""
+        return name in self._instances
+
+    def reset(self, name: Optional[str] = None):
+        """
+        Drop constructed instances (and remembered failures) so they are rebuilt
+
+        Args:
+            name: Agent to reset, or None to reset all agents
+        """
+        names = [name] if name else list(self._factories)
+        for key in names:
+            with self._locks[key]:
+                self._instances.pop(key, None)
+                self._errors.pop(key, None)
+                self._retry_at.pop(key, None)
+                self._stats.pop(key, None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Report construction status, time and memory footprint for every agent
+
+        Returns:
+            Dict keyed by agent name
+        """
+        report = {}
+        for name in self._factories:
+            stats = self._stats.get(name, {})
+            report[name] = {
+                "loaded": name in self._instances,
+                "error": self._errors.get(name),
+                "retry_in_seconds": (
+                    round(max(self._retry_at.get(name, 0.0) - time.monotonic(), 0.0), 1)
+                    if name in self._errors else None
+                ),
+                "construction_seconds": stats.get("construction_seconds"),
+                "memory_bytes": stats.get("memory_bytes"),
+            }
+        return report
+
+
+def _condition_answer(condition: str) -> Dict[str, Any]:
+    """LLM fallback for conditions the recommendation table does not cover"""
+    diagnostic_agent = registry.get("diagnostic")
+    if diagnostic_agent is None:
+        return {"success": False, "error": "Diagnostic service is currently unavailable"}
+    return diagnostic_agent.find_tests_by_condition(condition)
+
+
+# Shared registry used by every router
+registry = AgentRegistry()
+registry.register("emergency", EmergencyServicesAgent)
+registry.register("hospital", lambda: HospitalComparisonAgent(
+    registry.get("hospital_store"), registry.get("hospital_scorecards")
+))
+registry.register("doctor", lambda: DoctorInfoAgent(booking_engine=registry.get("booking_engine")))
+registry.register("diagnostic", DiagnosticInfoAgent)
+
+# Shared data services (no LLM involved)
+registry.register("doctor_directory", DoctorDirectory)
+registry.register("booking_engine", BookingEngine)
+registry.register("emergency_index", EmergencyIndex)
+registry.register("nearest_facilities", NearestFacilityIndex)
+registry.register("hospital_store", HospitalStore)
+registry.register("hospital_search", lambda: HospitalSearch(registry.get("hospital_store")))
+registry.register("hospital_comparator", lambda: HospitalComparator(registry.get("hospital_search")))
+registry.register("hospital_scorecards", lambda: HospitalScorecards(registry.get("hospital_store")))
+registry.register("lab_catalog", LabCatalog)
+registry.register("intent_classifier", IntentClassifier)
+registry.register("session_store", SessionStore)
+registry.register("condition_recommender", lambda: ConditionRecommender(
+    registry.get("lab_catalog"), answer_fn=_condition_answer
+))
+
+
+def get_agent(name: str) -> Optional[Any]:
+    """
+    Resolve a shared agent from the process-wide registry
+
+    Args:
+        name: 'emergency', 'hospital', 'doctor' or 'diagnostic'
+
+    Returns:
+        The agent instance, or None if it is unavailable
+    """
+    return registry.get(name)
+
+
+async def aget_agent(name: str) -> Optional[Any]:
+    """
+    Async variant of get_agent() for request handlers
+
+    Args:
+        name: 'emergency', 'hospital', 'doctor' or 'diagnostic'
+
+    Returns:
+        The agent instance, or None if it is unavailable
+    """
+    return await registry.aget(name)
@@ -4,9 +4,9 @@ Main API endpoints for the healthcare multi-agent system
 Serves frontend and provides backend API
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
@@ -16,8 +16,12 @@ import os
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.HospitalComparisonAgent import HospitalComparisonAgent
-from src.constants import MODEL_NAME, OPENAI_API_KEY
+from src.agent_registry import registry
+from src.concurrency import install_default_executor
+from src.constants import DEBUG_TRACES_ENABLED, MODEL_NAME, OPENAI_API_KEY
+from src.metrics import MetricsMiddleware, registry as metrics_registry
+from src.response_cache import get_response_cache
+from src.trace_store import get_trace_store
 
 # Import API routers
 from src.routes import emergency, hospitals, doctors, tests, chat
@@ -38,6 +42,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request latency histograms (exported at /metrics)
+app.add_middleware(MetricsMiddleware)
+metrics_registry.register_collector(
+    "healthsense_response_cache",
+    "Shared LLM response cache statistics",
+    lambda: get_response_cache().stats()
+)
+
 # Mount static files (frontend)
 static_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
 if os.path.exists(static_path):
@@ -55,13 +67,27 @@ app.include_router(chat.router, tags=["AI Chat"])
 
 print("All API routers included")
 
-# Initialize agents (legacy support)
-hospital_agent = None
-try:
-    hospital_agent = HospitalComparisonAgent().hospital_info_agent
-except Exception as e:
-    print(f"Warning: Could not initialize Hospital Agent: {e}")
-    hospital_agent = None
+
+@app.on_event("startup")
+async def bound_blocking_work():
+    """Run sync-only agent tools on the bounded executor instead of an unbounded default pool"""
+    install_default_executor()
+
+
+@app.on_event("startup")
+def warm_latency_sensitive_services():
+    """Build the in-memory emergency indexes and train the chat intent router before the first request"""
+    registry.get("emergency_index")
+    registry.get("nearest_facilities")
+    registry.get("intent_classifier")
+
+
+def get_legacy_hospital_agent():
+    """Resolve the hospital analyst used by the legacy endpoints from the shared registry"""
+    hospital_comparison_agent = registry.get("hospital")
+    if not hospital_comparison_agent:
+        return None
+    return hospital_comparison_agent.hospital_info_agent
 
 # Request/Response models (legacy support)
 class QueryRequest(BaseModel):
@@ -139,9 +165,94 @@ def health_check():
             "hospital": True,
             "doctor": True,
             "diagnostic": True
-        }
+        },
+        "agent_registry": registry.stats(),
+        "response_cache": get_response_cache().stats()
     }
 
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus scrape endpoint
+
+    Request, classification, agent, LLM (latency, round-trips, tokens) and
+    tool (SQL, pandas) timing histograms plus response-cache gauges
+    """
+    return Response(
+        content=metrics_registry.expose(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+# Clients allowed to read traces (when DEBUG_TRACES_ENABLED is set)
+LOCAL_CLIENTS = ("127.0.0.1", "::1", "localhost")
+
+def require_trace_access(request: Request):
+    """
+    Traces hold agent prompts and tool calls; serve them only when enabled and to local clients
+
+    Raises:
+        HTTPException: 404 while DEBUG_TRACES_ENABLED is off, 403 for remote clients
+    """
+    if not DEBUG_TRACES_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if request.client is None or request.client.host not in LOCAL_CLIENTS:
+        raise HTTPException(status_code=403, detail="Traces are only available from localhost")
+
+@app.get("/debug/traces")
+def list_traces(request: Request, limit: int = 20, agent: Optional[str] = None, min_tool_calls: int = 0):
+    """
+    Slowest recent agent traces (requires DEBUG_TRACES_ENABLED; localhost only)
+
+    Args:
+        request: Incoming request (client address is checked)
+        limit: Maximum traces returned (1-500)
+        agent: Only traces of this agent ('doctor', 'emergency', 'diagnostic')
+        min_tool_calls: Only traces with at least this many tool calls,
+            e.g. 5 to find SQL-agent loops
+
+    Returns:
+        Trace summaries, slowest first, plus buffer statistics
+    """
+    try:
+        require_trace_access(request)
+        if not 1 <= limit <= 500:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+
+        store = get_trace_store()
+        return {
+            "success": True,
+            "traces": store.slowest(limit, agent=agent, min_tool_calls=min_tool_calls),
+            "stats": store.stats()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.get("/debug/traces/{trace_id}")
+def get_trace(request: Request, trace_id: str):
+    """
+    One recent agent trace with all of its chain, LLM and tool spans
+    (requires DEBUG_TRACES_ENABLED; localhost only)
+
+    Args:
+        request: Incoming request (client address is checked)
+        trace_id: Trace ID from /debug/traces
+
+    Returns:
+        The trace; 404 once it has left the ring buffer
+    """
+    try:
+        require_trace_access(request)
+        trace = get_trace_store().get(trace_id)
+        if trace is None:
+            raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found")
+        return {"success": True, "trace": trace}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
 # Legacy endpoints (backward compatibility)
 @app.post("/compare-hospitals", response_model=QueryResponse)
 def compare_hospitals(request: QueryRequest):
@@ -156,6 +267,7 @@ def compare_hospitals(request: QueryRequest):
         QueryResponse with comparison results
     """
     try:
+        hospital_agent = get_legacy_hospital_agent()
         if not hospital_agent:
             raise HTTPException(status_code=503, detail="Hospital service unavailable")
 
@@ -186,6 +298,7 @@ def general_query(request: QueryRequest):
         QueryResponse with results
     """
     try:
+        hospital_agent = get_legacy_hospital_agent()
         if not hospital_agent:
             raise HTTPException(status_code=503, detail="Service unavailable")
 
@@ -0,0 +1,426 @@
+"""
+Appointment Booking Engine
+Race-free booking of doctor slots using atomic compare-and-set updates
+Every booking is persisted in the appointments table with a unique confirmation ID
+"""
+
+import re
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+from src.constants import APPOINTMENTS_DB_PATH
+from src.db_pool import PoolTimeoutError, get_pool
+from src.ingestion import ingest_doctor_data, to_iso_timestamp
+from src.response_cache import get_response_cache
+
+_TIME_PATTERN = re.compile(r"^(\d{1,2})(?::(\d{2}))?\s*([AaPp]\.?[Mm]\.?)?$")
+
+
+class BookingError(Exception):
+    """Base class for booking failures"""
+
+
+class SlotNotFoundError(BookingError):
+    """The requested doctor or slot does not exist"""
+
+
+class SlotUnavailableError(BookingError):
+    """The requested slot is already booked"""
+
+
+class BookingBusyError(BookingError):
+    """The database stayed locked for longer than the booking timeout"""
+
+
+def _strip_title(doctor_name: str) -> str:
+    """Doctor name as stored in the doctors table (no "Dr." prefix)"""
+    return re.sub(r"^dr\.?\s+", "", doctor_name.strip(), flags=re.IGNORECASE)
+
+
+def normalize_slot_datetime(date: str, time_text: str) -> str:
+    """
+    Combine a date and a loosely formatted time into the slots table's ISO format
+
+    Args:
+        date: Date (YYYY-MM-DD)
+        time_text: Time such as "3PM", "3:30 pm", "10:00 AM" or "15:00"
+
+    Returns:
+        Timestamp formatted as YYYY-MM-DDTHH:MM:SS
+
+    Raises:
+        ValueError: If the date or time cannot be parsed
+    """
+    match = _TIME_PATTERN.match(time_text.strip())
+    if not match:
+        raise ValueError(f"Unrecognized time: {time_text}")
+
+    hour, minute, meridiem = match.groups()
+    if meridiem:
+        normalized = f"{int(hour)}:{minute or '00'} {meridiem.replace('.', '').upper()}"
+    else:
+        normalized = f"{int(hour):02d}:{minute or '00'}"
+
+    return to_iso_timestamp(f"{date.strip()} {normalized}")
+
+
+class BookingEngine:
+    """
+    Transactional appointment booking on the slots table
+
+    Features:
+    - Atomic compare-and-set (is_available 1 -> 0) inside BEGIN IMMEDIATE
+    - Unique confirmation IDs persisted in an appointments table
+    - Deterministic outcome under contention: exactly one booking wins a slot
+    - Cancellation releases the slot again
+    """
+
+    def __init__(
+        self,
+        db_path: str = APPOINTMENTS_DB_PATH,
+        doctors_csv_path: str = "data/doctors_info_data.csv",
+        slots_csv_path: str = "data/doctors_slots_data.csv"
+    ):
+        """
+        Initialize Booking Engine
+
+        Args:
+            db_path: Path to SQLite appointments database
+            doctors_csv_path: Path to doctors CSV file
+            slots_csv_path: Path to slots CSV file
+        """
+        self.db_path = db_path
+
+        ingest_doctor_data(doctors_csv_path, slots_csv_path, db_path)
+        # Pooled connections run in WAL mode, so listings and slot lookups
+        # keep reading while a booking commits
+        self.pool = get_pool(db_path)
+        self._setup_tables()
+
+    def _setup_tables(self):
+        """Create the appointments table"""
+        with self.pool.connection() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS appointments (
+                confirmation_id TEXT PRIMARY KEY,
+                slot_id INTEGER NOT NULL,
+                doctor_id INTEGER NOT NULL,
+                slot_datetime TEXT NOT NULL,
+                patient_name TEXT NOT NULL,
+                patient_email TEXT NOT NULL,
+                patient_phone TEXT,
+                reason TEXT,
+                status TEXT NOT NULL DEFAULT 'booked',
+                created_at TEXT NOT NULL
+            )
+            """)
+            # Second line of defence: at most one active appointment per slot
+            conn.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_appointments_active_slot
+            ON appointments (slot_id) WHERE status = 'booked'
+            """)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Run a block inside BEGIN IMMEDIATE on a pooled connection
+
+        The write lock is taken up front, so the compare-and-set and the
+        appointment insert can never interleave with another booking.
+        """
+        try:
+            conn = self.pool.acquire()
+        except PoolTimeoutError as e:
+            raise BookingBusyError(str(e)) from e
+
+        try:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:
+                raise BookingBusyError(str(e)) from e
+
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            self.pool.release(conn)
+
+    def get_doctor(self, doctor_id: Optional[int] = None, doctor_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Resolve a doctor by ID and/or name
+
+        Args:
+            doctor_id: Doctor's ID (preferred)
+            doctor_name: Doctor's name; must match the ID's doctor when both are given
+
+        Returns:
+            Dict with the doctor's id and name
+
+        Raises:
+            ValueError: If neither is given, or the name is not the ID's doctor
+            SlotNotFoundError: If the doctor does not exist
+        """
+        name = _strip_title(doctor_name) if doctor_name and doctor_name.strip() else None
+        if doctor_id is None and name is None:
+            raise ValueError("Doctor ID or name is required")
+
+        with self.pool.connection() as conn:
+            if doctor_id is not None:
+                row = conn.execute("SELECT id, name FROM doctors WHERE id = ?", (doctor_id,)).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT id, name FROM doctors WHERE name = ? COLLATE NOCASE", (name,)
+                ).fetchone()
+
+        if not row:
+            raise SlotNotFoundError(f"Doctor not found: {doctor_id if doctor_id is not None else doctor_name}")
+        if name is not None and row["name"].casefold() != name.casefold():
+            raise ValueError(f"Doctor {doctor_id} is Dr. {row['name']}, not {doctor_name}")
+        return dict(row)
+
+    def find_slot(
+        self,
+        date: str,
+        time_text: str,
+        doctor_id: Optional[int] = None,
+        doctor_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Resolve a doctor and a date/time into a slot
+
+        Args:
+            date: Date (YYYY-MM-DD)
+            time_text: Time (e.g. "3PM", "10:00 AM")
+            doctor_id: Doctor's ID (preferred)
+            doctor_name: Doctor's name, used when no ID is given
+
+        Returns:
+            Dict with slot id, doctor_id, datetime and is_available
+
+        Raises:
+            ValueError: If the date/time cannot be parsed
+            SlotNotFoundError: If the doctor or slot does not exist
+        """
+        slot_datetime = normalize_slot_datetime(date, time_text)
+        if doctor_id is None:
+            doctor_id = self.get_doctor(doctor_name=doctor_name)["id"]
+
+        with self.pool.connection() as conn:
+            slot = conn.execute(
+                "SELECT id, doctor_id, datetime, is_available FROM slots WHERE doctor_id = ? AND datetime = ?",
+                (doctor_id, slot_datetime)
+            ).fetchone()
+
+        if not slot:
+            raise SlotNotFoundError(f"No slot for doctor {doctor_id} at {slot_datetime}")
+
+        return dict(slot)
+
+    def book(
+        self,
+        slot_id: int,
+        patient_name: str,
+        patient_email: str,
+        patient_phone: Optional[str] = None,
+        reason: Optional[str] = None,
+        doctor_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Book a slot
+
+        Args:
+            slot_id: Slot to book
+            patient_name: Patient's name
+            patient_email: Patient's email
+            patient_phone: Patient's phone number
+            reason: Optional reason for the visit
+            doctor_id: Doctor the caller expects the slot to belong to
+
+        Returns:
+            Dict describing the persisted appointment
+
+        Raises:
+            ValueError: If the slot belongs to a different doctor than doctor_id
+            SlotNotFoundError: If the slot does not exist
+            SlotUnavailableError: If the slot is already booked
+            BookingBusyError: If the write lock could not be acquired in time
+        """
+        with self._transaction() as conn:
+            slot = conn.execute(
+                "SELECT doctor_id, datetime FROM slots WHERE id = ?", (slot_id,)
+            ).fetchone()
+            if not slot:
+                raise SlotNotFoundError(f"Slot not found: {slot_id}")
+            if doctor_id is not None and slot["doctor_id"] != doctor_id:
+                raise ValueError(f"Slot {slot_id} belongs to doctor {slot['doctor_id']}, not doctor {doctor_id}")
+
+            claimed = conn.execute(
+                "UPDATE slots SET is_available = 0 WHERE id = ? AND is_available = 1",
+                (slot_id,)
+            ).rowcount
+            if claimed != 1:
+                raise SlotUnavailableError(f"Slot {slot_id} is already booked")
+
+            appointment = {
+                "confirmation_id": f"APT-{uuid.uuid4().hex[:12].upper()}",
+                "slot_id": slot_id,
+                "doctor_id": slot["doctor_id"],
+                "slot_datetime": slot["datetime"],
+                "patient_name": patient_name,
+                "patient_email": patient_email,
+                "patient_phone": patient_phone,
+                "reason": reason,
+                "status": "booked",
+                "created_at": datetime.now().isoformat(),
+            }
+            conn.execute(
+                """
+                INSERT INTO appointments (
+                    confirmation_id, slot_id, doctor_id, slot_datetime, patient_name,
+                    patient_email, patient_phone, reason, status, created_at
+                ) VALUES (
+                    :confirmation_id, :slot_id, :doctor_id, :slot_datetime, :patient_name,
+                    :patient_email, :patient_phone, :reason, :status, :created_at
+                )
+                """,
+                appointment
+            )
+
+        # Cached agent answers about slot availability are now stale
+        get_response_cache().bump(self.db_path)
+        return appointment
+
+    def cancel(self, confirmation_id: str) -> Dict[str, Any]:
+        """
+        Cancel an appointment and release its slot
+
+        Args:
+            confirmation_id: Confirmation ID returned by book()
+
+        Returns:
+            Dict describing the cancelled appointment
+
+        Raises:
+            SlotNotFoundError: If no active appointment has this ID
+            BookingBusyError: If the write lock could not be acquired in time
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM appointments WHERE confirmation_id = ? AND status = 'booked'",
+                (confirmation_id,)
+            ).fetchone()
+            if not row:
+                raise SlotNotFoundError(f"No active appointment: {confirmation_id}")
+
+            conn.execute(
+                "UPDATE appointments SET status = 'cancelled' WHERE confirmation_id = ?",
+                (confirmation_id,)
+            )
+            conn.execute("UPDATE slots SET is_available = 1 WHERE id = ?", (row["slot_id"],))
+
+            appointment = dict(row)
+            appointment["status"] = "cancelled"
+
+        get_response_cache().bump(self.db_path)
+        return appointment
+
+    def get_appointment(self, confirmation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an appointment by confirmation ID
+
+        Args:
+            confirmation_id: Confirmation ID
+
+        Returns:
+            Appointment record, or None if not found
+        """
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM appointments WHERE confirmation_id = ?", (confirmation_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+
+# Concurrency stress test
+if __name__ == "__main__":
+    import os
+    import random
+    import shutil
+    import tempfile
+    import threading
+    import time
+    from collections import Counter
+
+    print("\n" + "="*80)
+    print("BOOKING ENGINE STRESS TEST")
+    print("="*80)
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "appointments.db")
+    threads_count = 32
+    attempts_per_thread = 100
+
+    try:
+        engine = BookingEngine(db_path=db_path)
+        conn = sqlite3.connect(db_path)
+        # A small pool of hot slots so that most attempts collide
+        hot_slots = [row[0] for row in conn.execute(
+            "SELECT id FROM slots WHERE is_available = 1 ORDER BY id LIMIT 400"
+        )]
+        conn.close()
+
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def worker(worker_id: int):
+            rng = random.Random(worker_id)
+            local = Counter()
+            for attempt in range(attempts_per_thread):
+                try:
+                    engine.book(rng.choice(hot_slots), f"Patient {worker_id}-{attempt}", "p@example.com")
+                    local["booked"] += 1
+                except SlotUnavailableError:
+                    local["rejected"] += 1
+                except BookingBusyError:
+                    local["busy"] += 1
+            with lock:
+                outcomes.update(local)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads_count)]
+        start = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        conn = sqlite3.connect(db_path)
+        per_slot = conn.execute(
+            "SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM appointments WHERE status = 'booked' GROUP BY slot_id)"
+        ).fetchone()[0]
+        appointments = conn.execute("SELECT COUNT(*) FROM appointments").fetchone()[0]
+        unique_ids = conn.execute("SELECT COUNT(DISTINCT confirmation_id) FROM appointments").fetchone()[0]
+        released = conn.execute(
+            f"SELECT COUNT(*) FROM slots WHERE is_available = 1 AND id IN ({','.join(map(str, hot_slots))})"
+        ).fetchone()[0]
+        conn.close()
+
+        total = sum(outcomes.values())
+        print(f"Attempts: {total} from {threads_count} threads in {elapsed:.2f}s ({total / elapsed:.0f} attempts/s)")
+        print(f"Booked: {outcomes['booked']}  Rejected: {outcomes['rejected']}  Busy: {outcomes['busy']}")
+        print(f"Appointments persisted: {appointments}  Unique confirmation IDs: {unique_ids}")
+        print(f"Max active appointments per slot: {per_slot}")
+
+        assert per_slot == 1, "double booking detected"
+        assert appointments == outcomes["booked"] == unique_ids
+        assert outcomes["booked"] + released == len(hot_slots)
+        print("✅ Zero double bookings")
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
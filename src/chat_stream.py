@@ -0,0 +1,239 @@
+"""
+Chat Streaming
+Turns LangChain agent runs into incremental chat events (agent steps, token deltas, final answer)
+Events are plain dicts with an "event" key; format_sse() encodes them as server-sent events
+"""
+
+import ast
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional
+
+# Longest tool input / output excerpt forwarded to the browser
+STEP_PREVIEW_CHARS = 300
+
+# LangChain tools whose input is the SQL statement being executed
+SQL_TOOLS = {"sql_db_query", "sql_db_query_checker"}
+
+# Runs tagged with this (e.g. a model writing SQL) are not streamed as answer tokens
+NO_STREAM_TAG = "nostream"
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """
+    Encode an event dict as one server-sent event frame
+
+    Args:
+        event: Dict with an "event" name; the remaining keys become the JSON data
+
+    Returns:
+        "event: <name>\\ndata: <json>\\n\\n"
+    """
+    data = {key: value for key, value in event.items() if key != "event"}
+    return f"event: {event['event']}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _preview(value: Any) -> str:
+    text = value if isinstance(value, str) else str(value)
+    return text if len(text) <= STEP_PREVIEW_CHARS else text[:STEP_PREVIEW_CHARS] + "..."
+
+
+def _tool_input(value: Any) -> Any:
+    """Unwrap {"query": ...} / {"input": ...} tool arguments to the bare string"""
+    if isinstance(value, dict) and len(value) == 1:
+        return next(iter(value.values()))
+    return value
+
+
+def count_rows(output: Any) -> Optional[int]:
+    """
+    Number of rows in a SQL tool result, or None if it is not a row list
+
+    SQLDatabase.run() returns str(list_of_tuples) ("" when nothing matched)
+    """
+    if isinstance(output, (list, tuple)):
+        return len(output)
+    text = getattr(output, "content", output)
+    if not isinstance(text, str):
+        return None
+    text = text.strip()
+    if not text:
+        return 0
+    if not text.startswith("["):
+        return None
+    try:
+        rows = ast.literal_eval(text)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        # datetime/Decimal reprs are not literals; count top-level tuples instead
+        return text.count("), (") + 1 if text.startswith("[(") else None
+    return len(rows) if isinstance(rows, list) else None
+
+
+async def stream_agent_events(
+    agent_executor: Any,
+    payload: Dict[str, Any],
+    config: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run an AgentExecutor with astream_events and translate what it reports
+
+    Args:
+        agent_executor: LangChain runnable supporting astream_events
+        payload: Executor input
+        config: Optional RunnableConfig (e.g. the agent's callbacks)
+
+    Yields:
+        {"event": "step", "stage": "tool_start", "tool", "input"[, "sql"]}
+        {"event": "step", "stage": "tool_end", "tool", "output"[, "rows"]}
+        {"event": "token", "delta"} for each streamed model chunk with text
+        {"event": "final", "output"} once, when the executor finishes
+    """
+    root_run_id = None
+    tokens = []
+    output = None
+
+    async for event in agent_executor.astream_events(payload, config=config, version="v2"):
+        kind = event["event"]
+        data = event.get("data", {})
+        if root_run_id is None:
+            root_run_id = event.get("run_id")
+
+        if kind == "on_chat_model_stream":
+            if NO_STREAM_TAG in event.get("tags", ()):
+                continue
+            delta = getattr(data.get("chunk"), "content", None)
+            if isinstance(delta, str) and delta:
+                tokens.append(delta)
+                yield {"event": "token", "delta": delta}
+
+        elif kind == "on_tool_start":
+            step = {"event": "step", "stage": "tool_start", "tool": event.get("name"),
+                    "input": _preview(_tool_input(data.get("input")))}
+            if event.get("name") in SQL_TOOLS:
+                step["sql"] = _tool_input(data.get("input"))
+            yield step
+
+        elif kind == "on_tool_end":
+            step = {"event": "step", "stage": "tool_end", "tool": event.get("name"),
+                    "output": _preview(data.get("output"))}
+            if event.get("name") == "sql_db_query":
+                step["rows"] = count_rows(data.get("output"))
+            yield step
+
+        elif kind == "on_chain_end" and event.get("run_id") == root_run_id:
+            result = data.get("output")
+            output = result.get("output") if isinstance(result, dict) else result
+
+    if output is None:
+        output = "".join(tokens) or "No response generated"
+    yield {"event": "final", "output": output if isinstance(output, str) else str(output)}
+
+
+async def stream_cached(
+    cache: Any,
+    namespace: str,
+    query: str,
+    version: Hashable,
+    run: Callable[[], AsyncIterator[Dict[str, Any]]],
+    cacheable: bool = True
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream an agent run through the shared response cache
+
+    A cached answer is replayed as a single token delta; a fresh run streams
+    normally and its final answer is stored for later requests
+
+    Args:
+        cache: ResponseCache
+        namespace: Cache partition (agent name and model)
+        query: Raw user query
+        version: Data version for the cache entry
+        run: Zero-argument callable returning the live event stream
+        cacheable: False to bypass the cache (e.g. bookings)
+
+    Yields:
+        The run's events; the "final" event carries cached=True/False
+    """
+    if cacheable:
+        cached = cache.get(namespace, query, version)
+        if cached is not None:
+            yield {"event": "token", "delta": cached}
+            yield {"event": "final", "output": cached, "cached": True}
+            return
+
+    async for event in run():
+        if event["event"] == "final":
+            if cacheable:
+                cache.put(namespace, query, event["output"], version)
+            event = {**event, "cached": False}
+        yield event
+
+
+async def single_response(compute: Callable[[], Awaitable[str]]) -> AsyncIterator[Dict[str, Any]]:
+    """Wrap a non-streaming answer as one token delta plus the final event"""
+    output = await compute()
+    yield {"event": "token", "delta": output}
+    yield {"event": "final", "output": output, "cached": False}
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import asyncio
+    import uuid
+    from types import SimpleNamespace
+
+    class ReplayExecutor:
+        """Replays a recorded astream_events sequence of an SQL agent run"""
+
+        def __init__(self, answer_tokens: int, rows: int):
+            self.answer_tokens = answer_tokens
+            self.rows = rows
+
+        async def astream_events(self, payload, config=None, version="v2"):
+            root = str(uuid.uuid4())
+            yield {"event": "on_chain_start", "run_id": root, "name": "AgentExecutor", "data": {"input": payload}}
+            sql = "SELECT hospital_name, phone FROM emergency WHERE zip_code = '35004' LIMIT 10"
+            yield {"event": "on_tool_start", "run_id": "t1", "name": "sql_db_query", "data": {"input": {"query": sql}}}
+            result = str([(f"Hospital {i}", f"555-01{i:02d}") for i in range(self.rows)])
+            yield {"event": "on_tool_end", "run_id": "t1", "name": "sql_db_query", "data": {"output": result}}
+            for i in range(self.answer_tokens):
+                yield {"event": "on_chat_model_stream", "run_id": "m1", "name": "ChatOpenAI",
+                       "data": {"chunk": SimpleNamespace(content=f" tok{i}")}}
+            answer = "".join(f" tok{i}" for i in range(self.answer_tokens))
+            yield {"event": "on_chain_end", "run_id": root, "name": "AgentExecutor", "data": {"output": {"output": answer}}}
+
+    async def drain(executor) -> Dict[str, Any]:
+        first_token_ms = None
+        frames = 0
+        start = time.perf_counter()
+        async for event in stream_agent_events(executor, {"input": "emergency near 35004"}):
+            format_sse(event)
+            frames += 1
+            if event["event"] == "token" and first_token_ms is None:
+                first_token_ms = (time.perf_counter() - start) * 1000
+            if event["event"] == "step" and event["stage"] == "tool_end":
+                rows = event["rows"]
+            if event["event"] == "final":
+                output = event["output"]
+        return {"frames": frames, "rows": rows, "output": output, "first_token_ms": first_token_ms}
+
+    print("\n" + "="*80)
+    print("CHAT STREAM EVENT TRANSLATION")
+    print("="*80)
+
+    summary = asyncio.run(drain(ReplayExecutor(answer_tokens=200, rows=7)))
+    print(f"frames={summary['frames']}  rows={summary['rows']}  answer chars={len(summary['output'])}")
+    assert summary["rows"] == 7
+    assert count_rows("") == 0 and count_rows("Error: no such table") is None
+    assert count_rows("[(datetime.date(2024, 1, 1), 3), (datetime.date(2024, 1, 2), 4)]") == 2
+
+    runs = 200
+    start = time.perf_counter()
+    for _ in range(runs):
+        asyncio.run(drain(ReplayExecutor(answer_tokens=200, rows=7)))
+    per_run = (time.perf_counter() - start) / runs * 1000
+    per_frame = per_run / summary["frames"] * 1000
+    print(f"{runs} runs: {per_run:.2f} ms per 200-token answer ({per_frame:.1f} µs per SSE frame incl. event loop)")
+    print(format_sse({"event": "step", "stage": "tool_start", "tool": "sql_db_query",
+                      "input": "SELECT 1", "sql": "SELECT 1"}).strip())
+    print("\n✅ Agent events translate to SSE frames with negligible overhead next to model latency")
@@ -0,0 +1,169 @@
+"""
+Concurrency Helpers
+Bounded thread pool for blocking work started from async request handlers
+Keeps slow synchronous calls (sync-only tools, agent construction, LLM fallbacks) off the event loop
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from src.constants import AGENT_EXECUTOR_WORKERS
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide bounded executor (AGENT_EXECUTOR_WORKERS threads)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=AGENT_EXECUTOR_WORKERS,
+                    thread_name_prefix="agent-worker"
+                )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking callable on the bounded executor and await its result
+
+    Args:
+        func: Synchronous callable
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Whatever func returns (exceptions propagate to the awaiting caller)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def install_default_executor(loop: Optional[asyncio.AbstractEventLoop] = None):
+    """
+    Make the bounded executor the loop's default
+
+    LangChain runs synchronous tools (SQL queries, the pandas REPL) through
+    run_in_executor(None, ...) during ainvoke; this caps how many run at once
+    """
+    (loop or asyncio.get_running_loop()).set_default_executor(get_executor())
+
+
+class TaskOutcome(NamedTuple):
+    """Result of one call in a fan-out"""
+    status: str         # 'ok', 'timeout' or 'error'
+    value: Any          # the call's result, or the error message
+    elapsed_ms: float
+
+
+async def _timed(key: str, call: Callable[[], Awaitable[Any]], timeout: float) -> Tuple[str, TaskOutcome]:
+    start = time.perf_counter()
+    try:
+        value = await asyncio.wait_for(call(), timeout=timeout)
+        status = "ok"
+    except asyncio.TimeoutError:
+        value, status = f"No answer within {timeout:.0f}s", "timeout"
+    except Exception as e:
+        value, status = str(e), "error"
+    return key, TaskOutcome(status, value, (time.perf_counter() - start) * 1000)
+
+
+async def gather_with_timeouts(
+    calls: Dict[str, Callable[[], Awaitable[Any]]],
+    timeout: float
+) -> Dict[str, TaskOutcome]:
+    """
+    Run coroutine factories concurrently, each under its own timeout
+
+    A slow or failing call never cancels or fails the others, so the total
+    wait is the slowest call (capped at `timeout`) rather than the sum
+
+    Args:
+        calls: Key -> zero-argument async callable
+        timeout: Seconds each call may take before it is cancelled
+
+    Returns:
+        Key -> TaskOutcome, in the order of `calls`
+    """
+    results = dict(await asyncio.gather(*(_timed(key, call, timeout) for key, call in calls.items())))
+    return {key: results[key] for key in calls}
+
+
+async def iter_with_timeouts(
+    calls: Dict[str, Callable[[], Awaitable[Any]]],
+    timeout: float
+) -> AsyncIterator[Tuple[str, TaskOutcome]]:
+    """
+    Like gather_with_timeouts(), but yields (key, outcome) as each call finishes
+
+    Pending calls are cancelled if the consumer stops iterating early
+    """
+    tasks = [asyncio.ensure_future(_timed(key, call, timeout)) for key, call in calls.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# Benchmark: sequential vs concurrent fan-out over simulated agents
+if __name__ == "__main__":
+    async def simulated_agent(seconds: float, fail: bool = False) -> str:
+        await asyncio.sleep(seconds)
+        if fail:
+            raise RuntimeError("agent unavailable")
+        return f"answered in {seconds:.1f}s"
+
+    latencies = {"doctor": 0.6, "emergency": 0.4, "diagnostic": 0.8, "hospital": 0.3}
+
+    async def main():
+        start = time.perf_counter()
+        for seconds in latencies.values():
+            await simulated_agent(seconds)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        outcomes = await gather_with_timeouts(
+            {name: functools.partial(simulated_agent, seconds) for name, seconds in latencies.items()},
+            timeout=5.0
+        )
+        concurrent = time.perf_counter() - start
+
+        # One agent hangs and one fails: the others still answer, bounded by the timeout
+        start = time.perf_counter()
+        degraded = await gather_with_timeouts(
+            {
+                "doctor": functools.partial(simulated_agent, 0.3),
+                "emergency": functools.partial(simulated_agent, 30.0),
+                "diagnostic": functools.partial(simulated_agent, 0.1, True),
+            },
+            timeout=1.0
+        )
+        bounded = time.perf_counter() - start
+
+        order = [key async for key, _ in iter_with_timeouts(
+            {name: functools.partial(simulated_agent, seconds) for name, seconds in latencies.items()},
+            timeout=5.0
+        )]
+        return sequential, concurrent, outcomes, bounded, degraded, order
+
+    print("\n" + "="*80)
+    print("AGENT FAN-OUT BENCHMARK")
+    print("="*80)
+    sequential, concurrent, outcomes, bounded, degraded, order = asyncio.run(main())
+    print(f"Sequential : {sequential:.2f}s (sum of agent latencies)")
+    print(f"Concurrent : {concurrent:.2f}s (slowest agent {max(latencies.values()):.1f}s)")
+    print(f"Completion order: {order}")
+    print(f"With a hung and a failing agent (1s timeout): {bounded:.2f}s")
+    for name, outcome in degraded.items():
+        print(f"  {name:<10} {outcome.status:<8} {outcome.elapsed_ms:7.0f} ms  {outcome.value}")
+    assert all(outcome.status == "ok" for outcome in outcomes.values())
+    print(f"\n✅ Fan-out latency is the slowest agent ({concurrent:.2f}s) instead of the sum ({sequential:.2f}s)")
@@ -0,0 +1,421 @@
+"""
+Condition Recommender
+Local condition -> lab test / health package table joined against the lab catalog
+Serves GET /api/tests/condition/{condition}; the LLM is consulted (and cached) only for unknown conditions
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from src.constants import CONDITION_ANSWER_CACHE_SIZE, CONDITION_ANSWER_TTL_SECONDS
+from src.lab_catalog import LabCatalog, slugify
+from src.text_index import TextIndex, tokenize
+
+# Curated conditions: label, synonyms users type, and the catalog tests/packages that cover them.
+# Packages in the lab-test CSV that no entry names are added as conditions of their own.
+CONDITIONS = {
+    "diabetes": {
+        "label": "Diabetes",
+        "synonyms": ["diabetic", "blood sugar", "high blood sugar", "hyperglycemia", "prediabetes",
+                     "type 1 diabetes", "type 2 diabetes", "insulin resistance", "glucose"],
+        "tests": ["Blood Test", "Cholesterol Test"],
+        "packages": ["Diabetes Management"],
+    },
+    "heart-disease": {
+        "label": "Heart disease",
+        "synonyms": ["heart", "cardiac", "heart attack", "chest pain", "coronary artery disease",
+                     "arrhythmia", "palpitations", "heart failure", "hypertension", "high blood pressure"],
+        "tests": ["ECG", "Cholesterol Test", "Blood Test"],
+        "packages": ["Heart Care Package"],
+    },
+    "high-cholesterol": {
+        "label": "High cholesterol",
+        "synonyms": ["cholesterol", "hyperlipidemia", "lipids", "triglycerides"],
+        "tests": ["Cholesterol Test", "Blood Test"],
+        "packages": ["Heart Care Package"],
+    },
+    "cancer": {
+        "label": "Cancer",
+        "synonyms": ["tumor", "tumour", "oncology", "lump", "malignancy", "cancer screening"],
+        "tests": ["CT Scan", "MRI Scan", "Ultrasound", "Blood Test"],
+        "packages": ["Cancer Screening"],
+    },
+    "womens-health": {
+        "label": "Women's health",
+        "synonyms": ["pregnancy", "prenatal", "gynecology", "pcos", "menopause", "breast", "womens wellness"],
+        "tests": ["Ultrasound", "Blood Test"],
+        "packages": ["Women's Wellness Package"],
+    },
+    "bone-and-joint": {
+        "label": "Bone and joint problems",
+        "synonyms": ["orthopedic", "fracture", "broken bone", "arthritis", "joint pain", "back pain",
+                     "knee pain", "osteoporosis", "sports injury"],
+        "tests": ["X-Ray", "MRI Scan"],
+        "packages": ["Orthopedic Package"],
+    },
+    "general-checkup": {
+        "label": "General health checkup",
+        "synonyms": ["checkup", "check up", "annual physical", "routine checkup", "preventive", "wellness",
+                     "full body checkup"],
+        "tests": ["Blood Test", "Cholesterol Test", "ECG"],
+        "packages": ["Full Body Checkup"],
+    },
+    "anemia": {
+        "label": "Anemia",
+        "synonyms": ["anaemia", "low iron", "iron deficiency", "fatigue", "low hemoglobin"],
+        "tests": ["Blood Test"],
+        "packages": [],
+    },
+    "stroke": {
+        "label": "Stroke and neurological symptoms",
+        "synonyms": ["headache", "migraine", "seizure", "dizziness", "numbness", "head injury"],
+        "tests": ["MRI Scan", "CT Scan"],
+        "packages": [],
+    },
+    "respiratory": {
+        "label": "Lung and breathing problems",
+        "synonyms": ["pneumonia", "cough", "asthma", "copd", "chest infection", "shortness of breath", "lung"],
+        "tests": ["X-Ray", "CT Scan"],
+        "packages": [],
+    },
+    "abdominal": {
+        "label": "Abdominal problems",
+        "synonyms": ["abdominal pain", "stomach pain", "gallstones", "kidney stones", "liver disease",
+                     "kidney disease"],
+        "tests": ["Ultrasound", "CT Scan", "Blood Test"],
+        "packages": [],
+    },
+}
+
+# Query words ignored when judging how much of a query a fuzzy match explains
+_STOPWORDS = {"a", "an", "the", "of", "for", "and", "or", "my", "with", "in", "to", "i", "have",
+              "what", "which", "test", "tests", "lab", "labs", "recommended"}
+# Words that count toward coverage but cannot justify a match on their own
+_GENERIC = {"pain", "disease", "problem", "problems", "issue", "issues", "condition", "health",
+            "high", "low", "chronic", "screening"}
+
+MIN_MATCH_COVERAGE = 0.5
+
+
+def normalize_condition(condition: str) -> str:
+    """Lowercase, punctuation-free form used as match and cache key"""
+    return " ".join(tokenize(condition))
+
+
+class ConditionRecommender:
+    """
+    Condition -> recommended lab tests, packages and offering hospitals
+
+    Features:
+    - Curated condition table with synonyms, seeded with every Health Package
+      in the lab-test CSV
+    - Exact synonym lookup, then typo-tolerant matching through TextIndex with
+      a coverage check so loose one-word overlaps are not accepted
+    - Recommendations joined against LabCatalog's inverted indexes (optionally
+      per state) to list offering hospitals
+    - Conditions the table does not cover fall back to the LLM; answers are
+      cached (LRU with TTL) and stale entries are served while being
+      refreshed in the background
+    """
+
+    def __init__(
+        self,
+        lab_catalog: Optional[LabCatalog] = None,
+        answer_fn: Optional[Callable[[str], Dict[str, Any]]] = None,
+        answer_ttl: float = CONDITION_ANSWER_TTL_SECONDS,
+        answer_cache_size: int = CONDITION_ANSWER_CACHE_SIZE
+    ):
+        """
+        Initialize Condition Recommender
+
+        Args:
+            lab_catalog: Shared LabCatalog; created if omitted
+            answer_fn: Callable returning an agent-style result dict
+                ({"success", "output", "error"}) for an unknown condition
+            answer_ttl: Seconds before a cached LLM answer is refreshed
+            answer_cache_size: Maximum number of cached LLM answers
+        """
+        self.catalog = lab_catalog or LabCatalog()
+        self.answer_fn = answer_fn
+        self.answer_ttl = answer_ttl
+        self.answer_cache_size = answer_cache_size
+
+        self._lock = threading.Lock()
+        self._version = None
+        self._conditions: Dict[str, Dict[str, Any]] = {}
+        self._phrases: Dict[str, str] = {}
+        self._condition_terms: Dict[str, FrozenSet[str]] = {}
+        self._keys: List[str] = []
+        self._index: Optional[TextIndex] = None
+
+        self._answers: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._answers_lock = threading.Lock()
+        self._refreshing = set()
+
+        self._prepare()
+
+    def _prepare(self):
+        """(Re)build the condition table and index if the catalog was rebuilt"""
+        snapshot = self.catalog.snapshot()
+        if self._version == snapshot.version:
+            return
+
+        with self._lock:
+            if self._version == snapshot.version:
+                return
+
+            conditions = {key: dict(entry) for key, entry in CONDITIONS.items()}
+            covered = {slugify(name) for entry in CONDITIONS.values() for name in entry["packages"]}
+            for key, package in snapshot.packages.items():
+                if key not in covered:
+                    conditions[key] = {"label": package["name"], "synonyms": [], "tests": [],
+                                       "packages": [package["name"]]}
+
+            phrases = {}
+            terms = {}
+            for key, entry in conditions.items():
+                names = [entry["label"]] + entry["synonyms"]
+                for name in names:
+                    phrases.setdefault(normalize_condition(name), key)
+                terms[key] = frozenset(token for name in names for token in tokenize(name))
+
+            keys = list(conditions)
+            index = TextIndex(
+                (
+                    (i, {"label": conditions[key]["label"], "synonyms": " ".join(conditions[key]["synonyms"])})
+                    for i, key in enumerate(keys)
+                ),
+                field_weights={"label": 2.0, "synonyms": 1.0},
+            )
+
+            self._conditions = conditions
+            self._phrases = phrases
+            self._condition_terms = terms
+            self._keys = keys
+            self._index = index
+            self._version = snapshot.version
+
+    def match(self, condition: str) -> Optional[Tuple[str, str]]:
+        """
+        Find the table entry for a condition
+
+        Returns:
+            (condition key, "exact" or "fuzzy"), or None if nothing matches well
+        """
+        self._prepare()
+        phrase = normalize_condition(condition)
+        if not phrase:
+            return None
+        if phrase in self._phrases:
+            return self._phrases[phrase], "exact"
+
+        tokens = [token for token in phrase.split() if token not in _STOPWORDS]
+        if not tokens:
+            return None
+        stripped = " ".join(tokens)
+        if stripped in self._phrases:
+            return self._phrases[stripped], "exact"
+
+        for doc_id, _ in self._index.search(stripped, limit=5):
+            key = self._keys[doc_id]
+            terms = self._condition_terms[key]
+            matched = [
+                token for token in tokens
+                if terms & set(self._index.expand(token, prefix=len(token) >= 4, fuzzy=True))
+            ]
+            if (
+                len(matched) / len(tokens) >= MIN_MATCH_COVERAGE
+                and any(token not in _GENERIC for token in matched)
+            ):
+                return key, "fuzzy"
+        return None
+
+    def recommend(
+        self,
+        condition: str,
+        state: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Recommend tests and packages for a condition
+
+        Args:
+            condition: Free-text condition (e.g. "diabetes", "high blood presure")
+            state: Only count and list hospitals in this state
+            limit: Page size for the hospital list
+            offset: Page offset for the hospital list
+
+        Returns:
+            Dict with source "catalog" (tests, packages, hospitals) or
+            "llm" / "llm-cache" (free-text answer); "error" is set if neither
+            could answer
+        """
+        start = time.perf_counter()
+        found = self.match(condition)
+        if found is None:
+            result = self._llm_answer(condition)
+            result["query_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            return result
+
+        key, match_type = found
+        entry = self._conditions[key]
+        # One snapshot for every lookup below, even if the catalog is rebuilt meanwhile
+        catalog = self.catalog.snapshot()
+        test_keys = [slugify(name) for name in entry["tests"] if slugify(name) in catalog.by_test]
+        package_keys = [slugify(name) for name in entry["packages"] if slugify(name) in catalog.by_package]
+
+        scope = catalog.all_offerings
+        if state and state.strip():
+            scope = catalog.by_state.get(state.strip().upper(), frozenset())
+
+        test_ids = frozenset().union(*(catalog.by_test[k] for k in test_keys)) & scope
+        package_ids = frozenset().union(*(catalog.by_package[k] for k in package_keys)) & scope
+
+        # Hospitals whose row matches both a recommended test and package come first
+        offerings = catalog.offerings
+        both = test_ids & package_ids
+        rows = sorted(
+            test_ids | package_ids,
+            key=lambda i: (i not in both, offerings[i].state, offerings[i].hospital, offerings[i].provider_id)
+        )
+        hospitals = [
+            {
+                **catalog.hospitals[offerings[i].provider_id],
+                "test": offerings[i].test if i in test_ids else None,
+                "package": offerings[i].package if i in package_ids else None,
+                "preparation": offerings[i].preparation or None,
+            }
+            for i in rows[offset:offset + limit]
+        ]
+
+        return {
+            "condition": condition,
+            "matched_condition": entry["label"],
+            "match_type": match_type,
+            "source": "catalog",
+            "tests": self.catalog.summarize_tests(test_ids, catalog),
+            "packages": [
+                {
+                    "id": k,
+                    "name": catalog.packages[k]["name"],
+                    "hospitals": len(catalog.by_package[k] & scope),
+                }
+                for k in package_keys
+            ],
+            "hospitals": hospitals,
+            "total_hospitals": len(rows),
+            "query_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def _llm_answer(self, condition: str) -> Dict[str, Any]:
+        """Cached LLM answer for a condition outside the table"""
+        cache_key = normalize_condition(condition) or condition.strip().lower()
+        base = {"condition": condition, "matched_condition": None, "match_type": None}
+
+        with self._answers_lock:
+            cached = self._answers.get(cache_key)
+            if cached is not None:
+                self._answers.move_to_end(cache_key)
+
+        if cached is not None:
+            answer, fetched_at = cached
+            stale = time.time() - fetched_at > self.answer_ttl
+            if stale:
+                self._refresh_in_background(cache_key, condition)
+            return {**base, "source": "llm-cache", "answer": answer, "stale": stale}
+
+        if self.answer_fn is None:
+            return {**base, "source": None, "error": f"No recommendations found for '{condition}'"}
+
+        answer, error = self._fetch_answer(cache_key, condition)
+        if answer is None:
+            return {**base, "source": None, "error": error}
+        return {**base, "source": "llm", "answer": answer, "stale": False}
+
+    def _fetch_answer(self, cache_key: str, condition: str) -> Tuple[Optional[str], Optional[str]]:
+        """Ask the LLM and cache a successful answer; failures are not cached"""
+        try:
+            result = self.answer_fn(condition)
+        except Exception as e:
+            return None, str(e)
+
+        if not result or not result.get("success"):
+            return None, (result or {}).get("error", "Failed to fetch recommended tests")
+
+        answer = result.get("output")
+        with self._answers_lock:
+            self._answers[cache_key] = (answer, time.time())
+            self._answers.move_to_end(cache_key)
+            while len(self._answers) > self.answer_cache_size:
+                self._answers.popitem(last=False)
+        return answer, None
+
+    def _refresh_in_background(self, cache_key: str, condition: str):
+        """Re-fetch a stale answer once; concurrent requests keep serving the cached one"""
+        if self.answer_fn is None:
+            return
+        with self._answers_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        def refresh():
+            try:
+                _, error = self._fetch_answer(cache_key, condition)
+                if error:
+                    print(f"Warning: Could not refresh recommendations for '{condition}': {error}")
+            finally:
+                with self._answers_lock:
+                    self._refreshing.discard(cache_key)
+
+        threading.Thread(target=refresh, name="condition-answer-refresh", daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        """Table size and LLM answer cache information"""
+        with self._answers_lock:
+            cached = len(self._answers)
+            refreshing = len(self._refreshing)
+        return {
+            "conditions": len(self._conditions),
+            "phrases": len(self._phrases),
+            "cached_answers": cached,
+            "refreshing": refreshing,
+        }
+
+
+# Benchmark: table lookups (exact, typo, unknown) against the catalog
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("CONDITION RECOMMENDER BENCHMARK")
+    print("="*80)
+
+    calls = []
+
+    def fake_llm(condition: str) -> Dict[str, Any]:
+        calls.append(condition)
+        time.sleep(0.05)
+        return {"success": True, "output": f"General advice for {condition}"}
+
+    recommender = ConditionRecommender(answer_fn=fake_llm)
+    print(f"stats: {recommender.stats()}")
+
+    queries = ["diabetes", "Heart Disease", "high blood presure", "diabetis", "my knee pain",
+               "orthopedic package", "stomach pain", "tinnitus", "tinnitus"]
+    for query in queries:
+        start = time.perf_counter()
+        result = recommender.recommend(query, limit=5)
+        elapsed = (time.perf_counter() - start) * 1000
+        matched = result.get("matched_condition") or "-"
+        tests = ", ".join(test["name"] for test in result.get("tests", [])) or result.get("answer") or ""
+        print(f"{query:<20} -> {matched:<26} {result['source']:<10} {elapsed:7.3f} ms  {tests}")
+
+    repeats = 500
+    for query in ("diabetes", "high blood presure"):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            recommender.recommend(query, state="CA", limit=20)
+        print(f"{query!r} (CA) x{repeats}: {(time.perf_counter() - start) / repeats * 1000:.3f} ms per call")
+    print(f"LLM calls: {len(calls)}")
@@ -24,10 +24,65 @@ if not OPENAI_API_KEY:
 DIAGNOSTIC_INFO_FILE_PATH = "data/Hospital_Information_with_Lab_Tests.csv"
 HOSPITAL_INFO_FILE_PATH = "data/Hospital_General_Information.csv"
 EMERGENCY_DATA_PATH = "data/hospitals_emergency_data.csv"
+ZIP_CENTROIDS_PATH = "data/zip_centroids.csv"
+INTENT_TRAINING_DATA_PATH = "data/intent_queries.csv"
+
+# Binary caches of parsed datasets (safe to delete; rebuilt from the CSVs)
+HOSPITAL_CACHE_DIR = "data/.cache"
 
 # Database Paths
 APPOINTMENTS_DB_PATH = "src/appointments.db"
 EMERGENCY_DB_PATH = "src/emergency.db"
+CHAT_SESSIONS_DB_PATH = "src/chat_sessions.db"
+
+# SQLite Connection Pool
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "10"))
+
+# Emergency Index
+EMERGENCY_INDEX_REFRESH_SECONDS = float(os.getenv("EMERGENCY_INDEX_REFRESH_SECONDS", "30"))
+
+# Condition -> Lab Test Recommendations (LLM answers cached for conditions not in the local table)
+CONDITION_ANSWER_TTL_SECONDS = float(os.getenv("CONDITION_ANSWER_TTL_SECONDS", "86400"))
+CONDITION_ANSWER_CACHE_SIZE = int(os.getenv("CONDITION_ANSWER_CACHE_SIZE", "512"))
+
+# LLM Response Cache (shared by the agents; similarity 0 disables near-duplicate matching)
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "900"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.9"))
+
+# Chat Sessions (server-side conversation memory)
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", "2000"))
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "40"))
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "400"))
+SESSION_CONTEXT_TOKENS = int(os.getenv("SESSION_CONTEXT_TOKENS", "800"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Async Execution (threads for blocking work started from async handlers)
+AGENT_EXECUTOR_WORKERS = int(os.getenv("AGENT_EXECUTOR_WORKERS", "16"))
+
+# Agent Registry: seconds a failed agent construction is remembered before it is retried
+AGENT_RETRY_SECONDS = float(os.getenv("AGENT_RETRY_SECONDS", "30"))
+
+# Compound chat questions: seconds each agent may take before its part is given up
+FANOUT_AGENT_TIMEOUT_SECONDS = float(os.getenv("FANOUT_AGENT_TIMEOUT_SECONDS", "60"))
+
+# SQL Agents (doctor, emergency): loop budget, rows per query, sample rows in the embedded schema
+# and the direct-SQL fast path (one call writes the query, one call answers from its rows)
+SQL_AGENT_MAX_ITERATIONS = int(os.getenv("SQL_AGENT_MAX_ITERATIONS", "5"))
+SQL_AGENT_MAX_EXECUTION_SECONDS = float(os.getenv("SQL_AGENT_MAX_EXECUTION_SECONDS", "45"))
+SQL_AGENT_TOP_K = int(os.getenv("SQL_AGENT_TOP_K", "20"))
+SQL_SCHEMA_SAMPLE_ROWS = int(os.getenv("SQL_SCHEMA_SAMPLE_ROWS", "3"))
+SQL_FAST_PATH_ENABLED = os.getenv("SQL_FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Agent Tracing (recent traces kept in memory; set TRACE_JSONL_PATH to also append them to a file)
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "500"))
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "")
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "200"))
+# /debug/traces endpoints: off unless enabled, and then only answered for localhost clients
+DEBUG_TRACES_ENABLED = os.getenv("DEBUG_TRACES_ENABLED", "false").lower() in ("1", "true", "yes")
 
 # API Configuration
 API_HOST = "0.0.0.0"
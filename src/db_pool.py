@@ -0,0 +1,196 @@
+"""
+SQLite Connection Pool
+Persistent, pre-configured SQLite connections shared across requests
+Avoids per-request connect cost and applies WAL mode and tuned pragmas once
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from src.constants import SQLITE_BUSY_TIMEOUT, SQLITE_POOL_SIZE
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # readers never block on a writer
+    "PRAGMA synchronous=NORMAL",    # safe with WAL, far fewer fsyncs
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",      # 8 MB page cache per connection
+    "PRAGMA mmap_size=268435456",   # memory-map up to 256 MB of the file
+)
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """No pooled connection became free within the timeout"""
+
+
+class SQLiteConnectionPool:
+    """
+    Queue-based pool of SQLite connections for one database file
+
+    Features:
+    - Connections are opened lazily up to `size` and then reused
+    - WAL mode and performance pragmas applied once per connection
+    - Autocommit mode; callers issue BEGIN/COMMIT explicitly when they need a transaction
+    - Per-connection statement cache, so repeated SQL is prepared only once
+    """
+
+    def __init__(self, db_path: str, size: int = SQLITE_POOL_SIZE, timeout: float = SQLITE_BUSY_TIMEOUT):
+        """
+        Initialize pool
+
+        Args:
+            db_path: Path to SQLite database
+            size: Maximum number of open connections
+            timeout: Seconds to wait for a free connection or for a database lock
+        """
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256
+        )
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Take a connection from the pool, opening a new one if below capacity
+
+        Raises:
+            PoolTimeoutError: If every connection stays busy for `timeout` seconds
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeoutError(f"No free connection to {self.db_path} after {self.timeout}s")
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, rolling back anything left open"""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Context manager that borrows a connection for the duration of the block"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str, size: Optional[int] = None) -> SQLiteConnectionPool:
+    """
+    Get the process-wide pool for a database file
+
+    Args:
+        db_path: Path to SQLite database
+        size: Pool size used if the pool does not exist yet
+
+    Returns:
+        Shared SQLiteConnectionPool
+    """
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = SQLiteConnectionPool(db_path, size=size or SQLITE_POOL_SIZE)
+                _pools[db_path] = pool
+    return pool
+
+
+# Benchmark: ZIP lookup with a fresh connection per request vs. the pool
+if __name__ == "__main__":
+    import os
+    import shutil
+    import tempfile
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from src.ingestion import ingest_emergency_data
+
+    print("\n" + "="*80)
+    print("SQLITE CONNECTION POOL BENCHMARK")
+    print("="*80)
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "emergency.db")
+    zip_codes = [10001, 10002, 10003, 20001, 30301, 60601, 90001, 94101, 99999]
+    sql = 'SELECT * FROM emergency_directory WHERE "Zip Code" = ?'
+    requests_count = 20000
+
+    def per_request_connect(i: int):
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(sql, (zip_codes[i % len(zip_codes)],)).fetchall()
+        conn.close()
+        return rows
+
+    try:
+        ingest_emergency_data(db_path=db_path)
+        pool = SQLiteConnectionPool(db_path, size=8)
+
+        def pooled(i: int):
+            with pool.connection() as conn:
+                return conn.execute(sql, (zip_codes[i % len(zip_codes)],)).fetchall()
+
+        for workers in (1, 8):
+            for label, lookup in (("connect per request", per_request_connect), ("pooled", pooled)):
+                start = time.perf_counter()
+                if workers == 1:
+                    for i in range(requests_count):
+                        lookup(i)
+                else:
+                    with ThreadPoolExecutor(max_workers=workers) as executor:
+                        list(executor.map(lookup, range(requests_count)))
+                elapsed = time.perf_counter() - start
+                print(f"{workers} thread(s), {label:<20}: {requests_count / elapsed:>10,.0f} requests/s")
+
+        pool.close()
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,214 @@
+"""
+Doctor Directory
+Deterministic, parameterized SQL queries over the doctors and slots tables
+Serves the doctor listing endpoints without going through the LLM agent
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from src.constants import APPOINTMENTS_DB_PATH
+from src.db_pool import get_pool
+from src.ingestion import ingest_doctor_data
+
+
+def _like_substring(term: str) -> str:
+    """LIKE pattern matching `term` literally anywhere (use with ESCAPE '\\')"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class DoctorDirectory:
+    """
+    Structured query engine for doctors and appointment slots
+
+    Features:
+    - Search doctors by name, specialization and availability
+    - Look up a doctor's slots by date and availability
+    - Parameterized SQL backed by indexes on the appointments database
+    - Returns structured rows instead of LLM-generated text
+    """
+
+    def __init__(
+        self,
+        doctors_csv_path: str = "data/doctors_info_data.csv",
+        slots_csv_path: str = "data/doctors_slots_data.csv",
+        db_path: str = APPOINTMENTS_DB_PATH
+    ):
+        """
+        Initialize Doctor Directory
+
+        Args:
+            doctors_csv_path: Path to doctors CSV file
+            slots_csv_path: Path to slots CSV file
+            db_path: Path to SQLite database
+        """
+        self.db_path = db_path
+
+        # Make sure tables and indexes exist (no-op when the CSVs are unchanged)
+        ingest_doctor_data(doctors_csv_path, slots_csv_path, db_path)
+        self.pool = get_pool(db_path)
+
+    def search_doctors(
+        self,
+        search: Optional[str] = None,
+        specialty: Optional[str] = None,
+        available: Optional[bool] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Search doctors
+
+        Args:
+            search: Case-insensitive substring of the doctor's name
+            specialty: Exact specialization (case-insensitive)
+            available: True for doctors with open slots, False for fully booked doctors
+            limit: Maximum number of doctors returned
+            offset: Number of doctors to skip (pagination)
+
+        Returns:
+            Dict with doctors list and total match count
+        """
+        conditions = []
+        params: List[Any] = []
+
+        if search and search.strip():
+            conditions.append("d.name LIKE ? ESCAPE '\\'")
+            params.append(_like_substring(search.strip()))
+
+        if specialty and specialty.strip():
+            conditions.append("d.specialization = ? COLLATE NOCASE")
+            params.append(specialty.strip())
+
+        if available is not None:
+            exists = "EXISTS (SELECT 1 FROM slots s WHERE s.doctor_id = d.id AND s.is_available = 1)"
+            conditions.append(exists if available else f"NOT {exists}")
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self.pool.connection() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM doctors d {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"""
+                SELECT d.id, d.name, d.specialization, d.contact,
+                       (SELECT COUNT(*) FROM slots s
+                        WHERE s.doctor_id = d.id AND s.is_available = 1) AS available_slots,
+                       (SELECT MIN(s.datetime) FROM slots s
+                        WHERE s.doctor_id = d.id AND s.is_available = 1) AS next_available
+                FROM doctors d
+                {where}
+                ORDER BY d.name
+                LIMIT ? OFFSET ?
+                """,
+                params + [limit, offset]
+            ).fetchall()
+
+        doctors = [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "specialization": row["specialization"],
+                "contact": row["contact"],
+                "available_slots": row["available_slots"],
+                "available": row["available_slots"] > 0,
+                "next_available": row["next_available"],
+            }
+            for row in rows
+        ]
+
+        return {"doctors": doctors, "total": total}
+
+    def get_doctor(self, doctor_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get a single doctor by ID
+
+        Args:
+            doctor_id: Doctor's ID
+
+        Returns:
+            Doctor record, or None if not found
+        """
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT id, name, specialization, contact FROM doctors WHERE id = ?",
+                (doctor_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_slots(
+        self,
+        doctor_id: int,
+        date: Optional[str] = None,
+        available_only: bool = True,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Get appointment slots for a doctor
+
+        Args:
+            doctor_id: Doctor's ID
+            date: Optional day to restrict to (YYYY-MM-DD)
+            available_only: Only return slots that can still be booked
+            limit: Maximum number of slots returned
+            offset: Number of slots to skip (pagination)
+
+        Returns:
+            Dict with slots list, total match count and database time in ms
+
+        Raises:
+            ValueError: If date is not in YYYY-MM-DD format
+        """
+        # Keep every predicate on the (doctor_id, is_available, datetime) index;
+        # "IN (0, 1)" lets the datetime range use the index when availability is not filtered
+        conditions = ["doctor_id = ?", "is_available = 1" if available_only else "is_available IN (0, 1)"]
+        params: List[Any] = [doctor_id]
+
+        if date:
+            day = datetime.strptime(date.strip(), "%Y-%m-%d")
+            conditions.append("datetime >= ? AND datetime < ?")
+            params += [day.strftime("%Y-%m-%dT00:00:00"), (day + timedelta(days=1)).strftime("%Y-%m-%dT00:00:00")]
+
+        where = " AND ".join(conditions)
+
+        with self.pool.connection() as conn:
+            start = time.perf_counter()
+            total = conn.execute(f"SELECT COUNT(*) FROM slots WHERE {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"""
+                SELECT id, datetime, is_available FROM slots
+                WHERE {where}
+                ORDER BY datetime
+                LIMIT ? OFFSET ?
+                """,
+                params + [limit, offset]
+            ).fetchall()
+            db_time_ms = (time.perf_counter() - start) * 1000
+
+        slots = []
+        for row in rows:
+            slot_time = datetime.strptime(row["datetime"], "%Y-%m-%dT%H:%M:%S")
+            slots.append({
+                "id": row["id"],
+                "datetime": row["datetime"],
+                "date": slot_time.strftime("%Y-%m-%d"),
+                "time": slot_time.strftime("%I:%M %p").lstrip("0"),
+                "available": bool(row["is_available"]),
+            })
+
+        return {"slots": slots, "total": total, "db_time_ms": round(db_time_ms, 3)}
+
+    def list_specialties(self) -> List[str]:
+        """
+        Get the distinct specializations present in the doctors table
+
+        Returns:
+            Sorted list of specializations
+        """
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT specialization FROM doctors ORDER BY specialization"
+            ).fetchall()
+        return [row[0] for row in rows]
@@ -0,0 +1,133 @@
+"""
+Emergency Index
+In-memory ZIP code index of emergency facilities built from the emergency CSV
+Answers emergency lookups without touching disk, SQLite or an LLM
+"""
+
+import csv
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from src.constants import EMERGENCY_DATA_PATH, EMERGENCY_INDEX_REFRESH_SECONDS
+
+# (hospital name, ambulance available)
+Facility = Tuple[str, bool]
+
+
+def normalize_zip(zip_code: Any) -> str:
+    """Normalize a ZIP code to its 5-digit string form (e.g. 2134 -> "02134")"""
+    return str(zip_code).strip().split("-")[0].zfill(5)
+
+
+class EmergencyIndex:
+    """
+    Read-optimized ZIP code -> emergency facilities index
+
+    Features:
+    - Dict of ZIP code to compact (hospital name, ambulance flag) tuples
+    - Duplicate hospital rows per ZIP are merged (ambulance if any row says so)
+    - Background watcher rebuilds the index when the CSV changes
+    - Rebuilds swap in a new dict atomically; lookups never see a partial index
+    """
+
+    def __init__(
+        self,
+        csv_path: str = EMERGENCY_DATA_PATH,
+        refresh_interval: float = EMERGENCY_INDEX_REFRESH_SECONDS,
+        watch: bool = True
+    ):
+        """
+        Initialize Emergency Index
+
+        Args:
+            csv_path: Path to emergency data CSV file
+            refresh_interval: Seconds between checks for a changed CSV
+            watch: Start the background refresh thread
+        """
+        self.csv_path = csv_path
+        self.refresh_interval = refresh_interval
+        self._index: Dict[str, Tuple[Facility, ...]] = {}
+        self._fingerprint: Optional[Tuple[int, int]] = None
+        self.version = 0
+        self.loaded_at: Optional[float] = None
+        self._stop = threading.Event()
+
+        self.refresh_if_changed()
+
+        if watch and refresh_interval > 0:
+            watcher = threading.Thread(target=self._watch, name="emergency-index-watcher", daemon=True)
+            watcher.start()
+
+    def _build(self) -> Dict[str, Tuple[Facility, ...]]:
+        """Parse the CSV into a fresh ZIP -> facilities dict"""
+        merged: Dict[str, Dict[str, bool]] = {}
+        with open(self.csv_path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                zip_code = normalize_zip(record["Zip Code"])
+                name = record["Hospital Name"].strip()
+                ambulance = record["Ambulance Available"].strip().lower().startswith("y")
+                facilities = merged.setdefault(zip_code, {})
+                facilities[name] = facilities.get(name, False) or ambulance
+
+        return {
+            zip_code: tuple(facilities.items())
+            for zip_code, facilities in merged.items()
+        }
+
+    def refresh_if_changed(self) -> bool:
+        """
+        Rebuild the index if the CSV's size or modification time changed
+
+        Returns:
+            True if the index was rebuilt
+        """
+        stat = os.stat(self.csv_path)
+        fingerprint = (stat.st_size, stat.st_mtime_ns)
+        if fingerprint == self._fingerprint:
+            return False
+
+        index = self._build()
+        # Single reference assignment: readers see either the old or the new index
+        self._index = index
+        self._fingerprint = fingerprint
+        self.version += 1
+        self.loaded_at = time.time()
+        print(f"✅ Emergency index v{self.version}: {len(index)} ZIP codes, "
+              f"{sum(len(f) for f in index.values())} facilities")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh_if_changed()
+            except Exception as e:
+                # Keep serving the last good index
+                print(f"Warning: Could not refresh emergency index: {e}")
+
+    def stop(self):
+        """Stop the background watcher"""
+        self._stop.set()
+
+    def lookup(self, zip_code: Any) -> Tuple[Facility, ...]:
+        """
+        Get the emergency facilities registered for a ZIP code
+
+        Args:
+            zip_code: ZIP code (string or int)
+
+        Returns:
+            Tuple of (hospital name, ambulance available) pairs; empty if none
+        """
+        return self._index.get(normalize_zip(zip_code), ())
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size and version information"""
+        index = self._index
+        return {
+            "version": self.version,
+            "zip_codes": len(index),
+            "facilities": sum(len(f) for f in index.values()),
+            "loaded_at": self.loaded_at,
+        }
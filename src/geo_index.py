@@ -0,0 +1,461 @@
+"""
+Geo Index
+Nearest-neighbor search for emergency-capable facilities by ZIP code
+Hospitals are placed at the coordinates in their CSV, everything else at offline ZIP
+centroids, and facilities are indexed in a KD-tree over unit-sphere vectors
+"""
+
+import csv
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.constants import EMERGENCY_DATA_PATH, HOSPITAL_INFO_FILE_PATH, ZIP_CENTROIDS_PATH
+from src.emergency_index import normalize_zip
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_MILE = 1.609344
+
+# Location resolution, best first ("exact" = the facility's own coordinates)
+PRECISION_LEVELS = ("exact", "zip5", "zip3", "state")
+
+# (latitude, longitude, precision)
+Location = Tuple[float, float, str]
+
+# Trailing "(lat, lon)" of the hospital CSV's Location column (street address first)
+_COORDINATES = re.compile(r"\(\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*\)\s*$")
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres between two (lat, lon) points in degrees"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    h = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def parse_coordinates(location: str) -> Optional[Tuple[float, float]]:
+    """
+    (latitude, longitude) from a hospital Location cell, or None when it has no
+    coordinates or they are out of range
+    """
+    match = _COORDINATES.search(location or "")
+    if not match:
+        return None
+    latitude, longitude = float(match.group(1)), float(match.group(2))
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def to_unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    """Project a (lat, lon) point onto the unit sphere; chord length is monotonic in arc length"""
+    phi, lam = math.radians(latitude), math.radians(longitude)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+class KDTree:
+    """
+    Static 3-d tree over points stored in a flat, in-place partitioned list
+
+    Features:
+    - Median split on the axis with the widest spread
+    - Small leaves are scanned linearly
+    - k-nearest and fixed-radius queries on squared Euclidean distance
+    """
+
+    LEAF_SIZE = 8
+
+    def __init__(self, points: Sequence[Tuple[float, float, float]]):
+        """
+        Build the tree
+
+        Args:
+            points: 3-d points; query results refer to positions in this sequence
+        """
+        self._points = [(p[0], p[1], p[2], i) for i, p in enumerate(points)]
+        self._axes: Dict[int, int] = {}
+        self._build(0, len(self._points))
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _build(self, lo: int, hi: int):
+        if hi - lo <= self.LEAF_SIZE:
+            return
+        chunk = self._points[lo:hi]
+        spreads = [max(p[a] for p in chunk) - min(p[a] for p in chunk) for a in range(3)]
+        axis = spreads.index(max(spreads))
+        chunk.sort(key=lambda p: p[axis])
+        self._points[lo:hi] = chunk
+
+        mid = (lo + hi) // 2
+        self._axes[mid] = axis
+        self._build(lo, mid)
+        self._build(mid + 1, hi)
+
+    @staticmethod
+    def _dist2(p, q) -> float:
+        dx, dy, dz = p[0] - q[0], p[1] - q[1], p[2] - q[2]
+        return dx * dx + dy * dy + dz * dz
+
+    def nearest(self, query: Tuple[float, float, float], k: int) -> List[Tuple[float, int]]:
+        """
+        Find the k points closest to `query`
+
+        Returns:
+            (squared distance, point position) pairs, closest first
+        """
+        heap: List[Tuple[float, int]] = []  # max-heap via negated distances
+
+        def visit(lo: int, hi: int):
+            if hi - lo <= self.LEAF_SIZE:
+                for p in self._points[lo:hi]:
+                    d2 = self._dist2(p, query)
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d2, p[3]))
+                    elif d2 < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d2, p[3]))
+                return
+
+            mid = (lo + hi) // 2
+            axis = self._axes[mid]
+            p = self._points[mid]
+            d2 = self._dist2(p, query)
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, p[3]))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, p[3]))
+
+            diff = query[axis] - p[axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            visit(*near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(*far)
+
+        if k > 0 and self._points:
+            visit(0, len(self._points))
+        return sorted((-d2, i) for d2, i in heap)
+
+    def within(self, query: Tuple[float, float, float], radius2: float) -> List[Tuple[float, int]]:
+        """
+        Find every point within a squared distance of `query`
+
+        Returns:
+            (squared distance, point position) pairs, unordered
+        """
+        found: List[Tuple[float, int]] = []
+
+        def visit(lo: int, hi: int):
+            if hi - lo <= self.LEAF_SIZE:
+                for p in self._points[lo:hi]:
+                    d2 = self._dist2(p, query)
+                    if d2 <= radius2:
+                        found.append((d2, p[3]))
+                return
+
+            mid = (lo + hi) // 2
+            axis = self._axes[mid]
+            p = self._points[mid]
+            d2 = self._dist2(p, query)
+            if d2 <= radius2:
+                found.append((d2, p[3]))
+
+            diff = query[axis] - p[axis]
+            if diff <= 0 or diff * diff <= radius2:
+                visit(lo, mid)
+            if diff >= 0 or diff * diff <= radius2:
+                visit(mid + 1, hi)
+
+        if self._points:
+            visit(0, len(self._points))
+        return found
+
+
+class ZipCentroids:
+    """
+    Offline ZIP code -> approximate (latitude, longitude) resolver
+
+    Lookup falls back from the exact 5-digit ZIP to its 3-digit prefix (USPS
+    sectional center) and finally to the centroid of the ZIP's state. ZIPs and
+    prefixes missing from the table use the mean of known points inside them
+    """
+
+    def __init__(
+        self,
+        centroids_csv_path: str = ZIP_CENTROIDS_PATH,
+        zip3_states: Optional[Dict[str, str]] = None,
+        known_points: Sequence[Tuple[str, float, float]] = ()
+    ):
+        """
+        Load the centroid table
+
+        Args:
+            centroids_csv_path: CSV with key, level, latitude, longitude, label columns
+            zip3_states: ZIP prefix -> state code, used for the state-level fallback
+            known_points: (ZIP, latitude, longitude) of geocoded places, averaged per
+                ZIP and per prefix to fill gaps in the table
+        """
+        self._centroids: Dict[str, Dict[str, Tuple[float, float]]] = {level: {} for level in PRECISION_LEVELS}
+        with open(centroids_csv_path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                level = record["level"].strip()
+                if level in self._centroids:
+                    self._centroids[level][record["key"].strip()] = (
+                        float(record["latitude"]), float(record["longitude"])
+                    )
+        self.zip3_states = dict(zip3_states or {})
+
+        for level, width in (("zip5", 5), ("zip3", 3)):
+            sums: Dict[str, List[float]] = {}
+            for zip_code, latitude, longitude in known_points:
+                total = sums.setdefault(normalize_zip(zip_code)[:width], [0.0, 0.0, 0])
+                total[0] += latitude
+                total[1] += longitude
+                total[2] += 1
+            for key, (lat_sum, lon_sum, count) in sums.items():
+                self._centroids[level].setdefault(key, (lat_sum / count, lon_sum / count))
+
+    def locate(self, zip_code: Any, state: Optional[str] = None) -> Optional[Location]:
+        """
+        Resolve a ZIP code to a centroid
+
+        Args:
+            zip_code: ZIP code (string or int)
+            state: State code, if known, for the final fallback
+
+        Returns:
+            (latitude, longitude, precision) or None if nothing matches
+        """
+        zip5 = normalize_zip(zip_code)
+        for level, key in (("zip5", zip5), ("zip3", zip5[:3])):
+            point = self._centroids[level].get(key)
+            if point:
+                return (point[0], point[1], level)
+
+        state = (state or self.zip3_states.get(zip5[:3]) or "").strip().upper()
+        point = self._centroids["state"].get(state)
+        if point:
+            return (point[0], point[1], "state")
+        return None
+
+
+class NearestFacilityIndex:
+    """
+    k-nearest emergency facility search by ZIP code
+
+    Features:
+    - Indexes hospitals with emergency services from the general hospital CSV
+      and every facility in the emergency directory CSV
+    - Hospitals are placed at the coordinates in their CSV's Location column;
+      facilities without coordinates and query ZIPs at ZIP/ZIP3/state centroids
+    - KD-tree search with haversine distances in the results
+    - Ties at the same centroid prefer facilities in the caller's ZIP, then ZIP3
+    """
+
+    def __init__(
+        self,
+        hospital_csv_path: str = HOSPITAL_INFO_FILE_PATH,
+        emergency_csv_path: str = EMERGENCY_DATA_PATH,
+        centroids_csv_path: str = ZIP_CENTROIDS_PATH
+    ):
+        """
+        Build the index
+
+        Args:
+            hospital_csv_path: Path to the general hospital information CSV
+            emergency_csv_path: Path to the emergency directory CSV
+            centroids_csv_path: Path to the ZIP centroid table
+        """
+        hospitals = self._read_hospitals(hospital_csv_path)
+        directory = self._read_emergency_directory(emergency_csv_path)
+
+        # Learn which state each ZIP prefix belongs to from the hospital data itself
+        prefix_states: Dict[str, Counter] = {}
+        for facility in hospitals:
+            prefix_states.setdefault(facility["zip_code"][:3], Counter())[facility["state"]] += 1
+        zip3_states = {prefix: states.most_common(1)[0][0] for prefix, states in prefix_states.items()}
+        known_points = [
+            (facility["zip_code"], facility["latitude"], facility["longitude"])
+            for facility in hospitals if facility["location_precision"] == "exact"
+        ]
+        self.centroids = ZipCentroids(centroids_csv_path, zip3_states, known_points)
+
+        self.facilities: List[Dict[str, Any]] = []
+        skipped = 0
+        for facility in hospitals + directory:
+            if facility["location_precision"] is None:
+                # No coordinates of its own: fall back to the ZIP's centroid
+                location = self.centroids.locate(facility["zip_code"], facility.get("state"))
+                if location is None:
+                    skipped += 1
+                    continue
+                facility["latitude"], facility["longitude"], facility["location_precision"] = location
+            self.facilities.append(facility)
+
+        self.tree = KDTree([to_unit_vector(f["latitude"], f["longitude"]) for f in self.facilities])
+
+        precision = Counter(f["location_precision"] for f in self.facilities)
+        print(f"✅ Geo index: {len(self.facilities)} emergency facilities "
+              f"({', '.join(f'{precision[level]} {level}' for level in PRECISION_LEVELS)}), "
+              f"{skipped} without a location")
+
+    @staticmethod
+    def _read_hospitals(csv_path: str) -> List[Dict[str, Any]]:
+        """Hospitals that report emergency services, with their coordinates when the CSV has them"""
+        facilities = []
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                if record["Emergency Services"].strip().lower() != "true":
+                    continue
+                coordinates = parse_coordinates(record.get("Location", ""))
+                facilities.append({
+                    "name": record["Hospital Name"].strip(),
+                    "address": f"{record['Address'].strip()}, {record['City'].strip()}, "
+                               f"{record['State'].strip()} {normalize_zip(record['ZIP Code'])}",
+                    "phone": record["Phone Number"].strip(),
+                    "zip_code": normalize_zip(record["ZIP Code"]),
+                    "state": record["State"].strip(),
+                    "ambulance_available": None,
+                    "source": "hospital_general_information",
+                    "latitude": coordinates[0] if coordinates else None,
+                    "longitude": coordinates[1] if coordinates else None,
+                    "location_precision": "exact" if coordinates else None,
+                })
+        return facilities
+
+    @staticmethod
+    def _read_emergency_directory(csv_path: str) -> List[Dict[str, Any]]:
+        """Emergency directory facilities, merged per (ZIP, name) like the ZIP index"""
+        merged: Dict[Tuple[str, str], bool] = {}
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                key = (normalize_zip(record["Zip Code"]), record["Hospital Name"].strip())
+                ambulance = record["Ambulance Available"].strip().lower().startswith("y")
+                merged[key] = merged.get(key, False) or ambulance
+
+        return [
+            {
+                "name": name,
+                "address": f"ZIP Code: {zip_code}",
+                "phone": None,
+                "zip_code": zip_code,
+                "state": None,
+                "ambulance_available": ambulance,
+                "source": "emergency_directory",
+                "latitude": None,
+                "longitude": None,
+                "location_precision": None,
+            }
+            for (zip_code, name), ambulance in merged.items()
+        ]
+
+    def nearest(self, zip_code: Any, k: int = 5) -> Dict[str, Any]:
+        """
+        Find the k nearest emergency-capable facilities to a ZIP code
+
+        Args:
+            zip_code: Caller's ZIP code
+            k: Number of facilities to return
+
+        Returns:
+            Dict with the resolved origin and facilities ordered by distance
+
+        Raises:
+            ValueError: If the ZIP code cannot be placed on the map
+        """
+        zip5 = normalize_zip(zip_code)
+        origin = self.centroids.locate(zip5)
+        if origin is None:
+            raise ValueError(f"Unknown ZIP code: {zip_code}")
+
+        lat, lon, precision = origin
+        query = to_unit_vector(lat, lon)
+        candidates = self.tree.nearest(query, k)
+        if candidates:
+            # Pull in everything tied with the k-th neighbour (many facilities share a
+            # centroid) so the tie-break below, not tree order, picks the winners
+            candidates = self.tree.within(query, candidates[-1][0] + 1e-12)
+
+        def rank(candidate: Tuple[float, int]):
+            facility = self.facilities[candidate[1]]
+            same_area = 0 if facility["zip_code"] == zip5 else 1 if facility["zip_code"][:3] == zip5[:3] else 2
+            return (round(candidate[0], 12), same_area,
+                    PRECISION_LEVELS.index(facility["location_precision"]), facility["name"])
+
+        results = []
+        for _, position in sorted(candidates, key=rank)[:k]:
+            facility = self.facilities[position]
+            distance_km = haversine_km(lat, lon, facility["latitude"], facility["longitude"])
+            results.append({
+                **facility,
+                "distance_km": round(distance_km, 2),
+                "distance_miles": round(distance_km / KM_PER_MILE, 2),
+            })
+
+        return {
+            "zip_code": zip5,
+            "latitude": lat,
+            "longitude": lon,
+            "location_precision": precision,
+            "facilities": results,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size information"""
+        return {
+            "facilities": len(self.facilities),
+            "precision": dict(Counter(f["location_precision"] for f in self.facilities)),
+        }
+
+
+# Benchmark: KD-tree query vs. a linear haversine scan
+if __name__ == "__main__":
+    import random
+    import time
+
+    print("\n" + "="*80)
+    print("NEAREST EMERGENCY FACILITY BENCHMARK")
+    print("="*80)
+
+    start = time.perf_counter()
+    index = NearestFacilityIndex()
+    print(f"Build: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    zip_codes = ["10001", "60601", "94101", "30301", "73301", "02134", "59801", "99501", "00901"]
+    queries = [random.choice(zip_codes) for _ in range(2000)]
+
+    def linear_scan(zip_code: str, k: int):
+        lat, lon, _ = index.centroids.locate(zip_code)
+        return heapq.nsmallest(
+            k, (haversine_km(lat, lon, f["latitude"], f["longitude"]) for f in index.facilities)
+        )
+
+    for label, search in (("kd-tree", index.nearest), ("linear scan", linear_scan)):
+        start = time.perf_counter()
+        for zip_code in queries:
+            search(zip_code, 5)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<12}: {elapsed / len(queries) * 1e6:>9,.1f} us/query")
+
+    # Both strategies must agree on the distances
+    for zip_code in zip_codes:
+        tree_distances = [f["distance_km"] for f in index.nearest(zip_code, 5)["facilities"]]
+        scan_distances = [round(d, 2) for d in linear_scan(zip_code, 5)]
+        assert tree_distances == scan_distances, (zip_code, tree_distances, scan_distances)
+
+    for zip_code in ("10001", "59801"):
+        result = index.nearest(zip_code, 3)
+        print(f"\n{zip_code} ({result['location_precision']}):")
+        for facility in result["facilities"]:
+            print(f"  {facility['distance_miles']:>7.1f} mi  {facility['name']} [{facility['location_precision']}]")
+
+    # Hospitals with coordinates keep them: no Missoula answer sits at a shared centroid
+    missoula = index.nearest("59801", 5)["facilities"]
+    assert all(f["location_precision"] == "exact" for f in missoula), missoula
+    assert len({(f["latitude"], f["longitude"]) for f in missoula}) == len(missoula)
+    assert [f["distance_km"] for f in missoula] == sorted(f["distance_km"] for f in missoula)
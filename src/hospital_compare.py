@@ -0,0 +1,275 @@
+"""
+Hospital Compare
+Vectorized side-by-side comparison of hospitals on star rating and CMS national comparisons
+Serves GET /api/hospitals/compare with an aligned score matrix and weighted composite
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.hospital_search import HospitalSearch
+from src.hospital_store import COMPARISON_COLUMNS, COMPARISON_MEASURES
+
+# Metric keys in matrix column order
+METRICS = ["overall_rating"] + [measure.lower().replace(" ", "_") for measure in COMPARISON_MEASURES]
+
+METRIC_LABELS = dict(zip(METRICS, ["Hospital overall rating"] + COMPARISON_MEASURES))
+
+# Default composite weights (sum to 1); missing metrics are dropped and the rest renormalized
+DEFAULT_WEIGHTS = {
+    "overall_rating": 0.30,
+    "mortality": 0.15,
+    "safety_of_care": 0.15,
+    "readmission": 0.10,
+    "patient_experience": 0.10,
+    "effectiveness_of_care": 0.07,
+    "timeliness_of_care": 0.07,
+    "efficient_use_of_medical_imaging": 0.06,
+}
+
+# CMS phrases every group so that "above" means better performance
+COMPARISON_SCORES = {
+    "Below the National average": 0.0,
+    "Same as the National average": 0.5,
+    "Above the National average": 1.0,
+}
+
+MAX_COMPARED_HOSPITALS = 500
+
+
+def composite_scores(scores: np.ndarray, weight_vector: np.ndarray):
+    """
+    Weighted mean of each row's available metrics
+
+    Args:
+        scores: (hospitals, metrics) matrix with NaN for missing metrics
+        weight_vector: Weight per metric column
+
+    Returns:
+        (composite, coverage) arrays: composite is NaN for rows with no weighted
+        data; coverage is the share of total weight that had data
+    """
+    weight_totals = (~np.isnan(scores) * weight_vector).sum(axis=1)
+    composite = np.where(
+        weight_totals > 0,
+        np.nansum(scores * weight_vector, axis=1) / np.where(weight_totals > 0, weight_totals, 1),
+        np.nan
+    )
+    return composite, weight_totals / weight_vector.sum()
+
+
+def parse_weights(text: Optional[str]) -> Optional[Dict[str, float]]:
+    """
+    Parse "metric:weight,metric:weight" into a weights dict
+
+    Raises:
+        ValueError: On an unknown metric or a non-numeric/negative weight
+    """
+    if not text or not text.strip():
+        return None
+
+    weights = {}
+    for part in text.split(","):
+        metric, _, value = part.partition(":")
+        metric = metric.strip().lower()
+        if metric not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(METRICS)}")
+        try:
+            weight = float(value)
+        except ValueError:
+            raise ValueError(f"Weight for '{metric}' must be a number")
+        if weight < 0:
+            raise ValueError(f"Weight for '{metric}' must not be negative")
+        weights[metric] = weight
+    return weights
+
+
+def score_matrix(frame) -> np.ndarray:
+    """
+    Encode every hospital's metrics as a (hospitals, METRICS) float32 matrix
+
+    Star rating is scaled to 0-1 and each national comparison maps through
+    COMPARISON_SCORES via its categorical codes; missing values are NaN
+    """
+    matrix = np.full((len(frame), len(METRICS)), np.nan, dtype=np.float32)
+    rating = frame["Hospital overall rating"].astype("float32").to_numpy(na_value=np.nan)
+    matrix[:, 0] = (rating - 1) / 4
+
+    for j, column in enumerate(COMPARISON_COLUMNS, start=1):
+        categories = frame[column].cat.categories
+        # Extra trailing NaN so code -1 (missing) maps to NaN
+        lookup = np.array(
+            [COMPARISON_SCORES.get(str(category), np.nan) for category in categories] + [np.nan],
+            dtype=np.float32
+        )
+        matrix[:, j] = lookup[frame[column].cat.codes.to_numpy()]
+    return matrix
+
+
+class HospitalComparator:
+    """
+    Comparison engine over the shared hospital store
+
+    Features:
+    - Resolves Provider IDs or (typo-tolerant) names through HospitalSearch
+    - One float32 score matrix for every hospital, built once per store version:
+      star rating scaled to 0-1 and national comparisons encoded Below/Same/Above
+      as 0/0.5/1 (NaN where not available)
+    - Selected rows are gathered with fancy indexing; per-metric ranks, best
+      hospital and a weighted composite are computed on the sub-matrix
+    """
+
+    def __init__(self, hospital_search: Optional[HospitalSearch] = None):
+        """
+        Initialize Hospital Comparator
+
+        Args:
+            hospital_search: Shared HospitalSearch (resolves references); created if omitted
+        """
+        self.search = hospital_search or HospitalSearch()
+        self._lock = threading.Lock()
+        self._version = None
+        self._matrix: Optional[np.ndarray] = None
+        self._prepare()
+
+    def _prepare(self):
+        """(Re)build the score matrix if the store has loaded a new frame"""
+        store = self.search.store
+        frame = store.frame
+        if self._version == store.version:
+            return
+
+        with self._lock:
+            if self._version == store.version:
+                return
+
+            self._matrix = score_matrix(frame)
+            self._version = store.version
+
+    def compare(self, references: Sequence[str], weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Compare hospitals
+
+        Args:
+            references: Provider IDs and/or hospital names (duplicates collapse)
+            weights: Composite weight per metric; metrics left out get weight 0.
+                Defaults to DEFAULT_WEIGHTS
+
+        Returns:
+            Dict with per-hospital scores, ranks and composite, the best hospital
+            per metric, unresolved references and compute time in ms
+
+        Raises:
+            ValueError: If fewer than 2 distinct hospitals resolve, too many are
+                requested, or all weights are zero
+        """
+        start = time.perf_counter()
+        if len(references) > MAX_COMPARED_HOSPITALS:
+            raise ValueError(f"At most {MAX_COMPARED_HOSPITALS} hospitals can be compared at once")
+
+        weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        weight_vector = np.array([weights.get(metric, 0.0) for metric in METRICS], dtype=np.float32)
+        if not weight_vector.any():
+            raise ValueError("At least one metric weight must be positive")
+
+        self._prepare()
+        positions: List[int] = []
+        seen = set()
+        unresolved = []
+        for reference in references:
+            position = self.search.resolve_position(reference)
+            if position is None:
+                unresolved.append(reference)
+            elif position not in seen:
+                seen.add(position)
+                positions.append(position)
+
+        if len(positions) < 2:
+            raise ValueError("At least 2 distinct hospitals are required for comparison")
+
+        rows = np.asarray(positions)
+        scores = self._matrix[rows]                  # (hospitals, metrics)
+        available = ~np.isnan(scores)
+
+        composite, coverage = composite_scores(scores, weight_vector)
+
+        # Dense descending rank per metric (ties share a rank; NaN left unranked)
+        metric_ranks = np.full(scores.shape, -1, dtype=np.int32)
+        for j in range(scores.shape[1]):
+            column = scores[:, j]
+            present = available[:, j]
+            if present.any():
+                distinct = np.unique(column[present])[::-1]
+                metric_ranks[present, j] = np.searchsorted(-distinct, -column[present]) + 1
+
+        order = np.lexsort((np.arange(len(rows)), -np.nan_to_num(composite, nan=-1.0)))
+        overall_rank = np.empty(len(rows), dtype=np.int32)
+        overall_rank[order] = np.arange(1, len(rows) + 1)
+
+        hospitals = []
+        for i in order:
+            record = self.search.record(int(rows[i]))
+            hospitals.append({
+                "id": record["id"],
+                "name": record["name"],
+                "city": record["city"],
+                "state": record["state"],
+                "rank": int(overall_rank[i]),
+                "composite_score": None if np.isnan(composite[i]) else round(float(composite[i]), 4),
+                "coverage": round(float(coverage[i]), 3),
+                "rating": record["rating"],
+                "scores": {
+                    metric: None if np.isnan(scores[i, j]) else float(scores[i, j])
+                    for j, metric in enumerate(METRICS)
+                },
+                "metric_ranks": {
+                    metric: int(metric_ranks[i, j]) if metric_ranks[i, j] > 0 else None
+                    for j, metric in enumerate(METRICS)
+                },
+                "comparisons": record["comparisons"],
+            })
+
+        best = {}
+        for j, metric in enumerate(METRICS):
+            leaders = np.flatnonzero(metric_ranks[:, j] == 1)
+            best[metric] = [self.search.record(int(rows[i]))["id"] for i in leaders]
+
+        return {
+            "metrics": [{"key": metric, "label": METRIC_LABELS[metric], "weight": weights.get(metric, 0.0)}
+                        for metric in METRICS],
+            "hospitals": hospitals,
+            "best": best,
+            "unresolved": unresolved,
+            "compute_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+
+# Benchmark: comparing growing numbers of hospitals by Provider ID and by name
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("HOSPITAL COMPARISON BENCHMARK")
+    print("="*80)
+
+    comparator = HospitalComparator()
+    frame = comparator.search.store.frame
+    provider_ids = [str(i) for i in frame["Provider ID"].tolist()]
+    names = frame["Hospital Name"].astype(str).tolist()
+
+    for label, pool in (("provider IDs", provider_ids), ("names", names)):
+        for count in (2, 10, 100, 500):
+            references = pool[:count]
+            timings = []
+            for _ in range(20):
+                result = comparator.compare(references)
+                timings.append(result["compute_ms"])
+            timings.sort()
+            print(f"{count:>4} hospitals by {label:<13}: p50={timings[len(timings) // 2]:7.2f} ms  "
+                  f"max={timings[-1]:7.2f} ms")
+
+    sample = comparator.compare(provider_ids[:5])
+    print("\nTop of a 5-hospital comparison:")
+    for hospital in sample["hospitals"]:
+        print(f"  #{hospital['rank']} {hospital['name']:<45} composite={hospital['composite_score']}")
@@ -0,0 +1,428 @@
+"""
+Hospital Scorecards
+Precomputed per-hospital scorecards, percentiles, rankings and state/county rollups
+Built once per hospital dataset version and cached on disk as a single artifact
+"""
+
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.constants import HOSPITAL_CACHE_DIR
+from src.hospital_compare import DEFAULT_WEIGHTS, METRICS, composite_scores, score_matrix
+from src.hospital_store import COMPARISON_COLUMNS, HospitalStore
+
+# Bump when the artifact layout or scoring changes so stale caches are rebuilt
+SCHEMA_VERSION = 1
+
+# Ordinal encoding of the national comparisons (0 = not available)
+COMPARISON_ORDINALS = {
+    "Below the National average": 1,
+    "Same as the National average": 2,
+    "Above the National average": 3,
+}
+
+US_STATES = {
+    "ALABAMA": "AL", "ALASKA": "AK", "ARIZONA": "AZ", "ARKANSAS": "AR", "CALIFORNIA": "CA",
+    "COLORADO": "CO", "CONNECTICUT": "CT", "DELAWARE": "DE", "DISTRICT OF COLUMBIA": "DC",
+    "FLORIDA": "FL", "GEORGIA": "GA", "HAWAII": "HI", "IDAHO": "ID", "ILLINOIS": "IL",
+    "INDIANA": "IN", "IOWA": "IA", "KANSAS": "KS", "KENTUCKY": "KY", "LOUISIANA": "LA",
+    "MAINE": "ME", "MARYLAND": "MD", "MASSACHUSETTS": "MA", "MICHIGAN": "MI", "MINNESOTA": "MN",
+    "MISSISSIPPI": "MS", "MISSOURI": "MO", "MONTANA": "MT", "NEBRASKA": "NE", "NEVADA": "NV",
+    "NEW HAMPSHIRE": "NH", "NEW JERSEY": "NJ", "NEW MEXICO": "NM", "NEW YORK": "NY",
+    "NORTH CAROLINA": "NC", "NORTH DAKOTA": "ND", "OHIO": "OH", "OKLAHOMA": "OK", "OREGON": "OR",
+    "PENNSYLVANIA": "PA", "RHODE ISLAND": "RI", "SOUTH CAROLINA": "SC", "SOUTH DAKOTA": "SD",
+    "TENNESSEE": "TN", "TEXAS": "TX", "UTAH": "UT", "VERMONT": "VT", "VIRGINIA": "VA",
+    "WASHINGTON": "WA", "WEST VIRGINIA": "WV", "WISCONSIN": "WI", "WYOMING": "WY",
+    "PUERTO RICO": "PR", "VIRGIN ISLANDS": "VI", "GUAM": "GU", "AMERICAN SAMOA": "AS",
+    "NORTHERN MARIANA ISLANDS": "MP",
+}
+
+# "best hospitals in X" style questions the chat agent can answer from rankings;
+# qualified questions ("best hospital for cardiology in X", "best cardiology
+# hospitals in X") are left to the agent
+_BEST_IN_PATTERN = re.compile(
+    r"(?:\b(\d+)\s+)?\b(?:best|top|highest[- ]rated|top[- ]rated)(?:\s+(\d+))?"
+    r"(?:\s+(?:rated|ranked|overall))?\s+hospitals?\s+(?:in|near|around)\s+(.+?)[?.!]*$",
+    re.IGNORECASE
+)
+
+# Locations relative to the user ("near me", "in my area") cannot be answered from
+# rankings; an upper-case "ME" is still Maine
+_RELATIVE_LOCATION = re.compile(
+    r"\b(?:me|my|mine|here|nearby|current location|where i (?:am|live))\b", re.IGNORECASE
+)
+
+RankingKey = Tuple[str, ...]
+
+
+def _clean(value: Any) -> Any:
+    """numpy scalars to Python values; NaN/NA to None"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+
+class HospitalScorecards:
+    """
+    Precomputed hospital scorecards and geographic rollups
+
+    Features:
+    - Scorecard per hospital: ordinal national comparisons (Below/Same/Above =
+      1/2/3, 0 = not available), composite score (same weighting as the
+      comparison endpoint), national and in-state percentiles, in-state rank
+    - State and county rollups: hospital counts, mean rating, emergency-service
+      coverage, counts by hospital type and ownership, mean composite
+    - Best-first rankings per state, county and city, held as lists of
+      prebuilt scorecard dicts so "best hospital in X" is a lookup and a slice
+    - Everything is stored in one pickled artifact keyed by the source CSV's
+      fingerprint and rebuilt only when the hospital data changes
+    """
+
+    def __init__(self, hospital_store: Optional[HospitalStore] = None, cache_dir: str = HOSPITAL_CACHE_DIR):
+        """
+        Initialize Hospital Scorecards
+
+        Args:
+            hospital_store: Shared HospitalStore; a private one is created if omitted
+            cache_dir: Directory for the cached artifact
+        """
+        self.store = hospital_store or HospitalStore()
+        self.cache_path = os.path.join(cache_dir, "hospital_scorecards.pkl")
+        self._lock = threading.Lock()
+        self._version = None
+        self.source: Optional[str] = None
+        self._prepare()
+
+    def _prepare(self):
+        """Load or rebuild the artifact if the store has loaded a new frame"""
+        frame = self.store.frame
+        if self._version == self.store.version:
+            return
+
+        with self._lock:
+            if self._version == self.store.version:
+                return
+
+            start = time.perf_counter()
+            artifact = self._read_cache(self.store.fingerprint)
+            source = "cache"
+            if artifact is None:
+                artifact = self._build(frame)
+                source = "build"
+                self._write_cache(artifact)
+
+            self.scorecards: pd.DataFrame = artifact["scorecards"]
+            self.states: pd.DataFrame = artifact["states"]
+            self.counties: pd.DataFrame = artifact["counties"]
+            self.rankings: Dict[RankingKey, List[int]] = artifact["rankings"]
+
+            # Cleaned record dicts, built once so lookups only slice lists
+            records = dict(zip(self.scorecards.index.tolist(), self._records_from(self.scorecards)))
+            self._ranked: Dict[RankingKey, List[Dict[str, Any]]] = {
+                key: [records[position] for position in positions] for key, positions in self.rankings.items()
+            }
+            self._by_id: Dict[Any, Dict[str, Any]] = {record["id"]: record for record in records.values()}
+            self._cities: Dict[str, List[str]] = {}
+            self._counties_by_name: Dict[str, List[str]] = {}
+            for key in self.rankings:
+                if key[0] == "city":
+                    self._cities.setdefault(key[2], []).append(key[1])
+                elif key[0] == "county":
+                    self._counties_by_name.setdefault(key[2], []).append(key[1])
+
+            self.source = source
+            self._version = self.store.version
+
+        print(f"✅ Hospital scorecards ({source}) in {(time.perf_counter() - start) * 1000:.1f} ms: "
+              f"{len(self.scorecards)} hospitals, {len(self.states)} states, {len(self.counties)} counties")
+
+    def _build(self, frame: pd.DataFrame) -> Dict[str, Any]:
+        """Compute scorecards, rollups and rankings from the hospital frame"""
+        composite, coverage = composite_scores(
+            score_matrix(frame),
+            np.array([DEFAULT_WEIGHTS[metric] for metric in METRICS], dtype=np.float32)
+        )
+
+        scorecards = pd.DataFrame({
+            "id": frame["Provider ID"].to_numpy(),
+            "name": frame["Hospital Name"].astype(object).to_numpy(),
+            "city": frame["City"].astype(object).to_numpy(),
+            "county": frame["County Name"].astype(object).to_numpy(),
+            "state": frame["State"].astype(object).to_numpy(),
+            "type": frame["Hospital Type"].astype(object).to_numpy(),
+            "ownership": frame["Hospital Ownership"].astype(object).to_numpy(),
+            "emergency_services": frame["Emergency Services"].to_numpy(dtype=bool),
+        })
+        scorecards["rating"] = frame["Hospital overall rating"].reset_index(drop=True)
+        for metric, column in zip(METRICS[1:], COMPARISON_COLUMNS):
+            scorecards[metric] = (
+                frame[column].astype(object).map(COMPARISON_ORDINALS).fillna(0).to_numpy(dtype=np.int8)
+            )
+        scorecards["composite_score"] = composite.astype(np.float32)
+        scorecards["coverage"] = coverage.astype(np.float32)
+        scorecards["national_percentile"] = (scorecards["composite_score"].rank(pct=True) * 100).round(1)
+        scorecards["state_percentile"] = (
+            scorecards.groupby("state")["composite_score"].rank(pct=True) * 100
+        ).round(1)
+        scorecards["state_rank"] = (
+            scorecards.groupby("state")["composite_score"].rank(ascending=False, method="min").astype("Int16")
+        )
+
+        def rollup(keys: List[str]) -> pd.DataFrame:
+            grouped = scorecards.groupby(keys, sort=True)
+            summary = grouped.agg(
+                hospitals=("id", "size"),
+                rated_hospitals=("rating", "count"),
+                mean_rating=("rating", "mean"),
+                emergency_coverage=("emergency_services", "mean"),
+                mean_composite=("composite_score", "mean"),
+            )
+            by_type = pd.crosstab([scorecards[k] for k in keys], scorecards["type"]).add_prefix("type: ")
+            by_ownership = pd.crosstab([scorecards[k] for k in keys], scorecards["ownership"]).add_prefix("ownership: ")
+            summary = summary.join(by_type).join(by_ownership)
+            count_columns = list(by_type.columns) + list(by_ownership.columns)
+            summary[count_columns] = summary[count_columns].fillna(0).astype(int)
+            summary["mean_rating"] = summary["mean_rating"].astype("float64").round(2)
+            summary["emergency_coverage"] = summary["emergency_coverage"].round(3)
+            summary["mean_composite"] = summary["mean_composite"].round(4)
+            return summary.reset_index()
+
+        # Best first: composite, then rating, then name; unscored hospitals are not ranked
+        ordered = scorecards[scorecards["composite_score"].notna()].sort_values(
+            ["composite_score", "rating", "name"], ascending=[False, False, True], na_position="last"
+        )
+        rankings: Dict[RankingKey, List[int]] = {("national",): ordered.index.tolist()}
+        for position, state, county, city in zip(
+            ordered.index.tolist(), ordered["state"], ordered["county"], ordered["city"]
+        ):
+            rankings.setdefault(("state", state), []).append(position)
+            if isinstance(county, str):
+                rankings.setdefault(("county", state, county.upper()), []).append(position)
+            if isinstance(city, str):
+                rankings.setdefault(("city", state, city.upper()), []).append(position)
+
+        return {
+            "schema_version": SCHEMA_VERSION,
+            "fingerprint": self.store.fingerprint,
+            "scorecards": scorecards,
+            "states": rollup(["state"]),
+            "counties": rollup(["state", "county"]),
+            "rankings": rankings,
+        }
+
+    def _read_cache(self, fingerprint) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.cache_path, "rb") as f:
+                artifact = pickle.load(f)
+            if artifact.get("schema_version") != SCHEMA_VERSION or artifact.get("fingerprint") != fingerprint:
+                return None
+            return artifact
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable scorecard cache: {e}")
+            return None
+
+    def _write_cache(self, artifact: Dict[str, Any]):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"Warning: Could not write scorecard cache: {e}")
+
+    def resolve_scope(self, location: str) -> Tuple[RankingKey, str]:
+        """
+        Map free-text location to a ranking key
+
+        Accepts a state code or name, "City, ST", "County County[, ST]", or a bare
+        city/county name (the city or county with the most hospitals wins)
+
+        Returns:
+            (ranking key, human-readable scope)
+
+        Raises:
+            ValueError: If the location is not recognized
+        """
+        self._prepare()
+        text = re.sub(r"\s+", " ", location.strip().upper()).strip(" .?!")
+        if not text or text in ("US", "USA", "THE US", "UNITED STATES", "THE COUNTRY", "AMERICA"):
+            return ("national",), "the United States"
+
+        state = US_STATES.get(text, text)
+        if ("state", state) in self.rankings:
+            return ("state", state), state
+
+        place, state = text, None
+        if "," in text:
+            place, _, suffix = (part.strip() for part in text.rpartition(","))
+            state = US_STATES.get(suffix, suffix)
+
+        county_name = place[:-len(" COUNTY")] if place.endswith(" COUNTY") else None
+        if county_name:
+            states = [state] if state else self._counties_by_name.get(county_name, [])
+            key = self._largest([("county", s, county_name) for s in states])
+            if key:
+                return key, f"{county_name.title()} County, {key[1]}"
+
+        for kind, index in (("city", self._cities), ("county", self._counties_by_name)):
+            states = [state] if state else index.get(place, [])
+            key = self._largest([(kind, s, place) for s in states])
+            if key:
+                suffix = " County" if kind == "county" else ""
+                return key, f"{place.title()}{suffix}, {key[1]}"
+
+        raise ValueError(f"Unknown location: {location}")
+
+    def _largest(self, keys: List[RankingKey]) -> Optional[RankingKey]:
+        keys = [key for key in keys if key in self.rankings]
+        return max(keys, key=lambda key: len(self.rankings[key])) if keys else None
+
+    def top(self, location: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+        """
+        Best hospitals in a location, straight from the precomputed rankings
+
+        Args:
+            location: State, city, county or None for national
+            limit: Number of hospitals
+
+        Returns:
+            Dict with resolved scope, total ranked hospitals and scorecards
+
+        Raises:
+            ValueError: If the location is not recognized
+        """
+        key, scope = self.resolve_scope(location or "")
+        ranking = self._ranked[key]
+        return {
+            "scope": scope,
+            "total": len(ranking),
+            "hospitals": [dict(record) for record in ranking[:max(0, limit)]],
+        }
+
+    def scorecard(self, provider_id: int) -> Optional[Dict[str, Any]]:
+        """Scorecard for one hospital by Provider ID"""
+        self._prepare()
+        record = self._by_id.get(provider_id)
+        return dict(record) if record is not None else None
+
+    def state_rollups(self) -> List[Dict[str, Any]]:
+        """Aggregates for every state"""
+        self._prepare()
+        return self._records_from(self.states)
+
+    def county_rollups(self, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Aggregates for every county, optionally within one state"""
+        self._prepare()
+        counties = self.counties
+        if state:
+            code = US_STATES.get(state.strip().upper(), state.strip().upper())
+            counties = counties[counties["state"] == code]
+        return self._records_from(counties)
+
+    @staticmethod
+    def _records_from(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        columns = {column: [_clean(value) for value in frame[column].tolist()] for column in frame.columns}
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+    def answer(self, question: str, default_limit: int = 5) -> Optional[str]:
+        """
+        Answer "best/top hospitals in X" questions from the rankings
+
+        Args:
+            question: Natural-language question
+            default_limit: Hospitals listed when the question does not say how many
+
+        Returns:
+            Formatted answer, or None if the question is not of that form or the
+            location is unknown
+        """
+        match = _BEST_IN_PATTERN.search(question.strip())
+        if not match:
+            return None
+
+        location = match.group(3)
+        if any(word.group(0) != "ME" for word in _RELATIVE_LOCATION.finditer(location)):
+            return None
+
+        count = match.group(1) or match.group(2)
+        limit = min(int(count), 25) if count else default_limit
+        try:
+            result = self.top(location, limit=limit)
+        except ValueError:
+            return None
+
+        if not result["hospitals"]:
+            return f"No rated hospitals found in {result['scope']}."
+
+        lines = [f"Top {len(result['hospitals'])} hospitals in {result['scope']} "
+                 f"(of {result['total']} with quality data), by composite quality score:"]
+        for i, hospital in enumerate(result["hospitals"], 1):
+            rating = f"{hospital['rating']}/5 stars" if hospital["rating"] is not None else "not star-rated"
+            lines.append(
+                f"{i}. {hospital['name']} ({hospital['city']}, {hospital['state']}) - {rating}, "
+                f"composite {hospital['composite_score']:.2f}, "
+                f"{hospital['national_percentile']:.0f}th percentile nationally"
+            )
+        return "\n".join(lines)
+
+
+# Benchmark: precomputed lookup vs. filtering and sorting the frame per request
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("HOSPITAL SCORECARDS BENCHMARK")
+    print("="*80)
+
+    start = time.perf_counter()
+    scorecards = HospitalScorecards()
+    print(f"Ready in {(time.perf_counter() - start) * 1000:.1f} ms ({scorecards.source})")
+
+    locations = ["TX", "California", "Houston, TX", "Cook County", "Boston", None]
+    repeats = 200
+
+    def scan(location_key: RankingKey, limit: int = 5):
+        frame = scorecards.scorecards
+        if location_key[0] == "state":
+            frame = frame[frame["state"] == location_key[1]]
+        elif location_key[0] == "city":
+            frame = frame[(frame["state"] == location_key[1]) & (frame["city"].str.upper() == location_key[2])]
+        elif location_key[0] == "county":
+            frame = frame[(frame["state"] == location_key[1]) & (frame["county"].str.upper() == location_key[2])]
+        return frame.nlargest(limit, "composite_score")
+
+    for location in locations:
+        key, scope = scorecards.resolve_scope(location or "")
+        for label, run in (("lookup", lambda: scorecards.top(location, 5)), ("scan", lambda: scan(key))):
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                run()
+            print(f"{scope:<28} {label:<7}: {(time.perf_counter() - t0) / repeats * 1000:7.3f} ms")
+
+    provider_id = scorecards.scorecards["id"].iloc[len(scorecards.scorecards) // 2]
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        scorecards.scorecard(provider_id)
+    print(f"{'scorecard(provider_id)':<28} lookup : {(time.perf_counter() - t0) / repeats * 1000:7.3f} ms")
+
+    # Relative locations and qualified questions are left to the agent
+    for question in ("best hospitals near me", "What are the best hospitals in my area?",
+                     "top hospitals around here", "best cardiology hospitals in Boston",
+                     "best hospital for cardiology in Boston", "best children's hospitals in TX"):
+        assert scorecards.answer(question) is None, question
+    assert scorecards.answer("Top 3 hospitals in ME").startswith("Top 3 hospitals in ME ")
+    assert scorecards.answer("What are the 5 best hospitals in Boston?").startswith("Top 5 hospitals in Boston, MA ")
+
+    print()
+    print(scorecards.answer("What are the best hospitals in Houston, TX?"))
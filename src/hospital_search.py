@@ -0,0 +1,395 @@
+"""
+Hospital Search
+Vectorized filtering, name matching, ranking and pagination over the hospital store
+Serves GET /api/hospitals with structured records instead of LLM text
+"""
+
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.hospital_store import COMPARISON_COLUMNS, COMPARISON_MEASURES, HospitalStore
+from src.text_index import TextIndex, tokenize
+
+SORT_OPTIONS = ("relevance", "name", "rating", "state")
+
+# Full-text fields and their weights: a name hit outranks a street-address hit
+TEXT_FIELD_WEIGHTS = {"name": 3.0, "city": 1.5, "county": 1.0, "address": 0.5}
+
+
+def _clean(value: Any) -> Any:
+    """Convert pandas missing values to None and numpy scalars to Python types"""
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class HospitalSearch:
+    """
+    Structured hospital search engine
+
+    Features:
+    - Boolean masks over categorical codes and numpy arrays for state, city,
+      hospital type, ownership, emergency services and minimum rating
+    - Full-text name/city/county/address search (BM25, prefix and typo tolerant)
+      through a TextIndex, which also answers typeahead suggestions
+    - Stable sorting by relevance, name, rating or state, then pagination
+    - Column arrays and serialized records are rebuilt only when the store reloads
+    """
+
+    def __init__(self, hospital_store: Optional[HospitalStore] = None):
+        """
+        Initialize Hospital Search
+
+        Args:
+            hospital_store: Shared HospitalStore; a private one is created if omitted
+        """
+        self.store = hospital_store or HospitalStore()
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids: Optional[Dict[int, int]] = None
+        self._ids_version = None
+        self._names: Optional[Dict[str, Optional[int]]] = None
+        self._names_version = None
+        self._prepare()
+
+    def _prepare(self):
+        """(Re)build the search arrays if the store has loaded a new frame"""
+        frame = self.store.frame
+        if self._version == self.store.version:
+            return
+
+        with self._lock:
+            if self._version == self.store.version:
+                return
+
+            upper_names = frame["Hospital Name"].astype(object).str.upper()
+            rating = frame["Hospital overall rating"]
+
+            arrays = {
+                "name_order": np.argsort(np.argsort(upper_names.to_numpy(), kind="stable"), kind="stable"),
+                "rating": rating.fillna(-1).to_numpy(dtype=np.int8),
+                "emergency": frame["Emergency Services"].to_numpy(dtype=bool),
+                "state": frame["State"].cat.codes.to_numpy(),
+                "hospital_type": frame["Hospital Type"].cat.codes.to_numpy(),
+                "ownership": frame["Hospital Ownership"].cat.codes.to_numpy(),
+                "city": frame["City"].astype(object).str.upper().to_numpy(dtype=object),
+                "county": frame["County Name"].astype(object).str.upper().to_numpy(dtype=object),
+                "zip_code": frame["ZIP Code"].astype(object).to_numpy(dtype=object),
+            }
+            codes = {
+                column: {str(category).upper(): code for code, category in enumerate(frame[column].cat.categories)}
+                for column in ("State", "Hospital Type", "Hospital Ownership")
+            }
+
+            self._arrays = arrays
+            self._codes = codes
+            self._records = self._build_records(frame)
+            self.text_index = TextIndex(
+                (
+                    (i, {"name": r["name"], "city": r["city"], "county": r["county"], "address": r["address"]})
+                    for i, r in enumerate(self._records)
+                ),
+                TEXT_FIELD_WEIGHTS,
+            )
+            self._version = self.store.version
+
+    @staticmethod
+    def _build_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Serialize every hospital once; queries only slice this list"""
+        columns = {column: frame[column].tolist() for column in frame.columns}
+        records = []
+        for i in range(len(frame)):
+            rating = _clean(columns["Hospital overall rating"][i])
+            records.append({
+                "id": _clean(columns["Provider ID"][i]),
+                "name": columns["Hospital Name"][i],
+                "address": _clean(columns["Address"][i]),
+                "city": _clean(columns["City"][i]),
+                "state": _clean(columns["State"][i]),
+                "zip_code": _clean(columns["ZIP Code"][i]),
+                "county": _clean(columns["County Name"][i]),
+                "phone": _clean(columns["Phone Number"][i]),
+                "type": _clean(columns["Hospital Type"][i]),
+                "ownership": _clean(columns["Hospital Ownership"][i]),
+                "emergency_services": bool(columns["Emergency Services"][i]),
+                "rating": int(rating) if rating is not None else None,
+                "comparisons": {
+                    measure: _clean(columns[column][i])
+                    for measure, column in zip(COMPARISON_MEASURES, COMPARISON_COLUMNS)
+                },
+            })
+        return records
+
+    def _category_mask(self, column: str, array: str, value: str) -> np.ndarray:
+        code = self._codes[column].get(value.strip().upper())
+        if code is None:
+            return np.zeros(len(self._records), dtype=bool)
+        return self._arrays[array] == code
+
+    def _location_mask(self, location: str) -> np.ndarray:
+        """
+        Interpret a free-text location: ZIP code, "City, ST", state code,
+        or a city/county name
+        """
+        text = location.strip().upper()
+        arrays = self._arrays
+
+        if re.fullmatch(r"\d{5}", text):
+            return arrays["zip_code"] == text
+
+        if "," in text:
+            city, _, state = (part.strip() for part in text.rpartition(","))
+            mask = arrays["city"] == city
+            if state:
+                mask &= self._category_mask("State", "state", state)
+            return mask
+
+        if text in self._codes["State"]:
+            return self._category_mask("State", "state", text)
+
+        mask = (arrays["city"] == text) | (arrays["county"] == text)
+        if not mask.any():
+            # Misspelled or partial place name: whole-word, typo-tolerant match on city/county
+            mask = self._text_scores(text, prefix=False, fields=("city", "county")) > 0
+        return mask
+
+    def _text_scores(self, query: str, prefix: bool = True, fields: Optional[Tuple[str, ...]] = None) -> np.ndarray:
+        """Full-text relevance for every hospital (0 where it does not match)"""
+        scores = np.zeros(len(self._records), dtype=np.float64)
+        hits = self.text_index.search(query, limit=None, prefix=prefix, fields=fields)
+        if hits:
+            positions, values = zip(*hits)
+            scores[list(positions)] = values
+        return scores
+
+    def search(
+        self,
+        search: Optional[str] = None,
+        state: Optional[str] = None,
+        city: Optional[str] = None,
+        location: Optional[str] = None,
+        hospital_type: Optional[str] = None,
+        ownership: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        emergency: Optional[bool] = None,
+        sort: str = "relevance",
+        limit: int = 20,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Search hospitals
+
+        Args:
+            search: Free text matched against name, city, county and address
+            state: Two-letter state code
+            city: City name (case-insensitive, exact)
+            location: Free-text location (ZIP code, "City, ST", state code, city or county)
+            hospital_type: Hospital type (e.g. "Acute Care Hospitals")
+            ownership: Hospital ownership (e.g. "Proprietary")
+            min_rating: Minimum overall star rating (1-5); unrated hospitals are excluded
+            emergency: Only hospitals with (True) or without (False) emergency services
+            sort: 'relevance', 'name', 'rating' or 'state'
+            limit: Maximum number of hospitals returned
+            offset: Number of hospitals to skip (pagination)
+
+        Returns:
+            Dict with hospitals list, total match count and query time in ms
+
+        Raises:
+            ValueError: If sort is not a supported option
+        """
+        if sort not in SORT_OPTIONS:
+            raise ValueError(f"Unsupported sort '{sort}'. Use one of: {', '.join(SORT_OPTIONS)}")
+
+        start = time.perf_counter()
+        self._prepare()
+        arrays = self._arrays
+        mask = np.ones(len(self._records), dtype=bool)
+
+        if state and state.strip():
+            mask &= self._category_mask("State", "state", state)
+        if city and city.strip():
+            mask &= arrays["city"] == city.strip().upper()
+        if location and location.strip():
+            mask &= self._location_mask(location)
+        if hospital_type and hospital_type.strip():
+            mask &= self._category_mask("Hospital Type", "hospital_type", hospital_type)
+        if ownership and ownership.strip():
+            mask &= self._category_mask("Hospital Ownership", "ownership", ownership)
+        if min_rating is not None and min_rating > 0:
+            mask &= arrays["rating"] >= min_rating
+        if emergency is not None:
+            mask &= arrays["emergency"] == emergency
+
+        relevance = None
+        if search and search.strip():
+            relevance = self._text_scores(search)
+            mask &= relevance > 0
+
+        matches = np.flatnonzero(mask)
+        name_order = arrays["name_order"][matches]
+        rating_desc = -arrays["rating"][matches].astype(np.int16)
+
+        # np.lexsort sorts by the last key first
+        if sort == "name":
+            keys = (name_order,)
+        elif sort == "rating":
+            keys = (name_order, rating_desc)
+        elif sort == "state":
+            keys = (name_order, arrays["state"][matches])
+        elif relevance is not None:
+            keys = (name_order, rating_desc, -relevance[matches])
+        else:
+            keys = (name_order, rating_desc)
+
+        page = matches[np.lexsort(keys)][offset:offset + limit]
+        hospitals = [self._records[i] for i in page]
+
+        return {
+            "hospitals": hospitals,
+            "total": int(matches.size),
+            "query_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def suggest(self, query: str, limit: int = 8) -> Dict[str, Any]:
+        """
+        Typeahead suggestions for a partially typed hospital name or place
+
+        Args:
+            query: Text typed so far
+            limit: Maximum number of suggestions
+
+        Returns:
+            Dict with suggestions (id, name, city, state, score) and query time in ms
+        """
+        start = time.perf_counter()
+        self._prepare()
+        suggestions = []
+        for position, score in self.text_index.search(query, limit=limit):
+            record = self._records[position]
+            suggestions.append({
+                "id": record["id"],
+                "name": record["name"],
+                "city": record["city"],
+                "state": record["state"],
+                "score": round(score, 3),
+            })
+        return {"suggestions": suggestions, "query_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    def resolve_position(self, reference: str) -> Optional[int]:
+        """
+        Resolve a hospital reference to its row position in the store
+
+        Args:
+            reference: Provider ID, or a (possibly misspelled) hospital name
+
+        Returns:
+            Row position, or None if nothing matches
+        """
+        self._prepare()
+        reference = reference.strip()
+        if reference.isdigit():
+            if self._ids is None or self._ids_version != self._version:
+                self._ids = {record["id"]: i for i, record in enumerate(self._records)}
+                self._ids_version = self._version
+            return self._ids.get(int(reference))
+
+        # Exact (normalized) names skip the fuzzy search; a name shared by several
+        # hospitals is resolved by the text index once and then remembered
+        key = " ".join(tokenize(reference))
+        if self._names is None or self._names_version != self._version:
+            names: Dict[str, Optional[int]] = {}
+            for i, record in enumerate(self._records):
+                name = " ".join(tokenize(record["name"]))
+                names[name] = None if name in names else i
+            self._names = names
+            self._names_version = self._version
+        names = self._names
+        position = names.get(key)
+        if position is not None:
+            return position
+
+        hits = self.text_index.search(reference, limit=1, prefix=False, fields=("name",))
+        position = hits[0][0] if hits else None
+        if key in names:
+            names[key] = position
+        return position
+
+    def resolve(self, reference: str) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a hospital reference to a single record
+
+        Args:
+            reference: Provider ID, or a (possibly misspelled) hospital name
+
+        Returns:
+            The matching hospital record, or None if nothing matches
+        """
+        position = self.resolve_position(reference)
+        return self._records[position] if position is not None else None
+
+    def record(self, position: int) -> Dict[str, Any]:
+        """Serialized hospital record at a row position"""
+        return self._records[position]
+
+    @property
+    def version(self):
+        """Store version the search arrays were built from"""
+        return self._version
+
+    def options(self) -> Dict[str, List[str]]:
+        """Distinct values accepted by the categorical filters"""
+        frame = self.store.frame
+        return {
+            "states": [str(c) for c in frame["State"].cat.categories],
+            "hospital_types": [str(c) for c in frame["Hospital Type"].cat.categories],
+            "ownerships": [str(c) for c in frame["Hospital Ownership"].cat.categories],
+        }
+
+
+# Benchmark: typical /api/hospitals queries over the full dataset
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("HOSPITAL SEARCH BENCHMARK")
+    print("="*80)
+
+    engine = HospitalSearch()
+    queries = [
+        {},
+        {"search": "mem"},
+        {"search": "clevland clinic"},
+        {"search": "general", "state": "CA", "sort": "rating"},
+        {"state": "TX", "min_rating": 4},
+        {"location": "Houston, TX", "emergency": True},
+        {"location": "10016"},
+        {"hospital_type": "Critical Access Hospitals", "sort": "state", "offset": 40},
+        {"search": "st", "ownership": "Proprietary", "min_rating": 3, "limit": 50},
+    ]
+    repeats = 200
+
+    for params in queries:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = engine.search(**params)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p50, p95 = timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+        print(f"{str(params):<80} total={result['total']:>5}  p50={p50:6.3f} ms  p95={p95:6.3f} ms")
+        assert p95 < 10, f"{params} took {p95:.2f} ms at p95"
+
+    for text in ("m", "mem", "memorial h", "cedars s"):
+        timings = []
+        for _ in range(repeats):
+            result = engine.suggest(text)
+            timings.append(result["query_ms"])
+        timings.sort()
+        print(f"suggest {text!r:<14} p50={timings[len(timings) // 2]:6.3f} ms  "
+              f"top={[s['name'] for s in result['suggestions'][:2]]}")
@@ -0,0 +1,264 @@
+"""
+Hospital Store
+Typed, columnar copy of the general hospital CSV loaded once per process
+Keeps a binary cache next to the data so restarts skip CSV parsing entirely
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - pickle cache is used instead
+    feather = None
+
+from src.constants import HOSPITAL_CACHE_DIR, HOSPITAL_INFO_FILE_PATH
+
+# Bump when the dtype mapping below changes so stale caches are rebuilt
+SCHEMA_VERSION = 1
+
+COMPARISON_MEASURES = [
+    "Mortality",
+    "Safety of care",
+    "Readmission",
+    "Patient experience",
+    "Effectiveness of care",
+    "Timeliness of care",
+    "Efficient use of medical imaging",
+]
+COMPARISON_COLUMNS = [f"{measure} national comparison" for measure in COMPARISON_MEASURES]
+FOOTNOTE_COLUMNS = [f"{column} footnote" for column in COMPARISON_COLUMNS] + ["Hospital overall rating footnote"]
+
+CATEGORICAL_COLUMNS = [
+    "State",
+    "City",
+    "County Name",
+    "Hospital Type",
+    "Hospital Ownership",
+] + COMPARISON_COLUMNS + FOOTNOTE_COLUMNS
+
+# Columns parsed as text (ZIP codes and phone numbers keep their leading zeros)
+TEXT_COLUMNS = ["Hospital Name", "Address", "ZIP Code", "Phone Number", "Location"]
+
+
+def _fingerprint(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class HospitalStore:
+    """
+    Shared, read-only hospital DataFrame with compact dtypes
+
+    Features:
+    - Parses the CSV once; categoricals for low-cardinality text columns,
+      nullable Int8 for the star rating, bool for emergency services
+    - Arrow (Feather) cache read through a memory map, or a pickle cache when
+      pyarrow is not installed
+    - Cache and in-memory frame are rebuilt only when the CSV's size or
+      modification time changes
+    - Reloads swap in a new frame atomically; callers never see a partial frame
+    """
+
+    def __init__(self, csv_path: str = HOSPITAL_INFO_FILE_PATH, cache_dir: str = HOSPITAL_CACHE_DIR):
+        """
+        Initialize Hospital Store
+
+        Args:
+            csv_path: Path to Hospital_General_Information.csv
+            cache_dir: Directory for the binary cache (created if missing)
+        """
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+        self._frame: Optional[pd.DataFrame] = None
+        self._fingerprint: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self.version = 0
+        self.source: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+        self.refresh_if_changed()
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """The current hospital DataFrame (treat as read-only)"""
+        self.refresh_if_changed()
+        return self._frame
+
+    @property
+    def fingerprint(self) -> Optional[Tuple[int, int]]:
+        """(size, mtime_ns) of the CSV the current frame was loaded from"""
+        return self._fingerprint
+
+    @property
+    def _cache_stem(self) -> str:
+        name = os.path.splitext(os.path.basename(self.csv_path))[0].lower()
+        return os.path.join(self.cache_dir, name)
+
+    @property
+    def _cache_path(self) -> str:
+        return self._cache_stem + (".feather" if feather is not None else ".pkl")
+
+    @property
+    def _meta_path(self) -> str:
+        return self._cache_stem + ".json"
+
+    def refresh_if_changed(self) -> bool:
+        """
+        Reload the frame if the CSV changed since it was loaded
+
+        Returns:
+            True if a new frame was loaded
+        """
+        fingerprint = _fingerprint(self.csv_path)
+        if fingerprint == self._fingerprint:
+            return False
+
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return False
+
+            start = time.perf_counter()
+            frame = self._read_cache(fingerprint)
+            source = "cache"
+            if frame is None:
+                frame = self._read_csv()
+                source = "csv"
+                self._write_cache(frame, fingerprint)
+
+            self._frame = frame
+            self._fingerprint = fingerprint
+            self.version += 1
+            self.source = source
+            self.load_seconds = time.perf_counter() - start
+
+        print(f"✅ Hospital store v{self.version}: {len(frame)} hospitals from {source} "
+              f"in {self.load_seconds * 1000:.1f} ms")
+        return True
+
+    def _read_csv(self) -> pd.DataFrame:
+        """Parse the CSV and cast every column to its compact dtype"""
+        frame = pd.read_csv(
+            self.csv_path,
+            index_col="index",
+            dtype={
+                **{column: "category" for column in CATEGORICAL_COLUMNS},
+                **{column: "string" for column in TEXT_COLUMNS},
+                "Provider ID": "int32",
+                "Emergency Services": "bool",
+            },
+        )
+        frame.index = frame.index.astype("int32")
+        frame["ZIP Code"] = frame["ZIP Code"].str.zfill(5)
+        frame["Hospital overall rating"] = (
+            pd.to_numeric(frame["Hospital overall rating"], errors="coerce").round().astype("Int8")
+        )
+        # Empty in the published dataset; keep it nullable rather than object
+        frame["Meets criteria for meaningful use of EHRs"] = (
+            frame["Meets criteria for meaningful use of EHRs"].astype("boolean")
+        )
+        return frame
+
+    def _read_cache(self, fingerprint: Tuple[int, int]) -> Optional[pd.DataFrame]:
+        """Load the binary cache if it was built from this exact CSV"""
+        try:
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if (
+                meta.get("schema_version") != SCHEMA_VERSION
+                or tuple(meta.get("fingerprint", ())) != fingerprint
+                or meta.get("format") != os.path.splitext(self._cache_path)[1]
+            ):
+                return None
+
+            if feather is not None:
+                return feather.read_table(self._cache_path, memory_map=True).to_pandas()
+            return pd.read_pickle(self._cache_path)
+
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable hospital cache: {e}")
+            return None
+
+    def _write_cache(self, frame: pd.DataFrame, fingerprint: Tuple[int, int]):
+        """Write the cache and its metadata via temp files and atomic renames"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._cache_path + ".tmp"
+            if feather is not None:
+                # Uncompressed so later reads can be memory-mapped
+                feather.write_feather(frame, tmp_path, compression="uncompressed")
+            else:
+                frame.to_pickle(tmp_path)
+            os.replace(tmp_path, self._cache_path)
+
+            meta = {
+                "schema_version": SCHEMA_VERSION,
+                "fingerprint": list(fingerprint),
+                "format": os.path.splitext(self._cache_path)[1],
+                "rows": len(frame),
+                "written_at": time.time(),
+            }
+            with open(self._meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(self._meta_path + ".tmp", self._meta_path)
+
+        except Exception as e:
+            # The cache is an optimization; serving from the parsed frame is still correct
+            print(f"Warning: Could not write hospital cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Row count, memory footprint and load information"""
+        frame = self._frame
+        return {
+            "version": self.version,
+            "rows": len(frame) if frame is not None else 0,
+            "memory_bytes": int(frame.memory_usage(deep=True).sum()) if frame is not None else 0,
+            "source": self.source,
+            "load_seconds": round(self.load_seconds, 4) if self.load_seconds is not None else None,
+            "cache_format": "feather" if feather is not None else "pickle",
+        }
+
+
+# Benchmark: raw read_csv per request vs. typed cache vs. the shared frame
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    print("\n" + "="*80)
+    print("HOSPITAL STORE BENCHMARK")
+    print("="*80)
+
+    cache_dir = tempfile.mkdtemp()
+    repeats = 20
+
+    try:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            raw = pd.read_csv(HOSPITAL_INFO_FILE_PATH)
+        print(f"pd.read_csv per call : {(time.perf_counter() - start) / repeats * 1000:>8.2f} ms, "
+              f"{raw.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB")
+
+        cold = HospitalStore(cache_dir=cache_dir)
+        print(f"cold load (CSV)      : {cold.load_seconds * 1000:>8.2f} ms")
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            warm = HospitalStore(cache_dir=cache_dir)
+        print(f"warm load (cache)    : {(time.perf_counter() - start) / repeats * 1000:>8.2f} ms, "
+              f"{warm.stats()['memory_bytes'] / 1024 / 1024:.2f} MB ({warm.stats()['cache_format']})")
+
+        start = time.perf_counter()
+        for _ in range(10000):
+            warm.frame
+        print(f"shared frame access  : {(time.perf_counter() - start) / 10000 * 1e6:>8.2f} us")
+
+        pd.testing.assert_frame_equal(cold.frame, warm.frame)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
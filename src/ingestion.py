@@ -0,0 +1,527 @@
+"""
+CSV Ingestion Layer
+Versioned, incremental loading of the CSV datasets into SQLite
+Skips unchanged files and applies diff-based upserts when a file changes
+"""
+
+import csv
+import hashlib
+import os
+import sqlite3
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.constants import APPOINTMENTS_DB_PATH, EMERGENCY_DB_PATH
+
+METADATA_TABLE = "ingest_metadata"
+
+_DATETIME_FORMATS = (
+    "%Y-%m-%d %I:%M %p",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+    "%Y-%m-%d %H:%M",
+)
+
+_SQL_CASTS = {
+    "INTEGER": lambda value: int(float(value)),
+    "REAL": float,
+    "TEXT": str,
+}
+
+
+def to_iso_timestamp(value: str) -> str:
+    """
+    Convert a slot time such as "2025-03-01 8:00 AM" into a sortable ISO timestamp
+
+    Args:
+        value: Date/time text in one of the supported formats
+
+    Returns:
+        Timestamp formatted as YYYY-MM-DDTHH:MM:SS
+    """
+    text = value.strip()
+    for fmt in _DATETIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date/time: {value}")
+
+
+class TableSpec:
+    """
+    Description of a table loaded from a CSV file
+
+    Attributes:
+        name: SQLite table name
+        columns: (column name, SQL type) pairs; names match the CSV header
+        key: Columns identifying a row, or None to diff rows as a multiset
+        preserve: Columns owned by the application (e.g. bookings) that an
+            ingest never overwrites on existing rows
+        converters: Optional per-column functions applied to raw CSV values
+        indexes: (index name, column list) pairs created after each ingest
+        schema_version: Bump to force a one-time rebuild of the table
+    """
+
+    def __init__(
+        self,
+        name: str,
+        columns: List[Tuple[str, str]],
+        key: Optional[List[str]] = None,
+        preserve: Optional[List[str]] = None,
+        converters: Optional[Dict[str, Callable[[str], Any]]] = None,
+        indexes: Optional[List[Tuple[str, str]]] = None,
+        schema_version: int = 1
+    ):
+        self.name = name
+        self.columns = columns
+        self.key = key
+        self.preserve = preserve or []
+        self.converters = converters or {}
+        self.indexes = indexes or []
+        self.schema_version = schema_version
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column for column, _ in self.columns]
+
+    def create_sql(self) -> str:
+        """CREATE TABLE statement for this spec"""
+        definitions = [f'"{column}" {sql_type}' for column, sql_type in self.columns]
+        if self.key:
+            definitions.append("PRIMARY KEY (" + ", ".join(f'"{c}"' for c in self.key) + ")")
+        return f'CREATE TABLE "{self.name}" (' + ", ".join(definitions) + ")"
+
+    def convert(self, raw: Dict[str, str]) -> Tuple:
+        """Convert one CSV record into a row tuple in column order"""
+        row = []
+        for column, sql_type in self.columns:
+            value = raw.get(column)
+            if value is None or value == "":
+                row.append(None)
+            elif column in self.converters:
+                row.append(self.converters[column](value))
+            else:
+                row.append(_SQL_CASTS.get(sql_type.split()[0], str)(value))
+        return tuple(row)
+
+
+def fingerprint_file(path: str, with_hash: bool = True) -> Dict[str, Any]:
+    """
+    Fingerprint a file by size, modification time and (optionally) SHA-256
+
+    Args:
+        path: File path
+        with_hash: Also hash the file contents
+
+    Returns:
+        Dict with size, mtime_ns and sha256
+    """
+    stat = os.stat(path)
+    digest = None
+    if with_hash:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+
+
+class CSVIngestor:
+    """
+    Loads CSV files into a SQLite database incrementally
+
+    Features:
+    - Fingerprints every source file (size, mtime, SHA-256)
+    - Skips the reload entirely when nothing changed
+    - Applies a diff-based upsert when data changed, leaving untouched rows alone
+    - Never overwrites application-owned columns such as slot availability
+    - Records every ingest (with a data version) in a metadata table
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize ingestor
+
+        Args:
+            db_path: Path to SQLite database
+        """
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {METADATA_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            source_path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            schema_version INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            data_version INTEGER NOT NULL,
+            ingested_at TEXT NOT NULL
+        )
+        """)
+        return conn
+
+    @staticmethod
+    def _metadata(conn: sqlite3.Connection, table: str) -> Optional[Dict[str, Any]]:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute(
+            f"SELECT * FROM {METADATA_TABLE} WHERE table_name = ?", (table,)
+        ).fetchone()
+        conn.row_factory = None
+        return dict(row) if row else None
+
+    @staticmethod
+    def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+
+    def table_version(self, table: str) -> int:
+        """
+        Get the data version of a table (incremented on every ingest that changed data)
+
+        Args:
+            table: Table name
+
+        Returns:
+            Data version, or 0 if the table was never ingested
+        """
+        conn = self._connect()
+        try:
+            meta = self._metadata(conn, table)
+            return meta["data_version"] if meta else 0
+        finally:
+            conn.close()
+
+    def ingest(self, spec: TableSpec, csv_path: str) -> Dict[str, Any]:
+        """
+        Bring a table in line with its CSV source
+
+        Args:
+            spec: Table description
+            csv_path: Path to the CSV source
+
+        Returns:
+            Dict with status ('unchanged', 'loaded', 'updated' or 'missing') and row counts
+        """
+        start = time.perf_counter()
+        if not os.path.exists(csv_path):
+            return {"table": spec.name, "status": "missing", "source": csv_path}
+
+        conn = self._connect()
+        try:
+            quick = fingerprint_file(csv_path, with_hash=False)
+            if self._is_current(conn, spec, quick):
+                self._ensure_indexes(conn, spec)
+                return self._result(spec, "unchanged", start, self._metadata(conn, spec.name))
+
+            fingerprint = fingerprint_file(csv_path)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-check under the write lock: another worker may have just ingested
+                meta = self._metadata(conn, spec.name)
+                if self._is_current(conn, spec, fingerprint, compare_hash=True):
+                    self._write_metadata(conn, spec, csv_path, fingerprint, meta["row_count"], meta["data_version"])
+                    self._ensure_indexes(conn, spec)
+                    conn.execute("COMMIT")
+                    return self._result(spec, "unchanged", start, meta)
+
+                rows = self._read_rows(spec, csv_path)
+                if meta and meta["schema_version"] == spec.schema_version and self._table_exists(conn, spec.name):
+                    status = "updated"
+                    counts = self._apply_diff(conn, spec, rows)
+                else:
+                    status = "loaded"
+                    counts = self._rebuild(conn, spec, rows)
+
+                self._ensure_indexes(conn, spec)
+                data_version = (meta["data_version"] if meta else 0) + 1
+                self._write_metadata(conn, spec, csv_path, fingerprint, len(rows), data_version)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            result = self._result(spec, status, start, self._metadata(conn, spec.name))
+            result.update(counts)
+            return result
+        finally:
+            conn.close()
+
+    def _is_current(
+        self,
+        conn: sqlite3.Connection,
+        spec: TableSpec,
+        fingerprint: Dict[str, Any],
+        compare_hash: bool = False
+    ) -> bool:
+        """Check whether the stored ingest still matches the source file"""
+        meta = self._metadata(conn, spec.name)
+        if not meta or meta["schema_version"] != spec.schema_version:
+            return False
+        if not self._table_exists(conn, spec.name):
+            return False
+        if compare_hash:
+            return meta["sha256"] == fingerprint["sha256"]
+        return meta["size"] == fingerprint["size"] and meta["mtime_ns"] == fingerprint["mtime_ns"]
+
+    @staticmethod
+    def _ensure_indexes(conn: sqlite3.Connection, spec: TableSpec):
+        """Create any index declared by the spec that does not exist yet"""
+        existing = {
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (spec.name,)
+            )
+        }
+        for index_name, index_columns in spec.indexes:
+            if index_name not in existing:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON "{spec.name}" ({index_columns})')
+
+    @staticmethod
+    def _read_rows(spec: TableSpec, csv_path: str) -> List[Tuple]:
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            return [spec.convert(record) for record in csv.DictReader(f)]
+
+    def _rebuild(self, conn: sqlite3.Connection, spec: TableSpec, rows: List[Tuple]) -> Dict[str, int]:
+        """Recreate the table from scratch, carrying preserved columns over by key"""
+        preserved = {}
+        if spec.key and spec.preserve and self._table_exists(conn, spec.name):
+            try:
+                selected = ", ".join(f'"{c}"' for c in spec.key + spec.preserve)
+                for row in conn.execute(f'SELECT {selected} FROM "{spec.name}"'):
+                    preserved[tuple(row[:len(spec.key)])] = row[len(spec.key):]
+            except sqlite3.OperationalError:
+                # Old table has an incompatible layout; nothing to carry over
+                preserved = {}
+
+        conn.execute(f'DROP TABLE IF EXISTS "{spec.name}"')
+        conn.execute(spec.create_sql())
+        placeholders = ", ".join("?" for _ in spec.columns)
+        conn.executemany(f'INSERT INTO "{spec.name}" VALUES ({placeholders})', rows)
+
+        if preserved:
+            assignments = ", ".join(f'"{c}" = ?' for c in spec.preserve)
+            conditions = " AND ".join(f'"{c}" = ?' for c in spec.key)
+            conn.executemany(
+                f'UPDATE "{spec.name}" SET {assignments} WHERE {conditions}',
+                [tuple(values) + key for key, values in preserved.items()]
+            )
+
+        return {"inserted": len(rows), "updated": 0, "deleted": 0}
+
+    def _apply_diff(self, conn: sqlite3.Connection, spec: TableSpec, rows: List[Tuple]) -> Dict[str, int]:
+        """Apply only the rows that differ between the table and the CSV"""
+        if spec.key:
+            return self._apply_keyed_diff(conn, spec, rows)
+        return self._apply_multiset_diff(conn, spec, rows)
+
+    def _apply_keyed_diff(self, conn: sqlite3.Connection, spec: TableSpec, rows: List[Tuple]) -> Dict[str, int]:
+        names = spec.column_names
+        key_positions = [names.index(c) for c in spec.key]
+        compare_positions = [i for i, c in enumerate(names) if c not in spec.preserve]
+        selected = ", ".join(f'"{c}"' for c in names)
+
+        existing = {}
+        for row in conn.execute(f'SELECT {selected} FROM "{spec.name}"'):
+            existing[tuple(row[i] for i in key_positions)] = row
+
+        upserts = []
+        inserted = 0
+        source_keys = set()
+        for row in rows:
+            key = tuple(row[i] for i in key_positions)
+            source_keys.add(key)
+            current = existing.get(key)
+            if current is None:
+                inserted += 1
+                upserts.append(row)
+            elif any(current[i] != row[i] for i in compare_positions):
+                upserts.append(row)
+
+        if upserts:
+            placeholders = ", ".join("?" for _ in names)
+            conflict = ", ".join(f'"{c}"' for c in spec.key)
+            updatable = [c for c in names if c not in spec.key and c not in spec.preserve]
+            if updatable:
+                action = "DO UPDATE SET " + ", ".join(f'"{c}" = excluded."{c}"' for c in updatable)
+            else:
+                action = "DO NOTHING"
+            conn.executemany(
+                f'INSERT INTO "{spec.name}" ({selected}) VALUES ({placeholders}) '
+                f'ON CONFLICT ({conflict}) {action}',
+                upserts
+            )
+
+        removed = [key for key in existing if key not in source_keys]
+        if removed:
+            conditions = " AND ".join(f'"{c}" = ?' for c in spec.key)
+            conn.executemany(f'DELETE FROM "{spec.name}" WHERE {conditions}', removed)
+
+        return {"inserted": inserted, "updated": len(upserts) - inserted, "deleted": len(removed)}
+
+    def _apply_multiset_diff(self, conn: sqlite3.Connection, spec: TableSpec, rows: List[Tuple]) -> Dict[str, int]:
+        """Diff tables without a natural key (duplicate rows allowed) by row content"""
+        selected = ", ".join(f'"{c}"' for c in spec.column_names)
+        rowids_by_content = defaultdict(list)
+        for row in conn.execute(f'SELECT rowid, {selected} FROM "{spec.name}"'):
+            rowids_by_content[tuple(row[1:])].append(row[0])
+
+        wanted = Counter(rows)
+        stale_rowids = []
+        for content, rowids in rowids_by_content.items():
+            surplus = len(rowids) - wanted.get(content, 0)
+            if surplus > 0:
+                stale_rowids.extend(rowids[-surplus:])
+
+        missing = []
+        for content, count in wanted.items():
+            missing.extend([content] * (count - len(rowids_by_content.get(content, []))))
+
+        if stale_rowids:
+            conn.executemany(f'DELETE FROM "{spec.name}" WHERE rowid = ?', [(r,) for r in stale_rowids])
+        if missing:
+            placeholders = ", ".join("?" for _ in spec.columns)
+            conn.executemany(f'INSERT INTO "{spec.name}" ({selected}) VALUES ({placeholders})', missing)
+
+        return {"inserted": len(missing), "updated": 0, "deleted": len(stale_rowids)}
+
+    @staticmethod
+    def _write_metadata(
+        conn: sqlite3.Connection,
+        spec: TableSpec,
+        csv_path: str,
+        fingerprint: Dict[str, Any],
+        row_count: int,
+        data_version: int
+    ):
+        conn.execute(
+            f"INSERT OR REPLACE INTO {METADATA_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                spec.name, csv_path, fingerprint["size"], fingerprint["mtime_ns"],
+                fingerprint["sha256"], spec.schema_version, row_count, data_version,
+                datetime.now().isoformat()
+            )
+        )
+
+    @staticmethod
+    def _result(spec: TableSpec, status: str, start: float, meta: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "table": spec.name,
+            "status": status,
+            "rows": meta["row_count"] if meta else 0,
+            "data_version": meta["data_version"] if meta else 0,
+            "seconds": round(time.perf_counter() - start, 4),
+        }
+
+
+# Table definitions for the bundled datasets
+DOCTORS_TABLE = TableSpec(
+    name="doctors",
+    columns=[
+        ("id", "INTEGER"),
+        ("name", "TEXT NOT NULL"),
+        ("specialization", "TEXT NOT NULL"),
+        ("contact", "TEXT NOT NULL"),
+    ],
+    key=["id"],
+    indexes=[
+        ("idx_doctors_specialization", '"specialization" COLLATE NOCASE'),
+        ("idx_doctors_name", '"name" COLLATE NOCASE'),
+    ],
+)
+
+SLOTS_TABLE = TableSpec(
+    name="slots",
+    columns=[
+        ("id", "INTEGER"),
+        ("doctor_id", "INTEGER NOT NULL"),
+        ("datetime", "TEXT NOT NULL"),
+        ("is_available", "INTEGER NOT NULL"),
+    ],
+    key=["id"],
+    # Availability changes when appointments are booked; the CSV only seeds it
+    preserve=["is_available"],
+    converters={"datetime": to_iso_timestamp},
+    indexes=[
+        ("idx_slots_doctor_available_datetime", '"doctor_id", "is_available", "datetime"'),
+    ],
+    # v2: datetime stored as ISO timestamps instead of "2025-03-01 8:00 AM"
+    schema_version=2,
+)
+
+EMERGENCY_DIRECTORY_TABLE = TableSpec(
+    name="emergency_directory",
+    columns=[
+        ("Zip Code", "INTEGER NOT NULL"),
+        ("Hospital Name", "TEXT NOT NULL"),
+        ("Ambulance Available", "TEXT NOT NULL"),
+    ],
+)
+
+def _report(result: Dict[str, Any], label: str):
+    """Print an ingest result in the same style as the agents' setup logs"""
+    if result["status"] == "missing":
+        print(f"⚠️ {label} CSV not found: {result['source']}")
+    elif result["status"] == "unchanged":
+        print(f"✅ {label} unchanged (v{result['data_version']}), skipped reload")
+    else:
+        print(
+            f"✅ {label} {result['status']} (v{result['data_version']}): "
+            f"+{result['inserted']} ~{result['updated']} -{result['deleted']} rows "
+            f"in {result['seconds']:.3f}s"
+        )
+
+
+def ingest_doctor_data(
+    doctors_csv_path: str = "data/doctors_info_data.csv",
+    slots_csv_path: str = "data/doctors_slots_data.csv",
+    db_path: str = APPOINTMENTS_DB_PATH
+) -> List[Dict[str, Any]]:
+    """
+    Ingest the doctors and slots CSVs into the appointments database
+
+    Args:
+        doctors_csv_path: Path to doctors CSV file
+        slots_csv_path: Path to slots CSV file
+        db_path: Path to SQLite database
+
+    Returns:
+        List of per-table ingest results
+    """
+    ingestor = CSVIngestor(db_path)
+    results = []
+    for spec, path, label in (
+        (DOCTORS_TABLE, doctors_csv_path, "Doctors"),
+        (SLOTS_TABLE, slots_csv_path, "Appointment slots"),
+    ):
+        result = ingestor.ingest(spec, path)
+        _report(result, label)
+        results.append(result)
+    return results
+
+
+def ingest_emergency_data(
+    emergency_csv_path: str = "data/hospitals_emergency_data.csv",
+    db_path: str = EMERGENCY_DB_PATH
+) -> Dict[str, Any]:
+    """
+    Ingest the emergency directory CSV into the emergency database
+
+    Args:
+        emergency_csv_path: Path to emergency data CSV file
+        db_path: Path to SQLite database
+
+    Returns:
+        Ingest result
+    """
+    result = CSVIngestor(db_path).ingest(EMERGENCY_DIRECTORY_TABLE, emergency_csv_path)
+    _report(result, "Emergency records")
+    return result
@@ -0,0 +1,431 @@
+"""
+Intent Classifier
+Routes chat messages to agents with a word-boundary keyword automaton plus a local TF-IDF softmax model
+Trained at startup on the bundled labeled query set; returns per-agent confidences and multi-intent routes
+"""
+
+import csv
+import math
+import re
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.constants import INTENT_TRAINING_DATA_PATH
+from src.text_index import tokenize
+
+INTENTS = ("emergency", "doctor", "diagnostic", "hospital", "general")
+AGENT_INTENTS = INTENTS[:-1]
+
+# Keyword evidence: phrase (or regex fragment) -> (intent, weight), matched on word boundaries
+KEYWORDS: Dict[str, Tuple[str, float]] = {
+    # Emergency (weighted up: a missed emergency is the costliest misroute)
+    "emergency": ("emergency", 1.5), "er": ("emergency", 1.5), "urgent": ("emergency", 1.0),
+    "urgently": ("emergency", 1.0), "911": ("emergency", 2.0), r"ambulances?": ("emergency", 2.0),
+    "critical condition": ("emergency", 1.5), "heart attack": ("emergency", 2.0),
+    "stroke": ("emergency", 1.0), "accident": ("emergency", 1.0), r"trauma( center| unit)?": ("emergency", 1.5),
+    "unconscious": ("emergency", 2.0), "not breathing": ("emergency", 2.0), "isn't breathing": ("emergency", 2.0),
+    "collapsed": ("emergency", 1.5), "overdose": ("emergency", 2.0), "seizure": ("emergency", 1.5),
+    "bleeding": ("emergency", 1.0), "icu": ("emergency", 1.0), "poison control": ("emergency", 2.0),
+    # Doctors and appointments
+    r"doctors?": ("doctor", 1.0), r"dr\.?": ("doctor", 1.5), r"physicians?": ("doctor", 1.0),
+    r"appointments?": ("doctor", 1.5), "book": ("doctor", 0.5), r"schedul(e|ing)": ("doctor", 1.0),
+    "reschedule": ("doctor", 1.5), "cancel": ("doctor", 0.5), r"slots?": ("doctor", 1.5),
+    r"consultations?": ("doctor", 1.0), "visit": ("doctor", 0.5), r"specialists?": ("doctor", 1.0),
+    r"surgeons?": ("doctor", 1.0), r"[a-z]+ologists?": ("doctor", 1.5), r"[a-z]+iatri(st|cian)s?": ("doctor", 1.5),
+    # Lab tests and diagnostics
+    r"tests?": ("diagnostic", 1.0), r"labs?": ("diagnostic", 1.0), "blood test": ("diagnostic", 1.0),
+    r"screenings?": ("diagnostic", 1.0), r"packages?": ("diagnostic", 1.0), r"check-?ups?": ("diagnostic", 0.5),
+    r"scans?": ("diagnostic", 1.0), "x-ray": ("diagnostic", 1.5), "mri": ("diagnostic", 1.5),
+    "ct": ("diagnostic", 1.5), "cbc": ("diagnostic", 1.5), "hba1c": ("diagnostic", 1.5),
+    r"lipid (profile|panel)": ("diagnostic", 1.5), r"panels?": ("diagnostic", 0.5), "ultrasound": ("diagnostic", 1.5),
+    "ecg": ("diagnostic", 1.5), "mammogram": ("diagnostic", 1.5), "fasting": ("diagnostic", 0.5),
+    # Hospitals
+    r"hospitals?": ("hospital", 1.0), r"compar(e|ing|ison)": ("hospital", 1.0), r"facilit(y|ies)": ("hospital", 0.5),
+    r"medical cent(er|re)s?": ("hospital", 1.0), r"clinics?": ("hospital", 0.5), r"ratings?": ("hospital", 1.0),
+    "readmission": ("hospital", 1.0), "mortality": ("hospital", 1.0), r"rank(ed)?": ("hospital", 0.5),
+}
+
+# Share of the final score taken from keyword evidence when any keyword matched
+KEYWORD_BLEND = 0.4
+
+# Below this top score the message goes to the general assistant
+MIN_CONFIDENCE = 0.35
+
+# Secondary agents scoring at least this much are routed too (compound questions)
+MULTI_INTENT_MIN_SCORE = 0.25
+
+# Clause boundaries of compound questions ("find a cardiologist and the nearest ER to 10002")
+_CLAUSE_SPLIT = re.compile(
+    r"\s*(?:[;?]\s*(?:(?:and\s+)?also|and|plus)?\b|,?\s+(?:and\s+also|and|also|plus|as\s+well\s+as)\b)\s*",
+    re.IGNORECASE
+)
+
+# Softmax regression training
+TRAIN_EPOCHS = 300
+TRAIN_LEARNING_RATE = 2.0
+TRAIN_L2 = 1e-4
+
+
+class IntentPrediction(NamedTuple):
+    """Routing decision for one message"""
+    intent: str                 # best intent ('general' when nothing is confident)
+    confidence: float           # score of `intent`
+    intents: List[str]          # every agent intent to route to, best first (empty for 'general')
+    scores: Dict[str, float]    # blended score per intent (sums to 1)
+
+
+class SubQuery(NamedTuple):
+    """Part of a message for one agent"""
+    intent: str
+    text: str
+    confidence: float
+
+
+def load_labeled_queries(csv_path: str = INTENT_TRAINING_DATA_PATH) -> List[Tuple[str, List[str]]]:
+    """
+    Read the bundled training set
+
+    Returns:
+        (query, intents) pairs; compound queries list several intents ("doctor|emergency")
+
+    Raises:
+        ValueError: If a row names an unknown intent
+    """
+    examples = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            labels = [label.strip() for label in row["intents"].split("|") if label.strip()]
+            unknown = set(labels) - set(INTENTS)
+            if unknown:
+                raise ValueError(f"Unknown intent(s) {sorted(unknown)} for query {row['query']!r}")
+            examples.append((row["query"], labels))
+    return examples
+
+
+def _stem(token: str) -> str:
+    """Crude plural folding so 'cardiologists' and 'cardiologist' share a feature"""
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+
+def features(text: str) -> Counter:
+    """Word unigrams, word bigrams and in-word character trigrams of a message"""
+    words = [_stem(token) for token in tokenize(text)]
+    counts = Counter(f"w:{word}" for word in words)
+    counts.update(f"b:{a}_{b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"<{word}>"
+        counts.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return counts
+
+
+class KeywordMatcher:
+    """
+    All routing keywords compiled into one regex alternation
+
+    Features:
+    - Single pass over the message (longest phrase wins at each position)
+    - Word boundaries, so "ct" no longer matches "doctor" or "contact"
+    - Weighted evidence per intent
+    """
+
+    def __init__(self, keywords: Dict[str, Tuple[str, float]] = KEYWORDS):
+        self.patterns = list(keywords.items())
+        # One group per keyword so a match maps straight back to its intent
+        ordered = sorted(range(len(self.patterns)), key=lambda i: -len(self.patterns[i][0]))
+        alternation = "|".join(f"(?P<k{i}>{self.patterns[i][0]})" for i in ordered)
+        self.regex = re.compile(rf"(?<![\w-])(?:{alternation})(?![\w-])")
+
+    def evidence(self, message: str) -> Dict[str, float]:
+        """Summed keyword weight per intent (only intents with a match)"""
+        scores: Dict[str, float] = {}
+        for match in self.regex.finditer(message.lower()):
+            intent, weight = self.patterns[int(match.lastgroup[1:])][1]
+            scores[intent] = scores.get(intent, 0.0) + weight
+        return scores
+
+
+class IntentClassifier:
+    """
+    Local intent router for the chat orchestrator
+
+    Features:
+    - TF-IDF (words, bigrams, character trigrams) + softmax regression, trained in-process
+    - Blended with keyword evidence from a single compiled automaton
+    - Confidence per intent and multi-intent routes for compound questions
+    - Sub-millisecond predictions (no network, no LLM)
+    """
+
+    def __init__(
+        self,
+        examples: Optional[Sequence[Tuple[str, List[str]]]] = None,
+        csv_path: str = INTENT_TRAINING_DATA_PATH
+    ):
+        """
+        Train the model
+
+        Args:
+            examples: (query, intents) pairs; defaults to the bundled CSV
+            csv_path: Training CSV used when examples is None
+        """
+        start = time.perf_counter()
+        self.examples = list(examples) if examples is not None else load_labeled_queries(csv_path)
+        self.matcher = KeywordMatcher()
+        self._fit(self.examples)
+        self.train_ms = (time.perf_counter() - start) * 1000
+        print(f"✅ Intent classifier trained on {len(self.examples)} queries "
+              f"({len(self.vocabulary)} features, {self.train_ms:.0f} ms)")
+
+    def _fit(self, examples: Sequence[Tuple[str, List[str]]]):
+        documents = [features(query) for query, _ in examples]
+
+        document_frequency = Counter(term for counts in documents for term in counts)
+        self.vocabulary = {term: index for index, term in enumerate(sorted(document_frequency))}
+        n = len(documents)
+        self.idf = np.array(
+            [math.log((1 + n) / (1 + document_frequency[term])) + 1 for term in sorted(document_frequency)]
+        )
+
+        X = np.zeros((n, len(self.vocabulary)), dtype=np.float32)
+        for row, counts in enumerate(documents):
+            indexes = [self.vocabulary[term] for term in counts]
+            values = np.array([1 + math.log(counts[term]) for term in counts]) * self.idf[indexes]
+            X[row, indexes] = values / np.linalg.norm(values)
+
+        # Compound queries spread their target mass over every labeled intent
+        Y = np.zeros((n, len(INTENTS)), dtype=np.float32)
+        for row, (_, labels) in enumerate(examples):
+            for label in labels:
+                Y[row, INTENTS.index(label)] = 1.0 / len(labels)
+
+        # Full-batch gradient descent on the regularized cross-entropy
+        W = np.zeros((len(self.vocabulary), len(INTENTS)), dtype=np.float32)
+        b = np.zeros(len(INTENTS), dtype=np.float32)
+        for _ in range(TRAIN_EPOCHS):
+            logits = X @ W + b
+            P = np.exp(logits - logits.max(axis=1, keepdims=True))
+            P /= P.sum(axis=1, keepdims=True)
+            gradient = (P - Y) / n
+            W -= TRAIN_LEARNING_RATE * (X.T @ gradient + TRAIN_L2 * W)
+            b -= TRAIN_LEARNING_RATE * gradient.sum(axis=0)
+
+        # Per-message inference touches ~40 features; plain floats beat numpy's per-call overhead
+        # there. Rows are pre-scaled by idf, leaving only the tf weighting and L2 norm per message
+        self._rows = {
+            term: (float(self.idf[index]), tuple(float(w) * float(self.idf[index]) for w in W[index]))
+            for term, index in self.vocabulary.items()
+        }
+        self._bias = tuple(float(value) for value in b)
+
+    def model_scores(self, message: str) -> List[float]:
+        """Softmax probabilities of the TF-IDF model alone (ordered as INTENTS)"""
+        rows = []
+        squared_norm = 0.0
+        for term, count in features(message).items():
+            entry = self._rows.get(term)
+            if entry is None:
+                continue
+            idf, row = entry
+            if count > 1:
+                tf = 1 + math.log(count)
+                row = tuple(tf * value for value in row)
+                idf *= tf
+            rows.append(row)
+            squared_norm += idf * idf
+
+        if not rows:
+            return _softmax(list(self._bias))
+        norm = math.sqrt(squared_norm)
+        return _softmax([bias + sum(column) / norm for bias, column in zip(self._bias, zip(*rows))])
+
+    def predict(self, message: str) -> IntentPrediction:
+        """
+        Score every intent for a message
+
+        Args:
+            message: User's chat message
+
+        Returns:
+            IntentPrediction with the best intent, its confidence, the agents
+            to route to and the full score table
+        """
+        scores = self.model_scores(message)
+
+        evidence = self.matcher.evidence(message)
+        if evidence:
+            total = sum(evidence.values())
+            scores = [(1 - KEYWORD_BLEND) * score + KEYWORD_BLEND * evidence.get(intent, 0.0) / total
+                      for intent, score in zip(INTENTS, scores)]
+
+        score_table = {intent: round(score, 4) for intent, score in zip(INTENTS, scores)}
+        ranked = sorted(AGENT_INTENTS, key=score_table.get, reverse=True)
+        best = max(INTENTS, key=score_table.get)
+
+        if best == "general" or score_table[best] < MIN_CONFIDENCE:
+            return IntentPrediction("general", score_table["general"], [], score_table)
+
+        intents = [intent for intent in ranked if score_table[intent] >= MULTI_INTENT_MIN_SCORE]
+        return IntentPrediction(best, score_table[best], intents, score_table)
+
+    def plan(self, message: str) -> List[SubQuery]:
+        """
+        Split a compound question into one sub-question per agent
+
+        The message is cut at conjunctions and clause punctuation and every
+        clause is classified; clauses without a confident agent (or for the
+        same agent as the clause before) stay attached to their neighbour,
+        so "compare Mount Sinai and NYU" is not split
+
+        Args:
+            message: User's chat message
+
+        Returns:
+            SubQuery per agent in order of first mention; a single entry
+            (the whole message) when it is not a compound question
+        """
+        clauses = [clause.strip(" ,.?") for clause in _CLAUSE_SPLIT.split(message) if clause.strip(" ,.?")]
+        groups: Dict[str, List[str]] = {}
+        confidences: Dict[str, float] = {}
+        pending: List[str] = []
+        current = None
+        if len(clauses) > 1:
+            for clause in clauses:
+                prediction = self.predict(clause)
+                if prediction.intent == "general" or prediction.intent == current:
+                    (groups[current] if current else pending).append(clause)
+                    continue
+                current = prediction.intent
+                groups.setdefault(current, []).extend(pending + [clause])
+                confidences[current] = max(confidences.get(current, 0.0), prediction.confidence)
+                pending = []
+
+        if len(groups) < 2:
+            prediction = self.predict(message)
+            return [SubQuery(prediction.intent, message, prediction.confidence)]
+        return [SubQuery(intent, " and ".join(parts), confidences[intent]) for intent, parts in groups.items()]
+
+    def classify(self, message: str) -> str:
+        """Best intent only: 'emergency', 'hospital', 'doctor', 'diagnostic' or 'general'"""
+        return self.predict(message).intent
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "examples": len(self.examples),
+            "features": len(self.vocabulary),
+            "keywords": len(self.matcher.patterns),
+            "train_ms": round(self.train_ms, 1),
+        }
+
+
+def _softmax(logits: List[float]) -> List[float]:
+    peak = max(logits)
+    shifted = [math.exp(logit - peak) for logit in logits]
+    total = sum(shifted)
+    return [value / total for value in shifted]
+
+
+def legacy_classify(message: str) -> str:
+    """The previous first-match substring router (benchmark baseline and fallback)"""
+    message_lower = message.lower()
+    rules = [
+        ("emergency", ["emergency", "urgent", "911", "ambulance", "critical", "heart attack", "stroke",
+                       "accident", "trauma"]),
+        ("doctor", ["doctor", "appointment", "book", "schedule", "available slot", "consultation", "visit",
+                    "check-up", "specialist"]),
+        ("diagnostic", ["test", "lab", "blood", "screening", "diagnostic", "package", "checkup", "examination",
+                        "scan", "x-ray", "mri", "ct"]),
+        ("hospital", ["hospital", "compare", "facility", "medical center", "healthcare", "clinic"]),
+    ]
+    for intent, keywords in rules:
+        if any(keyword in message_lower for keyword in keywords):
+            return intent
+    return "general"
+
+
+def cross_validate(examples: Sequence[Tuple[str, List[str]]], folds: int = 5) -> Dict[str, float]:
+    """
+    k-fold accuracy of the classifier and of the legacy router on labeled queries
+
+    A prediction counts as correct when the top intent is one of the labels;
+    compound queries also report whether every label was routed
+    """
+    correct = legacy_correct = compound_total = compound_full = 0
+    for fold in range(folds):
+        train = [example for i, example in enumerate(examples) if i % folds != fold]
+        held_out = [example for i, example in enumerate(examples) if i % folds == fold]
+        classifier = IntentClassifier(train)
+        for query, labels in held_out:
+            prediction = classifier.predict(query)
+            correct += prediction.intent in labels
+            legacy_correct += legacy_classify(query) in labels
+            if len(labels) > 1:
+                compound_total += 1
+                compound_full += set(labels) <= set(prediction.intents)
+    return {
+        "accuracy": correct / len(examples),
+        "legacy_accuracy": legacy_correct / len(examples),
+        "compound_recall": compound_full / compound_total if compound_total else float("nan"),
+    }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import contextlib
+    import io
+
+    print("\n" + "="*80)
+    print("INTENT CLASSIFIER BENCHMARK")
+    print("="*80)
+
+    examples = load_labeled_queries()
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = cross_validate(examples)
+    print(f"5-fold accuracy   : {report['accuracy']:.1%}  (legacy keyword router: {report['legacy_accuracy']:.1%})")
+    print(f"Compound recall   : {report['compound_recall']:.1%} of multi-intent questions routed to every agent")
+
+    classifier = IntentClassifier(examples)
+    print(classifier.stats())
+
+    # Known misroutes of the substring router
+    probes = [
+        ("How do I contact my doctor", ["doctor"]),
+        ("test results are in, which hospital should I compare for surgery", ["hospital"]),
+        ("Find a cardiologist and the nearest ER to 10002", ["doctor", "emergency"]),
+        ("What is a healthy resting heart rate?", ["general"]),
+        ("my dad collapsed and is not breathing", ["emergency"]),
+        ("price of a CT scan in Texas", ["diagnostic"]),
+    ]
+    print("-" * 80)
+    for message, expected in probes:
+        prediction = classifier.predict(message)
+        routed = prediction.intents or ["general"]
+        mark = "✅" if routed[:len(expected)] == expected or set(expected) <= set(routed) else "❌"
+        print(f"{mark} {message[:58]:<58} -> {'+'.join(routed):<18} "
+              f"({prediction.confidence:.2f}) legacy={legacy_classify(message)}")
+
+    print("-" * 80)
+    for message in ["Find a cardiologist and the nearest ER to 10002",
+                    "Compare Mount Sinai and NYU Langone",
+                    "Book a doctor appointment; also how much is a lipid profile?"]:
+        sub_queries = classifier.plan(message)
+        print(f"{message!r} -> " + " | ".join(f"{sub.intent}: {sub.text!r}" for sub in sub_queries))
+
+    queries = [query for query, _ in examples]
+    rounds = 20
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in queries:
+            classifier.predict(query)
+    per_query = (time.perf_counter() - start) / (rounds * len(queries)) * 1e6
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in queries:
+            legacy_classify(query)
+    legacy_per_query = (time.perf_counter() - start) / (rounds * len(queries)) * 1e6
+    print("-" * 80)
+    print(f"predict(): {per_query:.1f} µs per message (legacy router {legacy_per_query:.1f} µs); "
+          f"training {classifier.train_ms:.0f} ms")
+    print(f"\n✅ Routing accuracy {report['accuracy']:.1%} vs {report['legacy_accuracy']:.1%} "
+          f"at {per_query:.0f} µs per message")
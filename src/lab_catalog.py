@@ -0,0 +1,605 @@
+"""
+Lab Catalog
+Normalized lab-test catalog built from the lab-test CSV
+Unique tests, health packages and offering hospitals with inverted indexes for filtering
+"""
+
+import csv
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from src.constants import DIAGNOSTIC_INFO_FILE_PATH
+from src.text_index import TextIndex, tokenize
+
+# Category id -> name tokens that place a test or package in it (ids match GET /api/tests/categories)
+CATEGORY_KEYWORDS = {
+    "blood": {"blood", "cholesterol", "lipid", "cbc", "glucose", "hba1c", "hemoglobin"},
+    "imaging": {"ray", "xray", "mri", "ct", "scan", "ultrasound", "imaging", "mammogram"},
+    "cardiac": {"ecg", "ekg", "heart", "cardiac", "cholesterol", "lipid", "echo"},
+    "diabetes": {"diabetes", "glucose", "hba1c", "sugar"},
+    "thyroid": {"thyroid", "tsh"},
+    "liver": {"liver", "lft"},
+    "kidney": {"kidney", "renal", "urine"},
+    "vitamin": {"vitamin", "nutrition"},
+}
+
+# Preparation instructions that mean "no food beforehand"
+_FASTING_PATTERN = re.compile(r"\bfast(?:ing)?\b|\bdo not eat\b|\bnothing to eat\b", re.IGNORECASE)
+_HOURS_PATTERN = re.compile(r"(\d+)\s*hours?", re.IGNORECASE)
+
+_YES = {"yes", "y", "true", "1"}
+_NO = {"no", "n", "false", "0"}
+
+
+class Offering(NamedTuple):
+    """One hospital offering one test (a row of the lab-test CSV)"""
+    provider_id: str
+    hospital: str
+    city: str
+    state: str
+    zip_code: str
+    test: str
+    package: str
+    preparation: str
+    fasting: bool
+
+
+def slugify(name: str) -> str:
+    """Stable identifier for a test or package name ("X-Ray" -> "x-ray")"""
+    return "-".join(tokenize(name))
+
+
+def categorize(name: str) -> List[str]:
+    """Category ids whose keywords appear in a test or package name"""
+    tokens = set(tokenize(name))
+    return [category for category, keywords in CATEGORY_KEYWORDS.items() if tokens & keywords]
+
+
+def fasting_hours(instruction: str) -> Optional[int]:
+    """
+    Fasting period implied by a preparation instruction
+
+    Returns:
+        Hours of fasting (0 if the duration is not stated), or None if the
+        instruction does not require fasting
+    """
+    if not instruction or not _FASTING_PATTERN.search(instruction):
+        return None
+    hours = _HOURS_PATTERN.search(instruction)
+    return int(hours.group(1)) if hours else 0
+
+
+def parse_fasting(value: Optional[str]) -> Optional[bool]:
+    """
+    Parse a yes/no fasting filter
+
+    Raises:
+        ValueError: On anything other than yes/no (or true/false)
+    """
+    if value is None or not str(value).strip():
+        return None
+    text = str(value).strip().lower()
+    if text in _YES:
+        return True
+    if text in _NO:
+        return False
+    raise ValueError("fasting must be 'yes' or 'no'")
+
+
+class CatalogSnapshot(NamedTuple):
+    """
+    Everything derived from one version of the CSV
+
+    Never mutated after it is built; a rebuild replaces the whole snapshot, so
+    a reader holding one always sees a consistent set of indexes
+    """
+    version: int
+    loaded_at: Optional[float]
+    offerings: Tuple[Offering, ...]
+    tests: Dict[str, Dict[str, Any]]
+    packages: Dict[str, Dict[str, Any]]
+    hospitals: Dict[str, Dict[str, Any]]
+    by_test: Dict[str, FrozenSet[int]]
+    by_package: Dict[str, FrozenSet[int]]
+    by_state: Dict[str, FrozenSet[int]]
+    by_category: Dict[str, FrozenSet[int]]
+    by_fasting: Dict[bool, FrozenSet[int]]
+    all_offerings: FrozenSet[int]
+    name_index: Optional[TextIndex]
+    name_keys: List[Tuple[str, str]]
+    test_details: Dict[str, Dict[str, Any]]
+    test_hospitals: Dict[str, Tuple[int, ...]]
+    package_summaries: List[Dict[str, Any]]
+
+
+_EMPTY_SNAPSHOT = CatalogSnapshot(
+    version=0, loaded_at=None, offerings=(), tests={}, packages={}, hospitals={},
+    by_test={}, by_package={}, by_state={}, by_category={}, by_fasting={True: frozenset(), False: frozenset()},
+    all_offerings=frozenset(), name_index=None, name_keys=[], test_details={}, test_hospitals={},
+    package_summaries=[],
+)
+
+
+class LabCatalog:
+    """
+    In-memory lab-test catalog
+
+    Features:
+    - One Offering per CSV row; unique tests, packages and hospitals derived
+      from the Diagnostic Test, Health Package and Preparation Instructions columns
+    - Fasting requirement (and hours) parsed from the preparation instructions
+    - Inverted indexes (frozensets of offering ids) by test, package, state,
+      category and fasting requirement; filters are set intersections
+    - Typo-tolerant name search over tests and packages via TextIndex
+    - Per-test details (counts by state, preparation, packages) and the package
+      list are grouped once per build, so lookups are dict reads plus paging
+    - Rebuilt when the CSV's size or modification time changes; a rebuild
+      swaps in a new CatalogSnapshot with one reference assignment, and every
+      lookup reads a single snapshot, so lock-free readers never mix versions
+    """
+
+    def __init__(self, csv_path: str = DIAGNOSTIC_INFO_FILE_PATH):
+        """
+        Initialize Lab Catalog
+
+        Args:
+            csv_path: Path to Hospital_Information_with_Lab_Tests.csv
+        """
+        self.csv_path = csv_path
+        self._fingerprint: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._snapshot: CatalogSnapshot = _EMPTY_SNAPSHOT
+
+        self.refresh_if_changed()
+
+    @property
+    def version(self) -> int:
+        """Build counter, incremented on every rebuild"""
+        return self._snapshot.version
+
+    def snapshot(self) -> CatalogSnapshot:
+        """
+        The current catalog, rebuilt first if the CSV changed
+
+        Callers reading several indexes should take one snapshot and use it
+        throughout, rather than re-reading the catalog between lookups
+        """
+        self.refresh_if_changed()
+        return self._snapshot
+
+    def refresh_if_changed(self) -> bool:
+        """
+        Rebuild the catalog if the CSV changed since it was built
+
+        Returns:
+            True if the catalog was rebuilt
+        """
+        stat = os.stat(self.csv_path)
+        fingerprint = (stat.st_size, stat.st_mtime_ns)
+        if fingerprint == self._fingerprint:
+            return False
+
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return False
+
+            start = time.perf_counter()
+            snapshot = CatalogSnapshot(
+                version=self._snapshot.version + 1,
+                loaded_at=time.time(),
+                test_details={},
+                test_hospitals={},
+                package_summaries=[],
+                **self._build()
+            )
+            snapshot = snapshot._replace(**self._precompute(snapshot))
+            # Everything is built before it is published; readers switch over in one assignment
+            self._snapshot = snapshot
+            self._fingerprint = fingerprint
+
+        print(f"✅ Lab catalog v{snapshot.version}: {len(snapshot.tests)} tests, {len(snapshot.packages)} packages, "
+              f"{len(snapshot.hospitals)} hospitals in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return True
+
+    def _build(self) -> Dict[str, Any]:
+        """Parse the CSV into offerings, catalog entries and inverted indexes"""
+        offerings: List[Offering] = []
+        hospitals: Dict[str, Dict[str, Any]] = {}
+        with open(self.csv_path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                test = (record.get("Diagnostic Test") or "").strip()
+                if not test:
+                    continue
+                preparation = (record.get("Preparation Instructions") or "").strip()
+                offering = Offering(
+                    provider_id=record["Provider ID"].strip(),
+                    hospital=record["Hospital Name"].strip(),
+                    city=record["City"].strip(),
+                    state=record["State"].strip().upper(),
+                    zip_code=record["ZIP Code"].strip().zfill(5),
+                    test=test,
+                    package=(record.get("Health Package") or "").strip(),
+                    preparation=preparation,
+                    fasting=fasting_hours(preparation) is not None,
+                )
+                offerings.append(offering)
+                hospitals.setdefault(offering.provider_id, {
+                    "id": offering.provider_id,
+                    "name": offering.hospital,
+                    "city": offering.city,
+                    "state": offering.state,
+                    "zip_code": offering.zip_code,
+                })
+
+        by_test: Dict[str, set] = {}
+        by_package: Dict[str, set] = {}
+        by_state: Dict[str, set] = {}
+        by_category: Dict[str, set] = {category: set() for category in CATEGORY_KEYWORDS}
+        by_fasting: Dict[bool, set] = {True: set(), False: set()}
+        test_names: Dict[str, str] = {}
+        package_names: Dict[str, str] = {}
+
+        for i, offering in enumerate(offerings):
+            test_key = slugify(offering.test)
+            test_names.setdefault(test_key, offering.test)
+            by_test.setdefault(test_key, set()).add(i)
+            if offering.package:
+                package_key = slugify(offering.package)
+                package_names.setdefault(package_key, offering.package)
+                by_package.setdefault(package_key, set()).add(i)
+            by_state.setdefault(offering.state, set()).add(i)
+            by_fasting[offering.fasting].add(i)
+
+        # A row belongs to a category through its test or its package
+        for names, index in ((test_names, by_test), (package_names, by_package)):
+            for key, name in names.items():
+                for category in categorize(name):
+                    by_category[category] |= index[key]
+
+        tests = {
+            key: {"id": key, "name": name, "categories": categorize(name)}
+            for key, name in sorted(test_names.items(), key=lambda item: item[1].lower())
+        }
+        packages = {
+            key: {"id": key, "name": name, "categories": categorize(name)}
+            for key, name in sorted(package_names.items(), key=lambda item: item[1].lower())
+        }
+
+        name_keys = [("test", key) for key in tests] + [("package", key) for key in packages]
+        name_index = TextIndex(
+            (
+                (doc_id, {"name": (tests if kind == "test" else packages)[key]["name"]})
+                for doc_id, (kind, key) in enumerate(name_keys)
+            ),
+            field_weights={"name": 1.0},
+        )
+
+        def freeze(index: Dict[Any, set]) -> Dict[Any, FrozenSet[int]]:
+            return {key: frozenset(ids) for key, ids in index.items()}
+
+        return {
+            "offerings": tuple(offerings),
+            "tests": tests,
+            "packages": packages,
+            "hospitals": hospitals,
+            "by_test": freeze(by_test),
+            "by_package": freeze(by_package),
+            "by_state": freeze(by_state),
+            "by_category": freeze(by_category),
+            "by_fasting": freeze(by_fasting),
+            "all_offerings": frozenset(range(len(offerings))),
+            "name_index": name_index,
+            "name_keys": name_keys,
+        }
+
+    def _precompute(self, snapshot: CatalogSnapshot) -> Dict[str, Any]:
+        """Group a freshly built snapshot's offerings into test details and package summaries"""
+        offerings = snapshot.offerings
+        test_details = {}
+        test_hospitals = {}
+        for summary in self.summarize_tests(snapshot.all_offerings, snapshot):
+            ids = snapshot.by_test[summary["id"]]
+            states = Counter(offerings[i].state for i in ids)
+            summary["by_state"] = [
+                {"state": state, "hospitals": count}
+                for state, count in sorted(states.items(), key=lambda item: (-item[1], item[0]))
+            ]
+            test_details[summary["id"]] = summary
+            test_hospitals[summary["id"]] = tuple(
+                sorted(ids, key=lambda i: (offerings[i].state, offerings[i].hospital, offerings[i].provider_id))
+            )
+
+        package_summaries = []
+        for key, package in snapshot.packages.items():
+            rows = [offerings[i] for i in snapshot.by_package[key]]
+            package_summaries.append({
+                "id": key,
+                "name": package["name"],
+                "categories": package["categories"],
+                "hospitals": len({row.provider_id for row in rows}),
+                "states": len({row.state for row in rows}),
+                "fasting_hospitals": sum(row.fasting for row in rows),
+                "tests": [
+                    {"name": name, "hospitals": count}
+                    for name, count in Counter(row.test for row in rows).most_common()
+                ],
+            })
+        package_summaries.sort(key=lambda summary: (-summary["hospitals"], summary["name"].lower()))
+
+        return {
+            "test_details": test_details,
+            "test_hospitals": test_hospitals,
+            "package_summaries": package_summaries,
+        }
+
+    def resolve_category(self, category: Optional[str]) -> Optional[str]:
+        """
+        Normalize a category id or label ("blood", "Blood Tests") to its id
+
+        Raises:
+            ValueError: If the category is unknown
+        """
+        if category is None or not category.strip():
+            return None
+        tokens = tokenize(category)
+        for category_id in CATEGORY_KEYWORDS:
+            if category_id in tokens:
+                return category_id
+        raise ValueError(f"Unknown category '{category}'. Use one of: {', '.join(CATEGORY_KEYWORDS)}")
+
+    def match_names(self, query: str, snapshot: Optional[CatalogSnapshot] = None) -> Tuple[List[str], List[str]]:
+        """
+        Tests and packages whose names match a (possibly misspelled) query
+
+        Args:
+            query: Name to look up
+            snapshot: Snapshot to search (default: the current one)
+
+        Returns:
+            (test keys, package keys), best match first
+        """
+        snapshot = snapshot or self.snapshot()
+        test_keys, package_keys = [], []
+        for doc_id, _ in snapshot.name_index.search(query, limit=None):
+            kind, key = snapshot.name_keys[doc_id]
+            (test_keys if kind == "test" else package_keys).append(key)
+        return test_keys, package_keys
+
+    def filter(
+        self,
+        search: Optional[str] = None,
+        category: Optional[str] = None,
+        state: Optional[str] = None,
+        fasting: Optional[bool] = None,
+        snapshot: Optional[CatalogSnapshot] = None
+    ) -> FrozenSet[int]:
+        """
+        Offering ids matching every given filter
+
+        Args:
+            search: Test or package name (typo tolerant); matches either
+            category: Category id or label
+            state: Two-letter state code
+            fasting: True for tests that require fasting, False for those that don't
+            snapshot: Snapshot the ids refer to (default: the current one)
+
+        Raises:
+            ValueError: On an unknown category
+        """
+        snapshot = snapshot or self.snapshot()
+        category_id = self.resolve_category(category)
+
+        # Smallest index first keeps the intersections short
+        constraints: List[FrozenSet[int]] = []
+        if search and search.strip():
+            test_keys, package_keys = self.match_names(search, snapshot)
+            matched = frozenset().union(
+                *(snapshot.by_test[key] for key in test_keys),
+                *(snapshot.by_package[key] for key in package_keys)
+            )
+            constraints.append(matched)
+        if category_id:
+            constraints.append(snapshot.by_category.get(category_id, frozenset()))
+        if state and state.strip():
+            constraints.append(snapshot.by_state.get(state.strip().upper(), frozenset()))
+        if fasting is not None:
+            constraints.append(snapshot.by_fasting[fasting])
+
+        if not constraints:
+            return snapshot.all_offerings
+        constraints.sort(key=len)
+        result = constraints[0]
+        for ids in constraints[1:]:
+            if not result:
+                break
+            result = result & ids
+        return result
+
+    def summarize_tests(self, ids: FrozenSet[int], snapshot: Optional[CatalogSnapshot] = None) -> List[Dict[str, Any]]:
+        """
+        Group offerings by test
+
+        Args:
+            ids: Offering ids to summarize
+            snapshot: Snapshot the ids came from (default: the current one)
+
+        Returns:
+            One entry per test with hospital/state counts, fasting hospitals,
+            packages and preparation instructions (most common first)
+        """
+        snapshot = snapshot or self._snapshot
+        offerings = snapshot.offerings
+        summaries = []
+        for key, test_ids in snapshot.by_test.items():
+            selected = test_ids if ids is snapshot.all_offerings else test_ids & ids
+            if not selected:
+                continue
+            rows = [offerings[i] for i in selected]
+            test = snapshot.tests[key]
+            preparation = Counter(row.preparation for row in rows if row.preparation)
+            summaries.append({
+                "id": key,
+                "name": test["name"],
+                "categories": test["categories"],
+                "hospitals": len({row.provider_id for row in rows}),
+                "states": len({row.state for row in rows}),
+                "fasting_hospitals": len(selected & snapshot.by_fasting[True]),
+                "packages": [
+                    {"name": name, "hospitals": count}
+                    for name, count in Counter(row.package for row in rows if row.package).most_common()
+                ],
+                "preparation": [
+                    {"instruction": text, "hospitals": count, "fasting_hours": fasting_hours(text)}
+                    for text, count in preparation.most_common()
+                ],
+            })
+        summaries.sort(key=lambda summary: (-summary["hospitals"], summary["name"].lower()))
+        return summaries
+
+    def resolve_test(self, name: str, snapshot: Optional[CatalogSnapshot] = None) -> Optional[str]:
+        """Catalog key for a test name or id, falling back to the best (typo-tolerant) name match"""
+        snapshot = snapshot or self.snapshot()
+        key = slugify(name or "")
+        if key in snapshot.tests:
+            return key
+        test_keys, _ = self.match_names(name or "", snapshot)
+        return test_keys[0] if test_keys else None
+
+    def test_details(
+        self,
+        name: str,
+        state: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Details for one test: counts by state, preparation, packages and the
+        hospitals offering it
+
+        Args:
+            name: Test name or id (typo tolerant)
+            state: Only list offering hospitals in this state
+            limit: Page size for the hospital list
+            offset: Page offset for the hospital list
+
+        Returns:
+            Test details with an "offered_by" page and its "total", or None if
+            no test matches
+        """
+        snapshot = self.snapshot()
+        key = self.resolve_test(name, snapshot)
+        if key is None:
+            return None
+
+        ids = snapshot.test_hospitals[key]
+        if state and state.strip():
+            in_state = snapshot.by_state.get(state.strip().upper(), frozenset())
+            ids = [i for i in ids if i in in_state]
+
+        offerings = snapshot.offerings
+        details = dict(snapshot.test_details[key])
+        details["total"] = len(ids)
+        details["offered_by"] = [
+            {
+                **snapshot.hospitals[offerings[i].provider_id],
+                "package": offerings[i].package or None,
+                "preparation": offerings[i].preparation or None,
+                "fasting_hours": fasting_hours(offerings[i].preparation),
+            }
+            for i in ids[offset:offset + limit]
+        ]
+        return details
+
+    def package_list(self) -> List[Dict[str, Any]]:
+        """Health packages with their hospital counts and the tests offered with them"""
+        return self.snapshot().package_summaries
+
+    def search(
+        self,
+        search: Optional[str] = None,
+        category: Optional[str] = None,
+        state: Optional[str] = None,
+        fasting: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Filter the catalog and summarize the matching tests
+
+        Returns:
+            Dict with tests, offering and hospital counts and query time in ms
+
+        Raises:
+            ValueError: On an unknown category
+        """
+        start = time.perf_counter()
+        snapshot = self.snapshot()
+        ids = self.filter(search=search, category=category, state=state, fasting=fasting, snapshot=snapshot)
+        offerings = snapshot.offerings
+        return {
+            "tests": self.summarize_tests(ids, snapshot),
+            "offerings": len(ids),
+            "hospitals": len({offerings[i].provider_id for i in ids}),
+            "query_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Catalog size and version information"""
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version,
+            "offerings": len(snapshot.offerings),
+            "tests": len(snapshot.tests),
+            "packages": len(snapshot.packages),
+            "hospitals": len(snapshot.hospitals),
+            "states": len(snapshot.by_state),
+            "loaded_at": snapshot.loaded_at,
+        }
+
+
+# Benchmark: catalog queries vs. a linear scan over the CSV rows
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("LAB CATALOG BENCHMARK")
+    print("="*80)
+
+    start = time.perf_counter()
+    catalog = LabCatalog()
+    print(f"build                : {(time.perf_counter() - start) * 1000:>8.2f} ms")
+    print(f"stats                : {catalog.stats()}")
+
+    queries = [
+        {},
+        {"category": "blood"},
+        {"search": "mri"},
+        {"search": "cholestrol", "fasting": True},
+        {"category": "imaging", "state": "CA", "fasting": False},
+        {"search": "heart care", "state": "TX"},
+    ]
+    repeats = 200
+    for query in queries:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            result = catalog.search(**query)
+        elapsed = (time.perf_counter() - start) / repeats * 1000
+        print(f"{str(query):<58}: {elapsed:7.3f} ms  {len(result['tests'])} tests, "
+              f"{result['hospitals']} hospitals")
+
+    for label, call in (
+        ("test_details('MRI Scan')", lambda: catalog.test_details("MRI Scan")),
+        ("test_details('xray', state='NY')", lambda: catalog.test_details("xray", state="NY")),
+        ("package_list()", catalog.package_list),
+    ):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            call()
+        print(f"{label:<58}: {(time.perf_counter() - start) / repeats * 1000:7.3f} ms")
+
+    rows = catalog.snapshot().offerings
+    start = time.perf_counter()
+    for _ in range(repeats):
+        matches = [row for row in rows if row.state == "CA" and row.fasting and "scan" in row.test.lower()]
+    print(f"linear scan (CA, fasting, 'scan')                         : "
+          f"{(time.perf_counter() - start) / repeats * 1000:7.3f} ms  {len(matches)} rows")
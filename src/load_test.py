@@ -0,0 +1,138 @@
+"""
+Load Test
+Checks that static pages and /health stay fast while many chat requests are in flight
+Run against a live server: python -m src.load_test --base-url http://localhost:7860
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+# Distinct questions (the numbers keep them out of each other's response-cache entries)
+CHAT_TEMPLATES = [
+    "Find emergency services in zip code {zip_code}",
+    "Which doctors have available slots on day {n} of next month?",
+    "What lab tests are available for diabetes screening? (request {n})",
+    "Compare hospitals near zip code {zip_code}",
+]
+
+PROBE_PATHS = ["/health", "/", "/chat.html", "/js/chat.js", "/css/main.css"]
+
+# Probes slower than this while chats are running count as a failure
+PROBE_P95_BUDGET_MS = 250.0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(label: str, timings: List[float]) -> str:
+    if not timings:
+        return f"{label:<14}: no samples"
+    return (f"{label:<14}: n={len(timings):<5} p50={statistics.median(timings):8.1f} ms  "
+            f"p95={percentile(timings, 95):8.1f} ms  max={max(timings):8.1f} ms")
+
+
+async def run_chat(client: httpx.AsyncClient, n: int, timings: List[float], errors: List[str]):
+    message = CHAT_TEMPLATES[n % len(CHAT_TEMPLATES)].format(n=n, zip_code=f"{35000 + n:05d}")
+    start = time.perf_counter()
+    try:
+        response = await client.post("/chat", json={"message": message, "history": []})
+        response.raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+    except Exception as e:
+        errors.append(f"chat {n}: {e}")
+
+
+async def run_probes(client: httpx.AsyncClient, stop: asyncio.Event, interval: float,
+                     timings: Dict[str, List[float]], errors: List[str]):
+    while not stop.is_set():
+        for path in PROBE_PATHS:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 500:
+                    errors.append(f"{path}: HTTP {response.status_code}")
+            except Exception as e:
+                errors.append(f"{path}: {e}")
+                continue
+            timings.setdefault(path, []).append((time.perf_counter() - start) * 1000)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main(base_url: str, chats: int, interval: float, timeout: float) -> bool:
+    """
+    Fire `chats` concurrent /chat requests and probe fast endpoints until they finish
+
+    Returns:
+        True if every probe path's p95 stayed within PROBE_P95_BUDGET_MS
+    """
+    limits = httpx.Limits(max_connections=chats + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as chat_client, \
+            httpx.AsyncClient(base_url=base_url, timeout=timeout) as probe_client:
+        # Baseline with nothing else in flight
+        baseline: Dict[str, List[float]] = {}
+        probe_errors: List[str] = []
+        for _ in range(5):
+            for path in PROBE_PATHS:
+                start = time.perf_counter()
+                await probe_client.get(path)
+                baseline.setdefault(path, []).append((time.perf_counter() - start) * 1000)
+
+        chat_timings: List[float] = []
+        chat_errors: List[str] = []
+        under_load: Dict[str, List[float]] = {}
+        stop = asyncio.Event()
+
+        start = time.perf_counter()
+        prober = asyncio.create_task(run_probes(probe_client, stop, interval, under_load, probe_errors))
+        await asyncio.gather(*(run_chat(chat_client, n, chat_timings, chat_errors) for n in range(chats)))
+        stop.set()
+        await prober
+        elapsed = time.perf_counter() - start
+
+    print("\n" + "="*80)
+    print(f"LOAD TEST: {chats} concurrent chats against {base_url} ({elapsed:.1f}s)")
+    print("="*80)
+    print(summarize("chat", chat_timings))
+    print(f"chat errors   : {len(chat_errors)}")
+    print("-" * 80)
+    healthy = True
+    for path in PROBE_PATHS:
+        idle = baseline.get(path, [])
+        busy = under_load.get(path, [])
+        print(summarize(f"{path} idle", idle))
+        print(summarize(f"{path} busy", busy))
+        if busy and percentile(busy, 95) > PROBE_P95_BUDGET_MS:
+            healthy = False
+    print(f"probe errors  : {len(probe_errors)}")
+    for error in (chat_errors + probe_errors)[:10]:
+        print(f"  {error}")
+
+    if healthy:
+        print(f"\n✅ Static pages and /health stayed under {PROBE_P95_BUDGET_MS:.0f} ms (p95) during the chat burst")
+    else:
+        print(f"\nWarning: Some probes exceeded {PROBE_P95_BUDGET_MS:.0f} ms (p95) while chats were in flight")
+    return healthy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Probe latency of fast endpoints during a chat burst")
+    parser.add_argument("--base-url", default="http://localhost:7860")
+    parser.add_argument("--chats", type=int, default=50, help="Concurrent /chat requests")
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between probe rounds")
+    parser.add_argument("--timeout", type=float, default=180.0, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+
+    ok = asyncio.run(main(args.base_url, args.chats, args.interval, args.timeout))
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,500 @@
+"""
+Metrics
+In-process counters and latency histograms exported at /metrics in the Prometheus text format
+Cheap enough to stay on in production: one lock, a bisect and a few additions per observation
+"""
+
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers cached answers (ms) through multi-step agent loops (tens of seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# Seconds; in-process work such as classification and SQL lookups
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# LLM calls per agent query
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15)
+
+# Tokens per LLM call
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labels), 0.0)
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of a block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels: str) -> Optional[Tuple[List[int], float, int]]:
+        """(per-bucket counts, sum, count) for one label set, or None if never observed"""
+        series = self._series.get(tuple(str(labels[name]) for name in self.labels))
+        if series is None:
+            return None
+        with self._lock:
+            return list(series[0]), series[1], series[2]
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics plus gauge collectors
+
+    Features:
+    - Counters and histograms created once by name (re-registering returns the same metric)
+    - Gauge collectors: callables sampled only when /metrics is scraped
+    - Prometheus text exposition format 0.0.4
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: Dict[str, Tuple[str, Callable[[], Dict[str, float]]]] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labels, buckets)
+
+    def register_collector(self, prefix: str, documentation: str, collect: Callable[[], Dict[str, float]]):
+        """
+        Export numeric values computed at scrape time as gauges
+
+        Args:
+            prefix: Metric name prefix; each key of the collected dict becomes `<prefix>_<key>`
+            documentation: HELP text shared by the gauges
+            collect: Returns {name: number}; non-numeric values are skipped
+        """
+        with self._lock:
+            self._collectors[prefix] = (documentation, collect)
+
+    def expose(self) -> str:
+        """All metrics in the Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.expose())
+
+        for prefix, (documentation, collect) in collectors:
+            try:
+                values = collect() or {}
+            except Exception as e:
+                lines.append(f"# collector {prefix} failed: {_escape(str(e))}")
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry and the application's metrics
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "healthsense_http_request_duration_seconds",
+    "Total HTTP request time by route template",
+    ("method", "route", "status")
+)
+CLASSIFY_SECONDS = registry.histogram(
+    "healthsense_classify_duration_seconds",
+    "Time to route a chat message to its agent(s)",
+    buckets=FAST_BUCKETS
+)
+AGENT_QUERY_SECONDS = registry.histogram(
+    "healthsense_agent_query_duration_seconds",
+    "Agent query time, including cache lookups, LLM calls and tools",
+    ("agent", "cache")
+)
+AGENT_ERRORS = registry.counter(
+    "healthsense_agent_errors_total",
+    "Agent queries that raised",
+    ("agent",)
+)
+LLM_CALL_SECONDS = registry.histogram(
+    "healthsense_llm_call_duration_seconds",
+    "Duration of a single LLM request",
+    ("agent",)
+)
+LLM_ROUND_TRIPS = registry.histogram(
+    "healthsense_llm_round_trips",
+    "LLM requests made while answering one agent query",
+    ("agent",),
+    buckets=ROUND_TRIP_BUCKETS
+)
+LLM_TOKENS = registry.counter(
+    "healthsense_llm_tokens_total",
+    "LLM tokens used",
+    ("agent", "kind")
+)
+LLM_CALL_TOKENS = registry.histogram(
+    "healthsense_llm_call_tokens",
+    "Prompt plus completion tokens of a single LLM request",
+    ("agent",),
+    buckets=TOKEN_BUCKETS
+)
+TOOL_SECONDS = registry.histogram(
+    "healthsense_tool_duration_seconds",
+    "Agent tool execution time (kind: sql, pandas, other)",
+    ("agent", "kind"),
+    buckets=FAST_BUCKETS + LATENCY_BUCKETS[LATENCY_BUCKETS.index(1.0) + 1:]
+)
+SQL_FAST_PATH_RESULTS = registry.counter(
+    "healthsense_sql_fast_path_total",
+    "Direct-SQL fast path outcomes (answered, or why the agent loop was used instead)",
+    ("agent", "outcome")
+)
+
+
+class QueryScope:
+    """Per-query tallies filled in by the LLM callback handler"""
+
+    __slots__ = ("agent", "llm_calls", "cache")
+
+    def __init__(self, agent: str):
+        self.agent = agent
+        self.llm_calls = 0
+        self.cache = "miss"
+
+
+# The agent query being answered in this task/thread (contextvars follow asyncio tasks
+# and LangChain's run_in_executor hops)
+_current_query: contextvars.ContextVar[Optional[QueryScope]] = contextvars.ContextVar(
+    "healthsense_agent_query", default=None
+)
+
+
+def current_query() -> Optional[QueryScope]:
+    return _current_query.get()
+
+
+@contextmanager
+def track_agent_query(agent: str) -> Iterator[QueryScope]:
+    """
+    Time one agent query and count the LLM round-trips made inside it
+
+    Usable from sync and async code. Set `scope.cache` to "hit" (or "bypass")
+    when the answer did not need the LLM, so cached latency does not hide
+    the real per-agent cost
+
+    Args:
+        agent: Agent label ('doctor', 'emergency', 'diagnostic', 'hospital')
+    """
+    scope = QueryScope(agent)
+    token = _current_query.set(scope)
+    start = time.perf_counter()
+    try:
+        yield scope
+    except BaseException:
+        AGENT_ERRORS.inc(agent=agent)
+        raise
+    finally:
+        try:
+            _current_query.reset(token)
+        except ValueError:
+            # An abandoned streaming generator is closed from another context
+            pass
+        AGENT_QUERY_SECONDS.observe(time.perf_counter() - start, agent=agent, cache=scope.cache)
+        LLM_ROUND_TRIPS.observe(scope.llm_calls, agent=agent)
+
+
+def record_llm_call(agent: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0):
+    """Record one finished LLM request (called by the LangChain callback handler)"""
+    LLM_CALL_SECONDS.observe(seconds, agent=agent)
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, agent=agent, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, agent=agent, kind="completion")
+    if prompt_tokens or completion_tokens:
+        LLM_CALL_TOKENS.observe(prompt_tokens + completion_tokens, agent=agent)
+    scope = _current_query.get()
+    if scope is not None:
+        scope.llm_calls += 1
+
+
+def tool_kind(tool_name: Optional[str]) -> str:
+    """Metric label for a LangChain tool: 'sql', 'pandas' or 'other'"""
+    name = tool_name or ""
+    if name.startswith("sql_db"):
+        return "sql"
+    if name in ("python_repl_ast", "pandas_tool"):
+        return "pandas"
+    return "other"
+
+
+def route_templates(routes: Sequence[Any], prefix: str = "") -> Dict[int, str]:
+    """
+    Full path template of every route in an app's route tree
+
+    Args:
+        routes: The app's routes (Starlette / FastAPI route objects)
+        prefix: Path of the enclosing mounts
+
+    Returns:
+        id(route) -> mount prefixes + route path ("/api" + "/doctors/{doctor_id}")
+    """
+    templates = {}
+    for route in routes:
+        path = prefix + (getattr(route, "path", "") or "")
+        children = getattr(route, "routes", None)
+        if children:
+            templates.update(route_templates(children, path))
+        else:
+            templates[id(route)] = path
+    return templates
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording total request time per route template
+
+    Timing stops at the last response body chunk, so streamed chat replies
+    are measured to completion rather than to their first byte. Labels use
+    the matched route's full template including router and mount prefixes
+    ("/api/doctors/{doctor_id}"), the mount prefix for static files, or
+    "unmatched", which keeps label cardinality bounded
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+        self._templates: Dict[int, str] = {}
+
+    def _route_label(self, app: Any, route: Any) -> Optional[str]:
+        """Full path template of the matched route, or None if no route matched"""
+        if route is None:
+            return None
+        template = self._templates.get(id(route))
+        if template is None:
+            # First request, or routes were added after the map was built
+            templates = route_templates(getattr(app, "routes", None) or ())
+            template = templates.setdefault(id(route), getattr(route, "path", None))
+            self._templates = templates
+        return template
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+        recorded = False
+        # Taken before routing: a mounted sub-app replaces scope["app"] with itself
+        app = scope.get("app")
+
+        def record():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route = self._route_label(app, scope.get("route")) or scope.get("root_path") or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope.get("method", ""),
+                                         route=route, status=str(status["code"]))
+
+        async def send_wrapper(message: Dict[str, Any]):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Client disconnects and unhandled errors never send the last chunk
+            record()
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import asyncio
+
+    print("\n" + "="*80)
+    print("METRICS OVERHEAD BENCHMARK")
+    print("="*80)
+
+    n = 200_000
+    start = time.perf_counter()
+    for i in range(n):
+        HTTP_REQUEST_SECONDS.observe(0.0123, method="GET", route="/api/hospitals", status="200")
+    observe_ns = (time.perf_counter() - start) / n * 1e9
+
+    start = time.perf_counter()
+    for i in range(n // 10):
+        with track_agent_query("doctor") as scope:
+            record_llm_call("doctor", 0.8, prompt_tokens=900, completion_tokens=120)
+            TOOL_SECONDS.observe(0.002, agent="doctor", kind="sql")
+    query_us = (time.perf_counter() - start) / (n // 10) * 1e6
+
+    async def concurrent_queries():
+        async def one(agent: str, calls: int):
+            with track_agent_query(agent):
+                for _ in range(calls):
+                    await asyncio.sleep(0)
+                    record_llm_call(agent, 0.5)
+        await asyncio.gather(*(one("emergency", 2), one("diagnostic", 5), one("emergency", 2)))
+
+    asyncio.run(concurrent_queries())
+    _, total, count = LLM_ROUND_TRIPS.snapshot(agent="emergency")
+    assert (total, count) == (4, 2), "round trips must be attributed per task"
+
+    async def streamed_app(scope, receive, send):
+        scope["route"] = type("Route", (), {"path": "/chat/stream"})()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for _ in range(3):
+            await asyncio.sleep(0.01)
+            await send({"type": "http.response.body", "body": b"data: x\n\n", "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def noop_send(message):
+        pass
+
+    asyncio.run(MetricsMiddleware(streamed_app)({"type": "http", "method": "POST"}, None, noop_send))
+    _, stream_seconds, _ = HTTP_REQUEST_SECONDS.snapshot(method="POST", route="/chat/stream", status="200")
+    assert stream_seconds >= 0.03, "streamed responses are timed to their last chunk"
+
+    # Routers mounted under different prefixes must not share a label
+    class FakeRoute:
+        def __init__(self, path: str, routes: Sequence[Any] = ()):
+            self.path = path
+            self.routes = list(routes)
+
+    api_doctors, v2_doctors = FakeRoute("/doctors"), FakeRoute("/doctors")
+    fake_app = FakeRoute("", [FakeRoute("/api", [api_doctors]), FakeRoute("/v2", [v2_doctors])])
+
+    def routed_app(route):
+        async def app(scope, receive, send):
+            scope["route"] = route
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"[]"})
+        return app
+
+    for route in (api_doctors, v2_doctors, v2_doctors):
+        asyncio.run(MetricsMiddleware(routed_app(route))(
+            {"type": "http", "method": "GET", "app": fake_app}, None, noop_send
+        ))
+    assert HTTP_REQUEST_SECONDS.snapshot(method="GET", route="/api/doctors", status="200")[2] == 1
+    assert HTTP_REQUEST_SECONDS.snapshot(method="GET", route="/v2/doctors", status="200")[2] == 2
+    assert HTTP_REQUEST_SECONDS.snapshot(method="GET", route="/doctors", status="200") is None
+
+    registry.register_collector("healthsense_demo", "Demo gauges", lambda: {"entries": 42, "hit_rate": 0.5})
+    start = time.perf_counter()
+    text = registry.expose()
+    expose_ms = (time.perf_counter() - start) * 1000
+
+    print(f"histogram.observe(): {observe_ns:.0f} ns")
+    print(f"agent query with 1 LLM call + 1 SQL tool recorded: {query_us:.1f} µs of bookkeeping")
+    print(f"/metrics body: {len(text.splitlines())} lines rendered in {expose_ms:.2f} ms")
+    print("\n".join(line for line in text.splitlines() if "round_trips" in line and "emergency" in line)[:600])
+    print("\n✅ Instrumentation costs microseconds per request against LLM calls that take seconds")
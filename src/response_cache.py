@@ -0,0 +1,492 @@
+"""
+Response Cache
+Process-wide cache of LLM agent answers keyed by agent, data version and normalized query
+Near-duplicate questions are matched with a hashing vectorizer so rephrasings skip the LLM too
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Set, Tuple
+
+from src.constants import (
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_SIMILARITY,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+from src.text_index import tokenize
+
+# Rough per-entry bookkeeping cost added to the text sizes when enforcing the byte budget
+_ENTRY_OVERHEAD_BYTES = 256
+
+# How often async callers check whether another request finished computing their key
+_INFLIGHT_POLL_SECONDS = 0.02
+
+# Words dropped before vectorizing; they rarely change what is being asked
+_STOPWORDS = {"a", "an", "the", "is", "are", "me", "please", "can", "you", "i", "show", "tell", "what", "of"}
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, punctuation-free, single-spaced form of a query (the exact-match key)"""
+    return " ".join(tokenize(text))
+
+
+def hashed_features(normalized: str) -> Dict[int, float]:
+    """
+    L2-normalized sparse vector of hashed unigrams and bigrams
+
+    A stateless hashing vectorizer: crc32 buckets are stable across processes
+    and need no fitted vocabulary
+    """
+    words = [word for word in normalized.split() if word not in _STOPWORDS]
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector: Dict[int, float] = {}
+    for gram in grams:
+        bucket = zlib.crc32(gram.encode("utf-8"))
+        vector[bucket] = vector.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+    return {bucket: value / norm for bucket, value in vector.items()}
+
+
+def _numbers(normalized: str) -> Tuple[str, ...]:
+    """Digit tokens of a query; near-duplicates must agree on them (ZIP codes, dates, slot ids)"""
+    return tuple(sorted(token for token in normalized.split() if any(c.isdigit() for c in token)))
+
+
+def file_version(path: str) -> Tuple[int, int]:
+    """(size, mtime_ns) of a file, or (0, 0) if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (0, 0)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class _Entry(NamedTuple):
+    namespace: str
+    normalized: str
+    value: Any
+    created: float
+    size: int
+    vector: Dict[int, float]
+    numbers: Tuple[str, ...]
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache for agent responses with a byte budget
+
+    Features:
+    - Key is (namespace, data version, normalized query); a new data version
+      for a namespace evicts its older entries at once
+    - Data versions combine file fingerprints (SQLite database and its WAL, or
+      the source CSV) with generation counters bumped explicitly by writers
+      such as the booking engine
+    - Optional near-duplicate matching: cosine similarity of hashed
+      unigram/bigram vectors; candidates come from a feature -> keys index
+      partitioned by the numbers in the query, which must match exactly
+    - Single flight: concurrent misses for the same key wait for one computation
+      (sync and async callers share the same in-flight registry)
+    - Hit, near-hit, miss and eviction counters for monitoring
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+        ttl: float = RESPONSE_CACHE_TTL_SECONDS,
+        similarity: float = RESPONSE_CACHE_SIMILARITY
+    ):
+        """
+        Initialize Response Cache
+
+        Args:
+            max_entries: Maximum number of cached responses
+            max_bytes: Approximate memory budget for cached responses
+            ttl: Seconds a response stays valid
+            similarity: Cosine threshold for near-duplicate hits (0 disables)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.similarity = similarity
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, Hashable, str], _Entry]" = OrderedDict()
+        self._features: Dict[Tuple[str, Hashable, Tuple[str, ...], int], Set[Tuple[str, Hashable, str]]] = {}
+        self._versions: Dict[str, Hashable] = {}
+        self._generations: Dict[str, int] = {}
+        self._inflight: Dict[Tuple[str, Hashable, str], threading.Event] = {}
+        self._bytes = 0
+        self._counters: Dict[str, int] = {
+            "hits": 0,
+            "near_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "evicted_lru": 0,
+            "evicted_ttl": 0,
+            "invalidated": 0,
+        }
+
+    # ----- data versions -----
+
+    def generation(self, source: str) -> int:
+        """Explicit change counter for a data source (e.g. a database path)"""
+        return self._generations.get(os.path.abspath(source), 0)
+
+    def bump(self, source: str):
+        """Mark a data source as changed; responses that depend on it stop matching"""
+        source = os.path.abspath(source)
+        with self._lock:
+            self._generations[source] = self._generations.get(source, 0) + 1
+
+    def data_version(self, *sources: str) -> Tuple:
+        """
+        Version of the data behind a set of files
+
+        SQLite sources include their -wal file, so committed writes change the
+        version even before a checkpoint touches the main file
+        """
+        return tuple(
+            (file_version(source), file_version(source + "-wal"), self.generation(source))
+            for source in sources
+        )
+
+    # ----- lookups -----
+
+    def _drop(self, key: Tuple[str, Hashable, str], counter: Optional[str] = None):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        namespace, version, _ = key
+        for bucket in entry.vector:
+            feature = (namespace, version, entry.numbers, bucket)
+            keys = self._features.get(feature)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._features[feature]
+        if counter:
+            self._counters[counter] += 1
+
+    def _observe_version(self, namespace: str, version: Hashable):
+        """Evict a namespace's entries as soon as its data version moves on"""
+        if self._versions.get(namespace, version) != version:
+            stale = [key for key in self._entries if key[0] == namespace and key[1] != version]
+            for key in stale:
+                self._drop(key, "invalidated")
+        self._versions[namespace] = version
+
+    def _fresh(self, key, now: float) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry.created > self.ttl:
+            self._drop(key, "evicted_ttl")
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _lookup(self, namespace: str, version: Hashable, normalized: str,
+                vector: Dict[int, float]) -> Tuple[Optional[_Entry], Optional[str]]:
+        """Exact, then near-duplicate lookup (caller holds the lock)"""
+        now = time.time()
+        entry = self._fresh((namespace, version, normalized), now)
+        if entry is not None:
+            return entry, "hit"
+
+        if self.similarity <= 0 or not vector:
+            return None, None
+
+        # Features are indexed per number signature, so only entries with the same numbers are candidates
+        numbers = _numbers(normalized)
+        candidates: Set[Tuple[str, Hashable, str]] = set()
+        for bucket in vector:
+            candidates |= self._features.get((namespace, version, numbers, bucket), set())
+
+        best_key, best_score = None, self.similarity
+        for key in candidates:
+            candidate = self._entries[key]
+            score = sum(value * candidate.vector.get(bucket, 0.0) for bucket, value in vector.items())
+            if score >= best_score:
+                best_key, best_score = key, score
+
+        if best_key is not None:
+            entry = self._fresh(best_key, now)
+            if entry is not None:
+                return entry, "near_hit"
+        return None, None
+
+    def get(self, namespace: str, query: str, version: Hashable = None) -> Optional[Any]:
+        """
+        Cached response for a query, or None
+
+        Args:
+            namespace: Cache partition (usually the agent name and model)
+            query: Raw query text
+            version: Data version the response must have been computed against
+        """
+        normalized = normalize_query(query)
+        vector = hashed_features(normalized) if self.similarity > 0 else {}
+        with self._lock:
+            self._observe_version(namespace, version)
+            entry, kind = self._lookup(namespace, version, normalized, vector)
+            self._counters[kind + "s" if kind else "misses"] += 1
+        return entry.value if entry is not None else None
+
+    def put(self, namespace: str, query: str, value: Any, version: Hashable = None, size: Optional[int] = None):
+        """
+        Store a response, evicting least recently used entries beyond the budgets
+
+        Args:
+            namespace: Cache partition
+            query: Raw query text
+            value: Response to cache
+            version: Data version the response was computed against
+            size: Approximate size in bytes (defaults to the length of str(value))
+        """
+        normalized = normalize_query(query)
+        size = (size if size is not None else len(str(value).encode("utf-8"))) + len(normalized) + _ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+
+        vector = hashed_features(normalized) if self.similarity > 0 else {}
+        key = (namespace, version, normalized)
+        with self._lock:
+            self._observe_version(namespace, version)
+            if key in self._entries:
+                self._drop(key)
+            numbers = _numbers(normalized)
+            self._entries[key] = _Entry(namespace, normalized, value, time.time(), size, vector, numbers)
+            self._bytes += size
+            for bucket in vector:
+                self._features.setdefault((namespace, version, numbers, bucket), set()).add(key)
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)), "evicted_lru")
+
+    def _claim(self, namespace: str, version: Hashable, normalized: str, vector: Dict[int, float]):
+        """
+        Look a key up, or register this caller as the one computing it
+
+        Returns:
+            ("hit", (value, kind)), ("wait", event of the caller computing it)
+            or ("compute", event to set when done)
+        """
+        key = (namespace, version, normalized)
+        with self._lock:
+            self._observe_version(namespace, version)
+            entry, kind = self._lookup(namespace, version, normalized, vector)
+            if entry is not None:
+                self._counters[kind + "s"] += 1
+                return "hit", (entry.value, kind)
+            waiting = self._inflight.get(key)
+            if waiting is not None:
+                return "wait", waiting
+            self._counters["misses"] += 1
+            done = self._inflight[key] = threading.Event()
+            return "compute", done
+
+    def _release(self, key: Tuple[str, Hashable, str], done: threading.Event):
+        with self._lock:
+            self._inflight.pop(key, None)
+        done.set()
+
+    def get_or_compute(
+        self,
+        namespace: str,
+        query: str,
+        compute: Callable[[], Any],
+        version: Hashable = None,
+        cacheable: bool = True
+    ) -> Tuple[Any, Optional[str]]:
+        """
+        Return a cached response or compute, cache and return a new one
+
+        Concurrent callers missing on the same key wait for the first one's
+        result instead of all calling compute(). Exceptions from compute() are
+        not cached.
+
+        Args:
+            namespace: Cache partition
+            query: Raw query text
+            compute: Produces the response on a miss
+            version: Data version of the inputs
+            cacheable: False to bypass the cache (e.g. for write requests)
+
+        Returns:
+            (response, "hit" | "near_hit" | None for a freshly computed response)
+        """
+        if not cacheable:
+            with self._lock:
+                self._counters["bypassed"] += 1
+            return compute(), None
+
+        normalized = normalize_query(query)
+        vector = hashed_features(normalized) if self.similarity > 0 else {}
+
+        while True:
+            state, payload = self._claim(namespace, version, normalized, vector)
+            if state == "hit":
+                return payload
+            if state == "compute":
+                break
+            # Another caller is computing this key; use its result (or retry if it failed)
+            payload.wait()
+
+        try:
+            value = compute()
+            self.put(namespace, query, value, version)
+            return value, None
+        finally:
+            self._release((namespace, version, normalized), payload)
+
+    async def aget_or_compute(
+        self,
+        namespace: str,
+        query: str,
+        compute: Callable[[], Awaitable[Any]],
+        version: Hashable = None,
+        cacheable: bool = True
+    ) -> Tuple[Any, Optional[str]]:
+        """
+        Async get_or_compute(): compute is a coroutine function, and callers
+        waiting on another request's computation yield to the event loop
+
+        Returns:
+            (response, "hit" | "near_hit" | None for a freshly computed response)
+        """
+        if not cacheable:
+            with self._lock:
+                self._counters["bypassed"] += 1
+            return await compute(), None
+
+        normalized = normalize_query(query)
+        vector = hashed_features(normalized) if self.similarity > 0 else {}
+
+        while True:
+            state, payload = self._claim(namespace, version, normalized, vector)
+            if state == "hit":
+                return payload
+            if state == "compute":
+                break
+            while not payload.is_set():
+                await asyncio.sleep(_INFLIGHT_POLL_SECONDS)
+
+        try:
+            value = await compute()
+            self.put(namespace, query, value, version)
+            return value, None
+        finally:
+            self._release((namespace, version, normalized), payload)
+
+    # ----- maintenance -----
+
+    def invalidate(self, namespace: Optional[str] = None):
+        """Drop every entry (or every entry of one namespace)"""
+        with self._lock:
+            keys: Iterable = [key for key in self._entries if namespace is None or key[0] == namespace]
+            for key in list(keys):
+                self._drop(key, "invalidated")
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, hit rate and current size"""
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._entries)
+            per_namespace: Dict[str, int] = {}
+            for namespace, _, _ in self._entries:
+                per_namespace[namespace] = per_namespace.get(namespace, 0) + 1
+            size = self._bytes
+
+        lookups = counters["hits"] + counters["near_hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round((counters["hits"] + counters["near_hits"]) / lookups, 4) if lookups else None,
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "similarity": self.similarity,
+            "namespaces": per_namespace,
+        }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache shared by every agent"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+# Benchmark: lookup cost and near-duplicate behaviour on paraphrased questions
+if __name__ == "__main__":
+    print("\n" + "="*80)
+    print("RESPONSE CACHE BENCHMARK")
+    print("="*80)
+
+    cache = ResponseCache(max_entries=5000)
+    calls = []
+
+    def slow_answer(question: str) -> Callable[[], str]:
+        def compute():
+            calls.append(question)
+            time.sleep(0.02)
+            return f"Answer to: {question}"
+        return compute
+
+    seeded = [f"Which cardiologists are available on day {day}?" for day in range(1, 1001)]
+    seeded += ["Show me the available cardiologists", "What lab tests are recommended for diabetes?",
+               "Emergency hospitals near 35957"]
+    for question in seeded:
+        cache.put("doctor", question, f"Answer to: {question}", version=1)
+
+    probes = [
+        ("Show me the available cardiologists", "exact"),
+        ("show me available cardiologists!", "punctuation/stopwords"),
+        ("Which cardiologists are available on day 17?", "exact with number"),
+        ("Which cardiologists are available on day 18", "other number"),
+        ("Are any cardiologists available on day 17", "paraphrase"),
+        ("Emergency hospitals near 35958", "different ZIP"),
+        ("Which dermatologists are available?", "different specialty"),
+    ]
+    for question, label in probes:
+        start = time.perf_counter()
+        value, kind = cache.get_or_compute("doctor", question, slow_answer(question), version=1)
+        print(f"{label:<22} {(time.perf_counter() - start) * 1000:8.3f} ms  {kind or 'computed':<9} <- {value[:50]}")
+
+    repeats = 2000
+    start = time.perf_counter()
+    for _ in range(repeats):
+        cache.get("doctor", "show me available cardiologists!", version=1)
+    print(f"\nnear-duplicate lookup among {len(seeded)} entries: "
+          f"{(time.perf_counter() - start) / repeats * 1e6:.1f} us")
+
+    # Single flight: 10 concurrent identical misses -> 1 computation
+    calls.clear()
+    threads = [threading.Thread(target=cache.get_or_compute,
+                                args=("doctor", "Who is on call tonight?", slow_answer("Who is on call tonight?")),
+                                kwargs={"version": 1})
+               for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"10 concurrent misses -> {len(calls)} computation(s)")
+
+    cache.get("doctor", "Show me the available cardiologists", version=2)
+    print(f"after data version change: {cache.stats()['entries']} entries, "
+          f"{cache.stats()['invalidated']} invalidated")
+    print(f"stats: {cache.stats()}")
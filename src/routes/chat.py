@@ -5,57 +5,28 @@ Orchestrates multiple agents based on user query
 """
 
 from fastapi import APIRouter, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Dict, Optional
 from datetime import datetime
+import functools
 import sys
 import os
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.EmergencyServicesAgent import EmergencyServicesAgent
-from src.HospitalComparisonAgent import HospitalComparisonAgent
-from src.DoctorInfoAgent import DoctorInfoAgent
-from src.DiagnosticInfoAgent import DiagnosticInfoAgent
+from src.agent_registry import AgentRegistry, registry
+from src.chat_stream import format_sse, single_response
+from src.concurrency import TaskOutcome, gather_with_timeouts, iter_with_timeouts, run_blocking
+from src.constants import FANOUT_AGENT_TIMEOUT_SECONDS
+from src.intent_classifier import IntentPrediction, SubQuery, legacy_classify
+from src.metrics import CLASSIFY_SECONDS
+from src.session_store import SessionStore, format_context, validate_session_id
 
 # Initialize router
 router = APIRouter()
 
-# Initialize all agents (singleton)
-emergency_agent = None
-hospital_agent = None
-doctor_agent = None
-diagnostic_agent = None
-
-try:
-    emergency_agent = EmergencyServicesAgent()
-    print("Emergency Agent initialized for chat")
-except Exception as e:
-    print(f"Warning: Could not initialize Emergency Agent: {e}")
-    emergency_agent = None
-
-try:
-    hospital_agent = HospitalComparisonAgent()
-    print("Hospital Agent initialized for chat")
-except Exception as e:
-    print(f"Warning: Could not initialize Hospital Agent: {e}")
-    hospital_agent = None
-
-try:
-    doctor_agent = DoctorInfoAgent()
-    print("Doctor Agent initialized for chat")
-except Exception as e:
-    print(f"Warning: Could not initialize Doctor Agent: {e}")
-    doctor_agent = None
-
-try:
-    diagnostic_agent = DiagnosticInfoAgent()
-    print("Diagnostic Agent initialized for chat")
-except Exception as e:
-    print(f"Warning: Could not initialize Diagnostic Agent: {e}")
-    diagnostic_agent = None
-
 
 # Request/Response Models
 class Message(BaseModel):
@@ -65,6 +36,9 @@ class Message(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
+    # Server-side memory; a new session is started when omitted
+    session_id: Optional[str] = None
+    # Only used by clients that do not send a session_id
     history: List[Message] = []
 
 
@@ -72,6 +46,7 @@ class ChatResponse(BaseModel):
     response: str
     timestamp: str
     agent_used: Optional[str] = None
+    session_id: Optional[str] = None
 
 
 class AgentOrchestrator:
@@ -80,11 +55,52 @@ class AgentOrchestrator:
     Routes queries to the appropriate specialized agent
     """
 
-    def __init__(self):
-        self.emergency_agent = emergency_agent
-        self.hospital_agent = hospital_agent
-        self.doctor_agent = doctor_agent
-        self.diagnostic_agent = diagnostic_agent
+    AGENT_LABELS = {
+        "emergency": "Emergency Services Agent",
+        "doctor": "Doctor Information Agent",
+        "diagnostic": "Diagnostic Information Agent",
+        "hospital": "Hospital Comparison Agent",
+        "general": "General Assistant",
+    }
+
+    def __init__(self, agent_registry: AgentRegistry = registry):
+        self.registry = agent_registry
+
+    @property
+    def emergency_agent(self):
+        return self.registry.get("emergency")
+
+    @property
+    def hospital_agent(self):
+        return self.registry.get("hospital")
+
+    @property
+    def doctor_agent(self):
+        return self.registry.get("doctor")
+
+    @property
+    def diagnostic_agent(self):
+        return self.registry.get("diagnostic")
+
+    def route_query(self, message: str) -> IntentPrediction:
+        """
+        Score every agent for a message with the local intent classifier
+
+        Args:
+            message: User's message
+
+        Returns:
+            IntentPrediction (best intent, confidence, agents for compound
+            questions, per-intent scores); falls back to the keyword rules
+            with confidence 1.0 if the classifier is unavailable
+        """
+        classifier = self.registry.get("intent_classifier")
+        if classifier is not None:
+            return classifier.predict(message)
+        intent = legacy_classify(message)
+        return IntentPrediction(
+            intent, 1.0, [] if intent == "general" else [intent], {intent: 1.0}
+        )
 
     def classify_query(self, message: str) -> str:
         """
@@ -96,74 +112,141 @@ class AgentOrchestrator:
         Returns:
             Agent type: 'emergency', 'hospital', 'doctor', 'diagnostic', or 'general'
         """
-        message_lower = message.lower()
-
-        # Emergency keywords
-        emergency_keywords = [
-            "emergency", "urgent", "911", "ambulance", "critical",
-            "heart attack", "stroke", "accident", "trauma"
-        ]
-        if any(keyword in message_lower for keyword in emergency_keywords):
-            return "emergency"
-
-        # Doctor/appointment keywords
-        doctor_keywords = [
-            "doctor", "appointment", "book", "schedule", "available slot",
-            "consultation", "visit", "check-up", "specialist"
-        ]
-        if any(keyword in message_lower for keyword in doctor_keywords):
-            return "doctor"
-
-        # Lab test/diagnostic keywords
-        test_keywords = [
-            "test", "lab", "blood", "screening", "diagnostic", "package",
-            "checkup", "examination", "scan", "x-ray", "mri", "ct"
-        ]
-        if any(keyword in message_lower for keyword in test_keywords):
-            return "diagnostic"
-
-        # Hospital keywords
-        hospital_keywords = [
-            "hospital", "compare", "facility", "medical center",
-            "healthcare", "clinic"
-        ]
-        if any(keyword in message_lower for keyword in hospital_keywords):
-            return "hospital"
-
-        # Default to general
-        return "general"
-
-    def process_query(self, message: str, history: List[Message]) -> Dict:
+        return self.route_query(message).intent
+
+    def plan_query(self, message: str) -> List[SubQuery]:
+        """
+        Split a message into one sub-question per agent
+
+        Args:
+            message: User's message
+
+        Returns:
+            SubQuery list; more than one entry means a compound question that
+            is fanned out to several agents concurrently
+        """
+        classifier = self.registry.get("intent_classifier")
+        with CLASSIFY_SECONDS.time():
+            if classifier is not None:
+                return classifier.plan(message)
+            route = self.route_query(message)
+            return [SubQuery(route.intent, message, route.confidence)]
+
+    async def _context(self, history: List[Message], session_id: Optional[str]) -> str:
+        """
+        Compact conversation context for the agents
+
+        Comes from the session store when a session ID is given, otherwise
+        from the history the client sent (older clients)
+        """
+        store = await self.registry.aget("session_store") if session_id else None
+        if store is not None:
+            return await run_blocking(store.context, session_id)
+        return format_context(history)
+
+    async def _ask(self, agent_type: str, message: str, context: str) -> str:
+        """
+        One agent's answer text
+
+        LLM agents get the conversation context alongside the question (they
+        key their response cache on the bare question); the hospital
+        comparator parses the question itself, so it gets the message alone
+
+        Raises:
+            RuntimeError: If the agent is unavailable or reports a failure
+        """
+        agent = await self.registry.aget(agent_type)
+        if agent is None:
+            raise RuntimeError(f"{self.AGENT_LABELS[agent_type]} is currently unavailable")
+        if agent_type == "hospital":
+            return await agent.acompare_hospitals(message)
+        result = await agent.aquery(message, context)
+        if not result.get("success"):
+            raise RuntimeError(result.get("error", "Unknown error"))
+        return result.get("output") or "I'm sorry, I couldn't generate a proper response."
+
+    def _fan_out_calls(self, plan: List[SubQuery], context: str) -> Dict[str, Callable[[], Awaitable[str]]]:
+        return {
+            sub.intent: functools.partial(self._ask, sub.intent, sub.text, context)
+            for sub in plan
+        }
+
+    def _section(self, sub: SubQuery, outcome: TaskOutcome) -> str:
+        """One agent's part of a merged fan-out answer"""
+        if outcome.status == "ok":
+            body = outcome.value
+        elif outcome.status == "timeout":
+            body = "This part took too long to answer. Please ask it again on its own."
+        else:
+            body = f"I encountered an error: {outcome.value}"
+        return f"{self.AGENT_LABELS[sub.intent]} ({sub.text}):\n{body}"
+
+    async def _remember(self, session_id: Optional[str], message: str, response: str):
+        """Append a finished exchange to the session (a storage failure never fails the reply)"""
+        store = await self.registry.aget("session_store") if session_id else None
+        if store is None:
+            return
+        try:
+            await run_blocking(store.append, session_id, "user", message)
+            await run_blocking(store.append, session_id, "assistant", response)
+        except Exception as e:
+            print(f"Warning: Could not save chat session {session_id}: {e}")
+
+    async def process_query(self, message: str, history: List[Message], session_id: Optional[str] = None) -> Dict:
         """
         Process user query and route to appropriate agent
 
+        Agents are awaited (ainvoke), so a slow OpenAI round-trip does not
+        block other requests on the worker. Routing uses the new message
+        alone; the agents also see the session's compact context. Compound
+        questions ("find a cardiologist and the nearest ER") are split and
+        sent to their agents concurrently, each under
+        FANOUT_AGENT_TIMEOUT_SECONDS, and the answers are merged
+
         Args:
             message: User's message
-            history: Conversation history
+            history: Conversation history (used when there is no session)
+            session_id: Session whose memory provides context and stores the exchange
 
         Returns:
             Dict with response and metadata
         """
         try:
-            # Classify the query
-            agent_type = self.classify_query(message)
+            # Classify the query (one entry per agent for compound questions)
+            plan = self.plan_query(message)
+            context = await self._context(history, session_id)
+
+            if len(plan) > 1:
+                outcomes = await gather_with_timeouts(
+                    self._fan_out_calls(plan, context), FANOUT_AGENT_TIMEOUT_SECONDS
+                )
+                response_text = "\n\n".join(self._section(sub, outcomes[sub.intent]) for sub in plan)
+                await self._remember(session_id, message, response_text)
+                return {
+                    "response": response_text,
+                    "agent_used": " + ".join(self.AGENT_LABELS[sub.intent] for sub in plan),
+                    "success": True
+                }
+
+            agent_type = plan[0].intent
+            agent = await self.registry.aget(agent_type) if agent_type != "general" else None
 
             # Route to appropriate agent
-            if agent_type == "emergency" and self.emergency_agent:
-                result = self.emergency_agent.query(message)
-                agent_used = "Emergency Services Agent"
+            if agent_type == "emergency" and agent:
+                result = await agent.aquery(message, context)
+                agent_used = self.AGENT_LABELS["emergency"]
 
-            elif agent_type == "doctor" and self.doctor_agent:
-                result = self.doctor_agent.query(message)
-                agent_used = "Doctor Information Agent"
+            elif agent_type == "doctor" and agent:
+                result = await agent.aquery(message, context)
+                agent_used = self.AGENT_LABELS["doctor"]
 
-            elif agent_type == "diagnostic" and self.diagnostic_agent:
-                result = self.diagnostic_agent.query(message)
-                agent_used = "Diagnostic Information Agent"
+            elif agent_type == "diagnostic" and agent:
+                result = await agent.aquery(message, context)
+                agent_used = self.AGENT_LABELS["diagnostic"]
 
-            elif agent_type == "hospital" and self.hospital_agent:
-                result = self.hospital_agent.compare_hospitals(message)
-                agent_used = "Hospital Comparison Agent"
+            elif agent_type == "hospital" and agent:
+                result = await agent.acompare_hospitals(message)
+                agent_used = self.AGENT_LABELS["hospital"]
                 # Hospital agent returns string directly, not dict
                 result = {"success": True, "output": result}
 
@@ -173,7 +256,7 @@ class AgentOrchestrator:
                     "success": True,
                     "output": self._generate_general_response(message)
                 }
-                agent_used = "General Assistant"
+                agent_used = self.AGENT_LABELS["general"]
 
             # Extract response
             if result.get("success"):
@@ -181,6 +264,8 @@ class AgentOrchestrator:
             else:
                 response_text = f"I encountered an error: {result.get('error', 'Unknown error')}"
 
+            await self._remember(session_id, message, response_text)
+
             return {
                 "response": response_text,
                 "agent_used": agent_used,
@@ -194,6 +279,103 @@ class AgentOrchestrator:
                 "success": False
             }
 
+    async def stream_query(
+        self,
+        message: str,
+        history: List[Message],
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming process_query(): yields events as the chosen agent works
+
+        Events, in order: "agent" (which agent answers), any number of "step"
+        (tool started / SQL executed / rows returned) and "token" (answer
+        delta) events, then exactly one "done" carrying the full response.
+        Agents without token streaming (hospital comparison, general help)
+        send their whole answer as one delta. Compound questions fan out to
+        several agents; each agent's section is sent as soon as it finishes
+
+        Args:
+            message: User's message
+            history: Conversation history (used when there is no session)
+            session_id: Session whose memory provides context and stores the exchange
+
+        Yields:
+            Event dicts (see src.chat_stream.format_sse)
+        """
+        final = None
+        agent_used = "Error Handler"
+        try:
+            # Planning failures (classifier, registry) still end the stream with "done"
+            plan = self.plan_query(message)
+            agent_type = plan[0].intent
+            if len(plan) > 1:
+                agent_used = " + ".join(self.AGENT_LABELS[sub.intent] for sub in plan)
+            else:
+                agent_used = self.AGENT_LABELS[agent_type]
+            yield {
+                "event": "agent",
+                "agent_used": agent_used,
+                "agents": [{"agent": self.AGENT_LABELS[sub.intent], "query": sub.text,
+                            "confidence": sub.confidence} for sub in plan]
+            }
+
+            context = await self._context(history, session_id)
+            agent = None
+            if len(plan) == 1 and agent_type != "general":
+                agent = await self.registry.aget(agent_type)
+
+            if len(plan) > 1:
+                events = self._stream_fan_out(plan, context)
+            elif agent_type in ("emergency", "doctor", "diagnostic") and agent:
+                events = agent.astream(message, context)
+            elif agent_type == "hospital" and agent:
+                events = single_response(lambda: agent.acompare_hospitals(message))
+            else:
+                async def general():
+                    return self._generate_general_response(message)
+                events = single_response(general)
+
+            async for event in events:
+                if event["event"] == "final":
+                    final = event
+                else:
+                    yield event
+
+        except Exception as e:
+            yield {"event": "error", "message": str(e)}
+            final = {
+                "output": f"I apologize, but I encountered an error processing your request: {str(e)}",
+                "cached": False
+            }
+            agent_used = "Error Handler"
+
+        response_text = (final or {}).get("output") or "I'm sorry, I couldn't generate a proper response."
+        if agent_used != "Error Handler":
+            await self._remember(session_id, message, response_text)
+
+        yield {
+            "event": "done",
+            "response": response_text,
+            "agent_used": agent_used,
+            "cached": bool((final or {}).get("cached")),
+            "timestamp": datetime.now().isoformat(),
+            "session_id": session_id
+        }
+
+    async def _stream_fan_out(self, plan: List[SubQuery], context: str) -> AsyncIterator[Dict[str, Any]]:
+        """Fan-out as stream events: a step and a token delta per agent as it finishes, then the merged final"""
+        sub_queries = {sub.intent: sub for sub in plan}
+        sections: Dict[str, str] = {}
+        async for intent, outcome in iter_with_timeouts(
+                self._fan_out_calls(plan, context), FANOUT_AGENT_TIMEOUT_SECONDS):
+            sections[intent] = self._section(sub_queries[intent], outcome)
+            yield {"event": "step", "stage": "agent_end", "tool": self.AGENT_LABELS[intent],
+                   "status": outcome.status, "elapsed_ms": round(outcome.elapsed_ms)}
+            yield {"event": "token", "delta": sections[intent] + "\n\n"}
+        # The final answer keeps the order the user asked in
+        yield {"event": "final", "output": "\n\n".join(sections[sub.intent] for sub in plan), "cached": False}
+
     def _generate_general_response(self, message: str) -> str:
         """
         Generate a general response for non-specific queries
@@ -219,6 +401,16 @@ class AgentOrchestrator:
 orchestrator = AgentOrchestrator()
 
 
+def _resolve_session_id(request: ChatRequest) -> str:
+    """The request's session ID, or a new one; raises HTTPException(400) if malformed"""
+    if not request.session_id:
+        return SessionStore.new_session_id()
+    try:
+        return validate_session_id(request.session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_ai(request: ChatRequest):
     """
@@ -227,14 +419,14 @@ async def chat_with_ai(request: ChatRequest):
     Request format:
     {
         "message": "User's question",
-        "history": [
-            {"role": "user", "content": "Previous message"},
-            {"role": "assistant", "content": "Previous response"}
-        ]
+        "session_id": "Session ID from a previous response (optional)"
     }
 
+    The server keeps the conversation per session, so clients send only the
+    new message. Clients without a session_id may still send "history"
+
     Returns:
-        ChatResponse with AI-generated response
+        ChatResponse with AI-generated response and the session ID to reuse
     """
     try:
         if not request.message or not request.message.strip():
@@ -242,11 +434,13 @@ async def chat_with_ai(request: ChatRequest):
                 status_code=400,
                 detail="Message cannot be empty"
             )
+        session_id = _resolve_session_id(request)
 
         # Process query through orchestrator
-        result = orchestrator.process_query(
+        result = await orchestrator.process_query(
             message=request.message,
-            history=request.history
+            history=request.history,
+            session_id=session_id
         )
 
         if not result.get("success"):
@@ -254,13 +448,60 @@ async def chat_with_ai(request: ChatRequest):
             return ChatResponse(
                 response=result.get("response", "I apologize for the inconvenience."),
                 timestamp=datetime.now().isoformat(),
-                agent_used=result.get("agent_used", "Error Handler")
+                agent_used=result.get("agent_used", "Error Handler"),
+                session_id=session_id
             )
 
         return ChatResponse(
             response=result.get("response", "No response generated"),
             timestamp=datetime.now().isoformat(),
-            agent_used=result.get("agent_used", "Unknown")
+            agent_used=result.get("agent_used", "Unknown"),
+            session_id=session_id
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+@router.post("/chat/stream")
+async def stream_chat_with_ai(request: ChatRequest):
+    """
+    Streaming AI chat endpoint (server-sent events)
+
+    Same request body as POST /chat. The response is text/event-stream with
+    "agent", "step", "token", "error" and a final "done" event whose data
+    matches ChatResponse (including session_id), so the browser can render
+    the answer as it is generated instead of waiting for the whole agent run
+
+    Returns:
+        StreamingResponse of SSE frames
+    """
+    try:
+        if not request.message or not request.message.strip():
+            raise HTTPException(
+                status_code=400,
+                detail="Message cannot be empty"
+            )
+        session_id = _resolve_session_id(request)
+
+        async def frames():
+            async for event in orchestrator.stream_query(
+                message=request.message,
+                history=request.history,
+                session_id=session_id
+            ):
+                yield format_sse(event)
+
+        return StreamingResponse(
+            frames(),
+            media_type="text/event-stream",
+            # Keep proxies from buffering the stream
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
         )
 
     except HTTPException:
@@ -280,20 +521,38 @@ async def get_chat_history(
     Get chat history for a session
 
     Args:
-        session_id: Optional session ID
+        session_id: Session ID returned by /chat
 
     Returns:
-        Chat history
+        Recent messages, the summary of older turns and the token count
     """
     try:
-        # In production, you would fetch from database
-        # For now, return empty history
+        if not session_id:
+            raise HTTPException(
+                status_code=400,
+                detail="session_id is required"
+            )
+
+        store = await registry.aget("session_store")
+        if store is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Chat history is currently unavailable"
+            )
+
+        history = await run_blocking(store.history, session_id)
         return {
             "success": True,
-            "history": [],
-            "message": "Chat history feature coming soon"
+            "session_id": session_id,
+            "summary": history["summary"],
+            "history": history["messages"],
+            "tokens": history["tokens"]
         }
 
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -313,12 +572,24 @@ async def clear_chat_history(session_id: str):
         Success confirmation
     """
     try:
-        # In production, you would delete from database
+        store = await registry.aget("session_store")
+        if store is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Chat history is currently unavailable"
+            )
+
+        existed = await run_blocking(store.clear, session_id)
         return {
             "success": True,
+            "cleared": existed,
             "message": f"Chat history cleared for session {session_id}"
         }
 
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -6,32 +6,25 @@ Endpoints for finding doctors and booking appointments
 from fastapi import APIRouter, HTTPException, Query, Body
 from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime
 import sys
 import os
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.DoctorInfoAgent import DoctorInfoAgent
+from src.agent_registry import aget_agent, registry
+from src.booking import BookingBusyError, SlotNotFoundError, SlotUnavailableError
+from src.concurrency import run_blocking
 
 # Initialize router
 router = APIRouter()
 
-# Initialize Doctor Agent (singleton)
-doctor_agent = None
-try:
-    doctor_agent = DoctorInfoAgent()
-    print("Doctor Agent initialized successfully")
-except Exception as e:
-    print(f"Warning: Could not initialize Doctor Agent: {e}")
-    doctor_agent = None
-
 
 # Request/Response Models
 class AppointmentRequest(BaseModel):
     doctor_id: Optional[int] = None
-    doctor_name: str
+    slot_id: Optional[int] = None
+    doctor_name: Optional[str] = None
     date: str
     time: str
     patient_name: str
@@ -43,6 +36,7 @@ class AppointmentRequest(BaseModel):
 class AppointmentResponse(BaseModel):
     success: bool
     confirmation_id: Optional[str] = None
+    appointment: Optional[dict] = None
     message: str
     error: Optional[str] = None
 
@@ -50,6 +44,7 @@ class AppointmentResponse(BaseModel):
 class DoctorResponse(BaseModel):
     success: bool
     doctors: list = []
+    total: int = 0
     message: Optional[str] = None
     error: Optional[str] = None
 
@@ -58,46 +53,75 @@ class DoctorResponse(BaseModel):
 async def get_doctors(
     search: Optional[str] = Query(None, description="Search term for doctor name"),
     specialty: Optional[str] = Query(None, description="Filter by specialty"),
-    location: Optional[str] = Query(None, description="Filter by location"),
-    available: Optional[bool] = Query(None, description="Filter by availability")
+    location: Optional[str] = Query(None, description="Filter by location (not present in doctor data; ignored)"),
+    available: Optional[bool] = Query(None, description="Filter by availability"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of doctors returned"),
+    offset: int = Query(0, ge=0, description="Number of doctors to skip"),
+    query: Optional[str] = Query(None, description="Free-text question answered by the AI agent (opt-in, slower)")
 ):
     """
     Search for doctors
 
+    Filters are answered directly from the appointments database. The LLM agent
+    is only used when a free-text `query` is supplied.
+
     Args:
         search: Search term for doctor name
         specialty: Medical specialty filter
         location: Location filter
         available: Only show doctors with available slots
+        limit: Page size
+        offset: Page offset
+        query: Optional free-text question for the AI agent
 
     Returns:
         DoctorResponse with list of doctors
     """
     try:
-        if not doctor_agent:
+        if query and query.strip():
+            doctor_agent = await aget_agent("doctor")
+            if not doctor_agent:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Doctor AI service is currently unavailable"
+                )
+
+            result = await doctor_agent.aquery(query)
+
+            if not result.get("success"):
+                return DoctorResponse(
+                    success=False,
+                    doctors=[],
+                    error=result.get("error", "Failed to fetch doctors")
+                )
+
+            return DoctorResponse(
+                success=True,
+                doctors=[],
+                message=result.get("output", "No doctors found")
+            )
+
+        directory = await registry.aget("doctor_directory")
+        if not directory:
             raise HTTPException(
                 status_code=503,
                 detail="Doctor service is currently unavailable"
             )
 
-        # Build query based on filters
-        if specialty:
-            result = doctor_agent.get_available_doctors(specialty)
-        else:
-            result = doctor_agent.get_available_doctors()
-
-        if not result.get("success"):
-            return DoctorResponse(
-                success=False,
-                doctors=[],
-                error=result.get("error", "Failed to fetch doctors")
-            )
+        result = await run_blocking(
+            directory.search_doctors,
+            search=search,
+            specialty=specialty,
+            available=available,
+            limit=limit,
+            offset=offset
+        )
 
-        # Return the agent output
         return DoctorResponse(
             success=True,
-            doctors=[],
-            message=result.get("output", "No doctors found")
+            doctors=result["doctors"],
+            total=result["total"],
+            message=f"Found {result['total']} doctor(s)"
         )
 
     except HTTPException:
@@ -112,7 +136,10 @@ async def get_doctors(
 @router.get("/doctors/{doctor_id}/slots")
 async def get_doctor_slots(
     doctor_id: int,
-    date: Optional[str] = Query(None, description="Date to check (YYYY-MM-DD)")
+    date: Optional[str] = Query(None, description="Date to check (YYYY-MM-DD)"),
+    available_only: bool = Query(True, description="Only return slots that can be booked"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of slots returned"),
+    offset: int = Query(0, ge=0, description="Number of slots to skip")
 ):
     """
     Get available appointment slots for a specific doctor
@@ -120,29 +147,51 @@ async def get_doctor_slots(
     Args:
         doctor_id: Doctor's ID
         date: Optional date filter
+        available_only: Exclude booked slots
+        limit: Page size
+        offset: Page offset
 
     Returns:
-        Available appointment slots
+        Paginated appointment slots
     """
     try:
-        if not doctor_agent:
+        directory = await registry.aget("doctor_directory")
+        if not directory:
             raise HTTPException(
                 status_code=503,
                 detail="Doctor service is currently unavailable"
             )
 
-        # Query for available slots
-        result = doctor_agent.get_available_slots()
+        doctor = await run_blocking(directory.get_doctor, doctor_id)
+        if not doctor:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Doctor {doctor_id} not found"
+            )
 
-        if not result.get("success"):
-            return {
-                "success": False,
-                "error": result.get("error", "Failed to fetch slots")
-            }
+        try:
+            result = await run_blocking(
+                directory.get_slots,
+                doctor_id,
+                date=date,
+                available_only=available_only,
+                limit=limit,
+                offset=offset
+            )
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="Date must be in YYYY-MM-DD format"
+            )
 
         return {
             "success": True,
-            "slots": result.get("output", "No slots available")
+            "doctor": doctor,
+            "slots": result["slots"],
+            "total": result["total"],
+            "limit": limit,
+            "offset": offset,
+            "db_time_ms": result["db_time_ms"]
         }
 
     except HTTPException:
@@ -159,6 +208,11 @@ async def book_appointment(appointment: AppointmentRequest):
     """
     Book doctor appointment
 
+    The slot is claimed with an atomic compare-and-set, so concurrent requests
+    for the same slot result in exactly one booking. The doctor is identified by
+    doctor_id or doctor_name (both must agree when given), and a slot_id must
+    belong to that doctor.
+
     Args:
         appointment: Appointment details
 
@@ -166,20 +220,21 @@ async def book_appointment(appointment: AppointmentRequest):
         AppointmentResponse with confirmation
     """
     try:
-        if not doctor_agent:
+        booking_engine = await registry.aget("booking_engine")
+        if not booking_engine:
             raise HTTPException(
                 status_code=503,
                 detail="Doctor service is currently unavailable"
             )
 
         # Validate required fields
-        if not appointment.doctor_name:
+        if not appointment.doctor_name and appointment.doctor_id is None:
             raise HTTPException(
                 status_code=400,
-                detail="Doctor name is required"
+                detail="Doctor ID or name is required"
             )
 
-        if not appointment.date or not appointment.time:
+        if appointment.slot_id is None and (not appointment.date or not appointment.time):
             raise HTTPException(
                 status_code=400,
                 detail="Date and time are required"
@@ -191,28 +246,134 @@ async def book_appointment(appointment: AppointmentRequest):
                 detail="Patient name and email are required"
             )
 
-        # Book appointment using agent
-        result = doctor_agent.book_appointment(
-            appointment.doctor_name,
-            appointment.time
+        try:
+            doctor = await run_blocking(booking_engine.get_doctor, appointment.doctor_id, appointment.doctor_name)
+            slot_id = appointment.slot_id
+            if slot_id is None:
+                slot_id = (await run_blocking(
+                    booking_engine.find_slot,
+                    appointment.date,
+                    appointment.time,
+                    doctor_id=doctor["id"]
+                ))["id"]
+
+            # A slot_id of another doctor is rejected, not booked. BEGIN IMMEDIATE may
+            # wait up to SQLITE_BUSY_TIMEOUT for the write lock, so it runs off the loop
+            booked = await run_blocking(
+                booking_engine.book,
+                slot_id,
+                patient_name=appointment.patient_name,
+                patient_email=appointment.patient_email,
+                patient_phone=appointment.patient_phone,
+                reason=appointment.reason,
+                doctor_id=doctor["id"]
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except SlotNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except SlotUnavailableError:
+            raise HTTPException(
+                status_code=409,
+                detail="This slot has already been booked. Please choose another time."
+            )
+        except BookingBusyError:
+            raise HTTPException(
+                status_code=503,
+                detail="Booking service is busy, please retry"
+            )
+
+        return AppointmentResponse(
+            success=True,
+            confirmation_id=booked["confirmation_id"],
+            appointment=booked,
+            message=f"Appointment booked successfully with Dr. {doctor['name']}"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
         )
 
-        if not result.get("success"):
-            return AppointmentResponse(
-                success=False,
-                message="Failed to book appointment",
-                error=result.get("error", "Unknown error occurred")
+
+@router.get("/appointments/{confirmation_id}")
+async def get_appointment(confirmation_id: str):
+    """
+    Get a booked appointment
+
+    Args:
+        confirmation_id: Confirmation ID returned when booking
+
+    Returns:
+        Appointment details
+    """
+    try:
+        booking_engine = await registry.aget("booking_engine")
+        if not booking_engine:
+            raise HTTPException(
+                status_code=503,
+                detail="Doctor service is currently unavailable"
             )
 
-        # Generate confirmation ID
-        confirmation_id = f"APT-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        booked = await run_blocking(booking_engine.get_appointment, confirmation_id)
+        if not booked:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Appointment {confirmation_id} not found"
+            )
 
-        return AppointmentResponse(
-            success=True,
-            confirmation_id=confirmation_id,
-            message=f"Appointment booked successfully with {appointment.doctor_name}"
+        return {
+            "success": True,
+            "appointment": booked
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
         )
 
+
+@router.delete("/appointments/{confirmation_id}")
+async def cancel_appointment(confirmation_id: str):
+    """
+    Cancel an appointment and release its slot
+
+    Args:
+        confirmation_id: Confirmation ID returned when booking
+
+    Returns:
+        Cancelled appointment details
+    """
+    try:
+        booking_engine = await registry.aget("booking_engine")
+        if not booking_engine:
+            raise HTTPException(
+                status_code=503,
+                detail="Doctor service is currently unavailable"
+            )
+
+        try:
+            cancelled = await run_blocking(booking_engine.cancel, confirmation_id)
+        except SlotNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except BookingBusyError:
+            raise HTTPException(
+                status_code=503,
+                detail="Booking service is busy, please retry"
+            )
+
+        return {
+            "success": True,
+            "appointment": cancelled,
+            "message": f"Appointment {confirmation_id} cancelled"
+        }
+
     except HTTPException:
         raise
     except Exception as e:
@@ -231,25 +392,22 @@ async def get_specialties():
         List of specialties
     """
     try:
-        # This could be dynamic from database in production
-        specialties = [
-            "Cardiology",
-            "Neurology",
-            "Orthopedics",
-            "Pediatrics",
-            "Dermatology",
-            "Psychiatry",
-            "Internal Medicine",
-            "General Surgery",
-            "Oncology",
-            "Radiology"
-        ]
+        directory = await registry.aget("doctor_directory")
+        if not directory:
+            raise HTTPException(
+                status_code=503,
+                detail="Doctor service is currently unavailable"
+            )
+
+        specialties = await run_blocking(directory.list_specialties)
 
         return {
             "success": True,
             "specialties": specialties
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -8,25 +8,15 @@ from pydantic import BaseModel
 from typing import Optional, List
 import sys
 import os
-import sqlite3
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.EmergencyServicesAgent import EmergencyServicesAgent
+from src.agent_registry import aget_agent, registry
 
 # Initialize router
 router = APIRouter()
 
-# Initialize Emergency Agent (singleton)
-emergency_agent = None
-try:
-    emergency_agent = EmergencyServicesAgent()
-    print("Emergency Agent initialized successfully")
-except Exception as e:
-    print(f"Warning: Could not initialize Emergency Agent: {e}")
-    emergency_agent = None
-
 
 # Response Models
 class HospitalInfo(BaseModel):
@@ -65,17 +55,24 @@ async def get_emergency_services(
                 detail="ZIP code is required"
             )
 
-        # Query database directly for structured data
-        db_path = "src/emergency.db"
+        if not zipcode.strip().isdigit():
+            raise HTTPException(
+                status_code=400,
+                detail="ZIP code must be numeric"
+            )
+
+        # Answer from the in-memory ZIP index (no disk, database or LLM access)
+        emergency_index = await registry.aget("emergency_index")
 
-        if not os.path.exists(db_path):
-            # Fallback to agent if database doesn't exist
+        if not emergency_index:
+            # Fallback to agent if the index could not be built
+            emergency_agent = await aget_agent("emergency")
             if not emergency_agent:
                 raise HTTPException(
                     status_code=503,
                     detail="Emergency service is currently unavailable"
                 )
-            result = emergency_agent.find_emergency_services(zipcode)
+            result = await emergency_agent.afind_emergency_services(zipcode)
             return EmergencyResponse(
                 success=result.get("success", False),
                 hospitals=[],
@@ -83,44 +80,28 @@ async def get_emergency_services(
                 error=result.get("error")
             )
 
-        # Connect to database
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        facilities = emergency_index.lookup(zipcode)
 
-        # Query emergency directory (column names have spaces and capital letters)
-        cursor.execute(
-            'SELECT * FROM emergency_directory WHERE "Zip Code" = ?',
-            (int(zipcode),)
-        )
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        if not rows:
+        if not facilities:
             return EmergencyResponse(
                 success=True,
                 hospitals=[],
                 message=f"No emergency hospitals found in ZIP code {zipcode}. Please call 911 for immediate assistance."
             )
 
-        # Convert database rows to hospital objects
-        hospitals = []
-        for row in rows:
-            # Parse ambulance availability
-            ambulance_text = row['Ambulance Available'].lower()
-            ambulance_available = 'yes' in ambulance_text
-
-            hospital = HospitalInfo(
-                name=row['Hospital Name'],
-                address=f"ZIP Code: {row['Zip Code']}",
+        # Convert index entries to hospital objects
+        hospitals = [
+            HospitalInfo(
+                name=name,
+                address=f"ZIP Code: {zipcode.strip()}",
                 phone="Call 911 for Emergency",
                 distance="N/A",
                 driveTime="N/A",
                 ambulanceAvailable=ambulance_available,
                 emergencyServices="24/7 Emergency Services"
             )
-            hospitals.append(hospital)
+            for name, ambulance_available in facilities
+        ]
 
         return EmergencyResponse(
             success=True,
@@ -151,6 +132,7 @@ async def get_ambulance_services(
         List of hospitals with ambulance availability
     """
     try:
+        emergency_agent = await aget_agent("emergency")
         if not emergency_agent:
             raise HTTPException(
                 status_code=503,
@@ -158,7 +140,7 @@ async def get_ambulance_services(
             )
 
         # Query emergency agent
-        result = emergency_agent.find_ambulance_services(zipcode)
+        result = await emergency_agent.afind_ambulance_services(zipcode)
 
         if not result.get("success"):
             return {
@@ -180,45 +162,70 @@ async def get_ambulance_services(
         )
 
 
-@router.get("/emergency/nearest")
+@router.get("/emergency/nearest", response_model=EmergencyResponse)
 async def get_nearest_emergency(
-    zipcode: str = Query(..., description="Your current ZIP code")
+    zipcode: str = Query(..., description="Your current ZIP code"),
+    limit: int = Query(5, ge=1, le=50, description="Number of facilities to return")
 ):
     """
-    Get nearest emergency facility to your location
+    Get nearest emergency facilities to your location
 
     Args:
         zipcode: Your current ZIP code
+        limit: Number of facilities to return
 
     Returns:
-        Nearest emergency facility information
+        EmergencyResponse with facilities ordered by distance
     """
     try:
-        if not emergency_agent:
+        if not zipcode or not zipcode.strip():
             raise HTTPException(
-                status_code=503,
-                detail="Emergency service is currently unavailable"
+                status_code=400,
+                detail="ZIP code is required"
             )
 
-        if not zipcode or not zipcode.strip():
+        if not zipcode.strip().isdigit():
             raise HTTPException(
                 status_code=400,
-                detail="ZIP code is required"
+                detail="ZIP code must be numeric"
             )
 
-        # Query emergency agent
-        result = emergency_agent.get_nearest_emergency(zipcode)
+        # Nearest-neighbor search over facility coordinates (no LLM involved)
+        nearest_facilities = await registry.aget("nearest_facilities")
+        if not nearest_facilities:
+            raise HTTPException(
+                status_code=503,
+                detail="Emergency service is currently unavailable"
+            )
 
-        if not result.get("success"):
-            return {
-                "success": False,
-                "error": result.get("error", "Failed to find nearest emergency facility")
-            }
+        try:
+            result = nearest_facilities.nearest(zipcode.strip(), limit)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
 
-        return {
-            "success": True,
-            "facility": result.get("output", "No emergency facility found")
-        }
+        # Distances are measured from the ZIP's centroid; mark them approximate unless
+        # that is an exact ZIP and the facility has its own coordinates (a facility
+        # placed at a ZIP centroid would show a centroid-to-centroid "0.0 miles")
+        hospitals = []
+        for facility in result["facilities"]:
+            exact = result["location_precision"] == "zip5" and facility["location_precision"] == "exact"
+            ambulance = facility["ambulance_available"]
+            hospitals.append(HospitalInfo(
+                name=facility["name"],
+                address=facility["address"],
+                phone=facility["phone"] or "Call 911 for Emergency",
+                distance=f"{'' if exact else '~'}{facility['distance_miles']:.1f} miles",
+                driveTime="N/A",
+                ambulanceAvailable=bool(ambulance),
+                emergencyServices="24/7 Emergency Services" if ambulance is not None else "Emergency Services Available"
+            ))
+
+        return EmergencyResponse(
+            success=True,
+            hospitals=hospitals,
+            message=f"Found {len(hospitals)} emergency facilities nearest to ZIP code {result['zip_code']} "
+                    f"(location resolved by {result['location_precision']})"
+        )
 
     except HTTPException:
         raise
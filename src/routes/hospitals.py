@@ -12,25 +12,19 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.HospitalComparisonAgent import HospitalComparisonAgent
+from src.agent_registry import aget_agent, registry
+from src.concurrency import run_blocking
+from src.hospital_compare import parse_weights
 
 # Initialize router
 router = APIRouter()
 
-# Initialize Hospital Agent (singleton)
-hospital_agent = None
-try:
-    hospital_agent = HospitalComparisonAgent()
-    print("Hospital Agent initialized successfully")
-except Exception as e:
-    print(f"Warning: Could not initialize Hospital Agent: {e}")
-    hospital_agent = None
-
 
 # Response Models
 class HospitalResponse(BaseModel):
     success: bool
     hospitals: list = []
+    total: int = 0
     message: Optional[str] = None
     error: Optional[str] = None
 
@@ -39,64 +33,116 @@ class HospitalResponse(BaseModel):
 async def get_hospitals(
     search: Optional[str] = Query(None, description="Search term for hospital name"),
     specialty: Optional[str] = Query(None, description="Filter by specialty"),
-    rating: Optional[float] = Query(None, description="Minimum rating (0-5)"),
+    rating: Optional[float] = Query(None, ge=0, le=5, description="Minimum rating (0-5)"),
     beds: Optional[str] = Query(None, description="Filter by bed count"),
-    location: Optional[str] = Query(None, description="Filter by location")
+    location: Optional[str] = Query(None, description="ZIP code, 'City, ST', state code, city or county"),
+    state: Optional[str] = Query(None, description="Two-letter state code"),
+    city: Optional[str] = Query(None, description="City name"),
+    type: Optional[str] = Query(None, description="Hospital type (e.g. 'Acute Care Hospitals')"),
+    ownership: Optional[str] = Query(None, description="Hospital ownership"),
+    emergency: Optional[bool] = Query(None, description="Filter by emergency services"),
+    sort: str = Query("relevance", description="Sort by relevance, name, rating or state"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    offset: int = Query(0, ge=0, description="Number of results to skip")
 ):
     """
     Get and filter hospitals
 
     Args:
         search: Search term for hospital name
-        specialty: Filter by medical specialty
+        specialty: Filter by medical specialty (not in the dataset; ignored)
         rating: Minimum rating filter
-        beds: Bed count filter
+        beds: Bed count filter (not in the dataset; ignored)
         location: Location filter
+        state: State filter
+        city: City filter
+        type: Hospital type filter
+        ownership: Ownership filter
+        emergency: Emergency services filter
+        sort: Sort order
+        limit: Page size
+        offset: Page offset
 
     Returns:
         HospitalResponse with list of hospitals
     """
     try:
-        if not hospital_agent:
+        hospital_search = await registry.aget("hospital_search")
+        if not hospital_search:
             raise HTTPException(
                 status_code=503,
                 detail="Hospital service is currently unavailable"
             )
 
-        # Build query based on filters
-        query_parts = []
+        try:
+            result = await run_blocking(
+                hospital_search.search,
+                search=search,
+                state=state,
+                city=city,
+                location=location,
+                hospital_type=type,
+                ownership=ownership,
+                min_rating=rating,
+                emergency=emergency,
+                sort=sort,
+                limit=limit,
+                offset=offset
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        if search:
-            query_parts.append(f"hospitals named '{search}'")
+        message = f"Found {result['total']} hospital(s)"
+        ignored = [name for name, value in (("specialty", specialty), ("beds", beds)) if value]
+        if ignored:
+            message += f"; {' and '.join(ignored)} filters are not available in the hospital dataset and were ignored"
 
-        if specialty:
-            query_parts.append(f"specialized in {specialty}")
+        return HospitalResponse(
+            success=True,
+            hospitals=result["hospitals"],
+            total=result["total"],
+            message=message
+        )
 
-        if location:
-            query_parts.append(f"located in {location}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
 
-        if rating:
-            query_parts.append(f"with rating above {rating}")
 
-        if beds:
-            query_parts.append(f"with {beds} beds")
+@router.get("/hospitals/suggest")
+async def suggest_hospitals(
+    q: str = Query(..., min_length=1, description="Text typed so far"),
+    limit: int = Query(8, ge=1, le=20, description="Maximum number of suggestions")
+):
+    """
+    Typeahead suggestions for the hospital search box
 
-        # Construct natural language query
-        if query_parts:
-            query = "Find " + " ".join(query_parts)
-        else:
-            query = "Show me all hospitals"
+    Args:
+        q: Partial hospital name, city or county (typos tolerated)
+        limit: Maximum number of suggestions
 
-        # Query hospital agent
-        result = hospital_agent.compare_hospitals(query)
+    Returns:
+        Ranked suggestions with query time
+    """
+    try:
+        hospital_search = await registry.aget("hospital_search")
+        if not hospital_search:
+            raise HTTPException(
+                status_code=503,
+                detail="Hospital service is currently unavailable"
+            )
 
-        # For now, return the raw output
-        # In production, you would parse this into structured data
-        return HospitalResponse(
-            success=True,
-            hospitals=[],
-            message=result
-        )
+        result = await run_blocking(hospital_search.suggest, q, limit=limit)
+
+        return {
+            "success": True,
+            "query": q,
+            **result
+        }
 
     except HTTPException:
         raise
@@ -109,25 +155,28 @@ async def get_hospitals(
 
 @router.get("/hospitals/compare")
 async def compare_hospitals(
-    hospital_ids: str = Query(..., description="Comma-separated hospital IDs or names to compare")
+    hospital_ids: str = Query(..., description="Comma-separated hospital IDs or names to compare"),
+    weights: Optional[str] = Query(None, description="Composite weights, e.g. 'overall_rating:2,mortality:1'")
 ):
     """
     Compare specific hospitals
 
     Args:
         hospital_ids: Comma-separated list of hospital IDs or names
+        weights: Optional metric weights for the composite score
 
     Returns:
         Comparison results for specified hospitals
     """
     try:
-        if not hospital_agent:
+        hospital_comparator = await registry.aget("hospital_comparator")
+        if not hospital_comparator:
             raise HTTPException(
                 status_code=503,
                 detail="Hospital service is currently unavailable"
             )
 
-        hospitals_list = [h.strip() for h in hospital_ids.split(",")]
+        hospitals_list = [h.strip() for h in hospital_ids.split(",") if h.strip()]
 
         if len(hospitals_list) < 2:
             raise HTTPException(
@@ -135,14 +184,164 @@ async def compare_hospitals(
                 detail="At least 2 hospitals required for comparison"
             )
 
-        query = f"Compare these hospitals: {', '.join(hospitals_list)}"
+        try:
+            comparison = await run_blocking(hospital_comparator.compare, hospitals_list, weights=parse_weights(weights))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        # Query hospital agent
-        result = hospital_agent.compare_hospitals(query)
+        if comparison["unresolved"]:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Hospital(s) not found: {', '.join(comparison['unresolved'])}"
+            )
+
+        return {
+            "success": True,
+            "comparison": comparison
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+@router.get("/hospitals/top")
+async def get_top_hospitals(
+    location: Optional[str] = Query(None, description="State, 'City, ST', county or omit for national"),
+    limit: int = Query(10, ge=1, le=100, description="Number of hospitals")
+):
+    """
+    Best hospitals in a location from the precomputed scorecards
+
+    Args:
+        location: State code or name, city, county, or None for national
+        limit: Number of hospitals
+
+    Returns:
+        Ranked hospital scorecards for the resolved scope
+    """
+    try:
+        hospital_scorecards = await registry.aget("hospital_scorecards")
+        if not hospital_scorecards:
+            raise HTTPException(
+                status_code=503,
+                detail="Hospital service is currently unavailable"
+            )
+
+        try:
+            result = await run_blocking(hospital_scorecards.top, location, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+        return {
+            "success": True,
+            **result
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+@router.get("/hospitals/rollups/states")
+async def get_state_rollups():
+    """
+    State-level hospital aggregates
+
+    Returns:
+        Hospital counts, mean rating, emergency coverage and type/ownership counts per state
+    """
+    try:
+        hospital_scorecards = await registry.aget("hospital_scorecards")
+        if not hospital_scorecards:
+            raise HTTPException(
+                status_code=503,
+                detail="Hospital service is currently unavailable"
+            )
+
+        return {
+            "success": True,
+            "states": await run_blocking(hospital_scorecards.state_rollups)
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+@router.get("/hospitals/rollups/counties")
+async def get_county_rollups(
+    state: Optional[str] = Query(None, description="Restrict to one state (code or name)")
+):
+    """
+    County-level hospital aggregates
+
+    Args:
+        state: Optional state filter
+
+    Returns:
+        Hospital counts, mean rating, emergency coverage and type/ownership counts per county
+    """
+    try:
+        hospital_scorecards = await registry.aget("hospital_scorecards")
+        if not hospital_scorecards:
+            raise HTTPException(
+                status_code=503,
+                detail="Hospital service is currently unavailable"
+            )
+
+        return {
+            "success": True,
+            "counties": await run_blocking(hospital_scorecards.county_rollups, state)
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+@router.get("/hospitals/{provider_id}/scorecard")
+async def get_hospital_scorecard(provider_id: int):
+    """
+    Precomputed scorecard for one hospital
+
+    Args:
+        provider_id: CMS Provider ID
+
+    Returns:
+        Ordinal comparisons, composite score, percentiles and in-state rank
+    """
+    try:
+        hospital_scorecards = await registry.aget("hospital_scorecards")
+        if not hospital_scorecards:
+            raise HTTPException(
+                status_code=503,
+                detail="Hospital service is currently unavailable"
+            )
+
+        scorecard = await run_blocking(hospital_scorecards.scorecard, provider_id)
+        if scorecard is None:
+            raise HTTPException(status_code=404, detail=f"Hospital {provider_id} not found")
 
         return {
             "success": True,
-            "comparison": result
+            "scorecard": scorecard
         }
 
     except HTTPException:
@@ -168,6 +367,7 @@ async def get_hospitals_by_specialty(
         List of hospitals offering the specialty
     """
     try:
+        hospital_agent = await aget_agent("hospital")
         if not hospital_agent:
             raise HTTPException(
                 status_code=503,
@@ -183,7 +383,7 @@ async def get_hospitals_by_specialty(
         query = f"Find hospitals with {specialty} specialty"
 
         # Query hospital agent
-        result = hospital_agent.compare_hospitals(query)
+        result = await hospital_agent.acompare_hospitals(query)
 
         return {
             "success": True,
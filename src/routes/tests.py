@@ -13,20 +13,13 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.DiagnosticInfoAgent import DiagnosticInfoAgent
+from src.agent_registry import aget_agent, registry
+from src.concurrency import run_blocking
+from src.lab_catalog import parse_fasting
 
 # Initialize router
 router = APIRouter()
 
-# Initialize Diagnostic Agent (singleton)
-diagnostic_agent = None
-try:
-    diagnostic_agent = DiagnosticInfoAgent()
-    print("Diagnostic Agent initialized successfully")
-except Exception as e:
-    print(f"Warning: Could not initialize Diagnostic Agent: {e}")
-    diagnostic_agent = None
-
 
 # Request/Response Models
 class TestBookingRequest(BaseModel):
@@ -50,6 +43,7 @@ class TestBookingResponse(BaseModel):
 class TestResponse(BaseModel):
     success: bool
     tests: list = []
+    hospitals: int = 0
     message: Optional[str] = None
     error: Optional[str] = None
 
@@ -57,67 +51,53 @@ class TestResponse(BaseModel):
 @router.get("/tests", response_model=TestResponse)
 async def get_lab_tests(
     category: Optional[str] = Query(None, description="Filter by category (blood, imaging, etc.)"),
-    search: Optional[str] = Query(None, description="Search term"),
+    search: Optional[str] = Query(None, description="Test or package name"),
     max_price: Optional[float] = Query(None, description="Maximum price filter"),
-    fasting: Optional[str] = Query(None, description="Fasting requirement (yes/no)")
+    fasting: Optional[str] = Query(None, description="Fasting requirement (yes/no)"),
+    state: Optional[str] = Query(None, description="Two-letter state code")
 ):
     """
     Get lab tests with filters
 
     Args:
         category: Test category filter
-        search: Search term for test name
-        max_price: Maximum price filter
+        search: Search term for test or package name
+        max_price: Maximum price filter (no prices in the dataset; ignored)
         fasting: Fasting requirement filter
+        state: State filter
 
     Returns:
         TestResponse with list of tests
     """
     try:
-        if not diagnostic_agent:
+        lab_catalog = await registry.aget("lab_catalog")
+        if not lab_catalog:
             raise HTTPException(
                 status_code=503,
                 detail="Diagnostic service is currently unavailable"
             )
 
-        # Build query based on filters
-        query_parts = []
-
-        if category:
-            query_parts.append(f"{category} tests")
-
-        if search:
-            query_parts.append(f"related to {search}")
-
-        if max_price:
-            query_parts.append(f"under ${max_price}")
-
-        if fasting == "yes":
-            query_parts.append("requiring fasting")
-        elif fasting == "no":
-            query_parts.append("not requiring fasting")
-
-        # Construct natural language query
-        if query_parts:
-            query = "Show me " + " ".join(query_parts)
-        else:
-            query = "Show me all available lab tests"
-
-        # Query diagnostic agent
-        result = diagnostic_agent.query(query)
-
-        if not result.get("success"):
-            return TestResponse(
-                success=False,
-                tests=[],
-                error=result.get("error", "Failed to fetch lab tests")
+        try:
+            result = await run_blocking(
+                lab_catalog.search,
+                search=search,
+                category=category,
+                state=state,
+                fasting=parse_fasting(fasting)
             )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        tests = result["tests"]
+        message = f"Found {len(tests)} tests offered by {result['hospitals']} hospitals"
+        if max_price is not None:
+            message += " (price data is not available, so max_price was ignored)"
 
-        # Return the agent output
         return TestResponse(
             success=True,
-            tests=[],
-            message=result.get("output", "No tests found")
+            tests=tests,
+            hospitals=result["hospitals"],
+            message=message
         )
 
     except HTTPException:
@@ -129,40 +109,82 @@ async def get_lab_tests(
         )
 
 
-@router.get("/tests/{test_name}")
-async def get_test_details(test_name: str):
+@router.get("/tests/packages")
+async def get_health_packages(
+    narrative: bool = Query(False, description="Add an LLM-written summary")
+):
     """
-    Get detailed information about a specific test
+    Get available health screening packages
 
     Args:
-        test_name: Name of the test
+        narrative: Also summarize the packages with the diagnostic agent
 
     Returns:
-        Detailed test information
+        List of health screening packages
     """
     try:
-        if not diagnostic_agent:
+        lab_catalog = await registry.aget("lab_catalog")
+        if not lab_catalog:
             raise HTTPException(
                 status_code=503,
                 detail="Diagnostic service is currently unavailable"
             )
 
-        # Query diagnostic agent
-        result = diagnostic_agent.get_lab_test_info(test_name)
+        packages = await run_blocking(lab_catalog.package_list)
+        response = {
+            "success": True,
+            "packages": packages
+        }
+
+        if narrative:
+            diagnostic_agent = await aget_agent("diagnostic")
+            if not diagnostic_agent:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Diagnostic service is currently unavailable"
+                )
+            result = await diagnostic_agent.aget_health_screening_packages(packages=packages)
+            if result.get("success"):
+                response["narrative"] = result.get("output")
+            else:
+                response["narrative_error"] = result.get("error", "Failed to summarize packages")
+
+        return response
 
-        if not result.get("success"):
-            return {
-                "success": False,
-                "error": result.get("error", "Failed to fetch test details")
-            }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+@router.get("/tests/categories")
+async def get_test_categories():
+    """
+    Get list of available test categories
+
+    Returns:
+        List of test categories
+    """
+    try:
+        categories = [
+            {"id": "blood", "name": "Blood Tests", "icon": "🩸"},
+            {"id": "imaging", "name": "Imaging", "icon": "📷"},
+            {"id": "cardiac", "name": "Cardiac", "icon": "💓"},
+            {"id": "diabetes", "name": "Diabetes", "icon": "🍬"},
+            {"id": "thyroid", "name": "Thyroid", "icon": "🦋"},
+            {"id": "liver", "name": "Liver Function", "icon": "🫀"},
+            {"id": "kidney", "name": "Kidney Function", "icon": "🫘"},
+            {"id": "vitamin", "name": "Vitamin & Nutrition", "icon": "💊"}
+        ]
 
         return {
             "success": True,
-            "test_details": result.get("output", "No details found")
+            "categories": categories
         }
 
-    except HTTPException:
-        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -171,18 +193,27 @@ async def get_test_details(test_name: str):
 
 
 @router.get("/tests/condition/{condition}")
-async def get_tests_for_condition(condition: str):
+async def get_tests_for_condition(
+    condition: str,
+    state: Optional[str] = Query(None, description="Only list hospitals in this state"),
+    limit: int = Query(20, ge=1, le=200, description="Maximum number of hospitals"),
+    offset: int = Query(0, ge=0, description="Number of hospitals to skip")
+):
     """
     Get recommended tests for a specific health condition
 
     Args:
         condition: Health condition (e.g., "diabetes", "heart disease")
+        state: State filter for the offering hospitals
+        limit: Page size for the offering hospitals
+        offset: Page offset for the offering hospitals
 
     Returns:
         Recommended tests for the condition
     """
     try:
-        if not diagnostic_agent:
+        recommender = await registry.aget("condition_recommender")
+        if not recommender:
             raise HTTPException(
                 status_code=503,
                 detail="Diagnostic service is currently unavailable"
@@ -194,19 +225,36 @@ async def get_tests_for_condition(condition: str):
                 detail="Condition is required"
             )
 
-        # Query diagnostic agent
-        result = diagnostic_agent.find_tests_by_condition(condition)
+        # Runs on the executor: an unknown condition may wait on the LLM
+        result = await run_blocking(recommender.recommend, condition, state=state, limit=limit, offset=offset)
 
-        if not result.get("success"):
+        if result.get("error"):
             return {
                 "success": False,
-                "error": result.get("error", "Failed to fetch recommended tests")
+                "condition": condition,
+                "error": result["error"]
+            }
+
+        if result["source"] != "catalog":
+            # Free-text answer for a condition outside the recommendation table
+            return {
+                "success": True,
+                "condition": condition,
+                "source": result["source"],
+                "recommended_tests": [],
+                "answer": result["answer"]
             }
 
         return {
             "success": True,
             "condition": condition,
-            "recommended_tests": result.get("output", "No recommendations found")
+            "matched_condition": result["matched_condition"],
+            "match_type": result["match_type"],
+            "source": result["source"],
+            "recommended_tests": result["tests"],
+            "recommended_packages": result["packages"],
+            "hospitals": result["hospitals"],
+            "total_hospitals": result["total_hospitals"]
         }
 
     except HTTPException:
@@ -218,35 +266,62 @@ async def get_tests_for_condition(condition: str):
         )
 
 
-@router.get("/tests/packages")
-async def get_health_packages():
+@router.get("/tests/{test_name}")
+async def get_test_details(
+    test_name: str,
+    state: Optional[str] = Query(None, description="Only list hospitals in this state"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of hospitals"),
+    offset: int = Query(0, ge=0, description="Number of hospitals to skip"),
+    narrative: bool = Query(False, description="Add an LLM-written summary")
+):
     """
-    Get available health screening packages
+    Get detailed information about a specific test
+
+    Args:
+        test_name: Name of the test
+        state: State filter for the offering hospitals
+        limit: Page size for the offering hospitals
+        offset: Page offset for the offering hospitals
+        narrative: Also summarize the details with the diagnostic agent
 
     Returns:
-        List of health screening packages
+        Detailed test information
     """
     try:
-        if not diagnostic_agent:
+        lab_catalog = await registry.aget("lab_catalog")
+        if not lab_catalog:
             raise HTTPException(
                 status_code=503,
                 detail="Diagnostic service is currently unavailable"
             )
 
-        # Query diagnostic agent
-        result = diagnostic_agent.get_health_screening_packages()
-
-        if not result.get("success"):
-            return {
-                "success": False,
-                "error": result.get("error", "Failed to fetch packages")
-            }
+        details = await run_blocking(lab_catalog.test_details, test_name, state=state, limit=limit, offset=offset)
+        if details is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No lab test matches '{test_name}'"
+            )
 
-        return {
+        response = {
             "success": True,
-            "packages": result.get("output", "No packages found")
+            "test_details": details
         }
 
+        if narrative:
+            diagnostic_agent = await aget_agent("diagnostic")
+            if not diagnostic_agent:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Diagnostic service is currently unavailable"
+                )
+            result = await diagnostic_agent.aget_lab_test_info(details["name"], details=details)
+            if result.get("success"):
+                response["narrative"] = result.get("output")
+            else:
+                response["narrative_error"] = result.get("error", "Failed to summarize test details")
+
+        return response
+
     except HTTPException:
         raise
     except Exception as e:
@@ -268,6 +343,7 @@ async def book_test(booking: TestBookingRequest):
         TestBookingResponse with confirmation
     """
     try:
+        diagnostic_agent = await aget_agent("diagnostic")
         if not diagnostic_agent:
             raise HTTPException(
                 status_code=503,
@@ -314,35 +390,3 @@ async def book_test(booking: TestBookingRequest):
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
-
-
-@router.get("/tests/categories")
-async def get_test_categories():
-    """
-    Get list of available test categories
-
-    Returns:
-        List of test categories
-    """
-    try:
-        categories = [
-            {"id": "blood", "name": "Blood Tests", "icon": "🩸"},
-            {"id": "imaging", "name": "Imaging", "icon": "📷"},
-            {"id": "cardiac", "name": "Cardiac", "icon": "💓"},
-            {"id": "diabetes", "name": "Diabetes", "icon": "🍬"},
-            {"id": "thyroid", "name": "Thyroid", "icon": "🦋"},
-            {"id": "liver", "name": "Liver Function", "icon": "🫀"},
-            {"id": "kidney", "name": "Kidney Function", "icon": "🫘"},
-            {"id": "vitamin", "name": "Vitamin & Nutrition", "icon": "💊"}
-        ]
-
-        return {
-            "success": True,
-            "categories": categories
-        }
-
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Internal server error: {str(e)}"
-        )
@@ -0,0 +1,518 @@
+"""
+Chat Session Store
+Server-side conversation memory keyed by session ID: SQLite for durability, an LRU of hot sessions in memory
+Keeps a token-budgeted rolling window of recent turns and folds older turns into a running summary
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from src.constants import (
+    CHAT_SESSIONS_DB_PATH,
+    SESSION_CACHE_SIZE,
+    SESSION_CONTEXT_TOKENS,
+    SESSION_HISTORY_TOKENS,
+    SESSION_MAX_MESSAGES,
+    SESSION_SUMMARY_TOKENS,
+    SESSION_TTL_SECONDS,
+)
+from src.db_pool import get_pool
+
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+ROLES = ("user", "assistant")
+
+# Compaction folds turns until the window is back under this share of its budget,
+# so it runs every few turns rather than on every turn
+COMPACT_TARGET = 0.6
+
+# Expired sessions are purged at most this often (seconds)
+EVICTION_INTERVAL_SECONDS = 3600.0
+
+# Longest excerpt of one turn kept in the extractive summary
+SUMMARY_LINE_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)"""
+    return max(1, (len(text) + 3) // 4)
+
+
+def validate_session_id(session_id: str) -> str:
+    """
+    Check a client-supplied session ID
+
+    Raises:
+        ValueError: Unless it is 1-64 letters, digits, '-' or '_'
+    """
+    if not session_id or not _SESSION_ID_PATTERN.match(session_id):
+        raise ValueError("Invalid session ID")
+    return session_id
+
+
+class ChatMessage(NamedTuple):
+    id: int
+    role: str
+    content: str
+    tokens: int
+    created_at: float
+
+
+def _excerpt(text: str) -> str:
+    text = " ".join(text.split())
+    sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    return sentence if len(sentence) <= SUMMARY_LINE_CHARS else sentence[:SUMMARY_LINE_CHARS - 3] + "..."
+
+
+def extractive_summary(previous: str, messages: Sequence[ChatMessage], budget: int = SESSION_SUMMARY_TOKENS) -> str:
+    """
+    Fold turns into the running summary without an LLM call
+
+    Each turn contributes its first sentence; when the summary outgrows its
+    token budget the oldest lines are dropped first
+
+    Args:
+        previous: Summary so far ("" for none)
+        messages: Turns being folded, oldest first
+        budget: Token budget for the whole summary
+
+    Returns:
+        New summary text
+    """
+    lines = previous.splitlines() if previous else []
+    lines += [f"{'User' if m.role == 'user' else 'Assistant'}: {_excerpt(m.content)}" for m in messages]
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class _Session:
+    __slots__ = ("session_id", "summary", "messages", "tokens", "updated_at")
+
+    def __init__(self, session_id: str, summary: str, messages: List[ChatMessage], updated_at: float):
+        self.session_id = session_id
+        self.summary = summary
+        self.messages = messages
+        self.tokens = sum(m.tokens for m in messages)
+        self.updated_at = updated_at
+
+
+class SessionStore:
+    """
+    Per-session chat memory for the orchestrator
+
+    Features:
+    - SQLite persistence (pooled WAL connections) with an in-memory LRU of hot sessions
+    - Rolling window of recent turns bounded by tokens and message count
+    - Older turns folded into a bounded running summary (pluggable summarizer)
+    - Compact, token-budgeted context string for the agents
+    - Idle sessions expire after a configurable TTL
+    """
+
+    def __init__(
+        self,
+        db_path: str = CHAT_SESSIONS_DB_PATH,
+        cache_size: int = SESSION_CACHE_SIZE,
+        history_tokens: int = SESSION_HISTORY_TOKENS,
+        max_messages: int = SESSION_MAX_MESSAGES,
+        summary_tokens: int = SESSION_SUMMARY_TOKENS,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        summarize_fn: Callable[[str, Sequence[ChatMessage], int], str] = extractive_summary
+    ):
+        """
+        Initialize Session Store
+
+        Args:
+            db_path: Path to the SQLite sessions database
+            cache_size: Sessions kept in memory (least recently used are dropped)
+            history_tokens: Token budget of the verbatim rolling window per session
+            max_messages: Message cap of the rolling window per session
+            summary_tokens: Token budget of the running summary
+            ttl_seconds: Idle time after which a session is deleted
+            summarize_fn: (previous_summary, folded_messages, budget) -> new summary
+        """
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.history_tokens = history_tokens
+        self.max_messages = max(2, max_messages)
+        self.summary_tokens = summary_tokens
+        self.ttl_seconds = ttl_seconds
+        self.summarize_fn = summarize_fn
+        # A single turn may not exceed the window on its own
+        self.max_message_chars = history_tokens * 4
+
+        self.pool = get_pool(db_path)
+        self._setup_tables()
+
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._last_eviction = 0.0
+        self._counters = {"cache_hits": 0, "cache_misses": 0, "compactions": 0, "expired": 0}
+        self.evict_expired()
+
+    def _setup_tables(self):
+        """Create the sessions and messages tables"""
+        with self.pool.connection() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL DEFAULT '',
+                updated_at REAL NOT NULL
+            )
+            """)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages (session_id, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated ON chat_sessions (updated_at)")
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+
+    def _session(self, session_id: str) -> Optional[_Session]:
+        """Hot session from the LRU, else loaded from SQLite (None if unknown); caller holds the lock"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            self._counters["cache_hits"] += 1
+            return session
+
+        self._counters["cache_misses"] += 1
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT summary, updated_at FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            messages = [
+                ChatMessage(r["id"], r["role"], r["content"], r["tokens"], r["created_at"])
+                for r in conn.execute(
+                    "SELECT id, role, content, tokens, created_at FROM chat_messages "
+                    "WHERE session_id = ? ORDER BY id",
+                    (session_id,)
+                )
+            ]
+        session = _Session(session_id, row["summary"], messages, row["updated_at"])
+        self._remember(session)
+        return session
+
+    def _remember(self, session: _Session):
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.cache_size:
+            self._sessions.popitem(last=False)
+
+    def append(self, session_id: str, role: str, content: str) -> ChatMessage:
+        """
+        Add a turn to a session (created on first use), compacting if over budget
+
+        Args:
+            session_id: Session ID
+            role: 'user' or 'assistant'
+            content: Message text (truncated to the window size)
+
+        Returns:
+            The stored message
+
+        Raises:
+            ValueError: If the session ID or role is invalid
+        """
+        validate_session_id(session_id)
+        if role not in ROLES:
+            raise ValueError(f"Invalid role: {role}")
+        content = content[:self.max_message_chars]
+        now = time.time()
+
+        with self._lock:
+            session = self._session(session_id)
+            with self.pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute(
+                        "INSERT INTO chat_sessions (session_id, summary, updated_at) VALUES (?, '', ?) "
+                        "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at",
+                        (session_id, now)
+                    )
+                    tokens = estimate_tokens(content)
+                    cursor = conn.execute(
+                        "INSERT INTO chat_messages (session_id, role, content, tokens, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (session_id, role, content, tokens, now)
+                    )
+                    message = ChatMessage(cursor.lastrowid, role, content, tokens, now)
+
+                    if session is None:
+                        session = _Session(session_id, "", [], now)
+                        self._remember(session)
+                    session.messages.append(message)
+                    session.tokens += message.tokens
+                    session.updated_at = now
+
+                    if session.tokens > self.history_tokens or len(session.messages) > self.max_messages:
+                        self._compact(conn, session)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    # Memory may be ahead of the database now; reload on next access
+                    self._sessions.pop(session_id, None)
+                    raise
+
+        if now - self._last_eviction > EVICTION_INTERVAL_SECONDS:
+            self.evict_expired()
+        return message
+
+    def _compact(self, conn: sqlite3.Connection, session: _Session):
+        """Fold the oldest turns into the summary until the window is under COMPACT_TARGET of budget"""
+        token_target = self.history_tokens * COMPACT_TARGET
+        message_target = max(2, int(self.max_messages * COMPACT_TARGET))
+        folded: List[ChatMessage] = []
+        # Always keep the latest exchange verbatim
+        while len(session.messages) > 2 and (
+                session.tokens > token_target or len(session.messages) > message_target):
+            message = session.messages.pop(0)
+            session.tokens -= message.tokens
+            folded.append(message)
+        if not folded:
+            return
+
+        session.summary = self.summarize_fn(session.summary, folded, self.summary_tokens)
+        conn.execute(
+            "DELETE FROM chat_messages WHERE session_id = ? AND id <= ?",
+            (session.session_id, folded[-1].id)
+        )
+        conn.execute(
+            "UPDATE chat_sessions SET summary = ? WHERE session_id = ?",
+            (session.summary, session.session_id)
+        )
+        self._counters["compactions"] += 1
+
+    def history(self, session_id: str) -> Dict[str, Any]:
+        """
+        Stored conversation for a session
+
+        Returns:
+            Dict with session_id, summary, messages (role, content, timestamp) and tokens;
+            an unknown session has no messages
+
+        Raises:
+            ValueError: If the session ID is invalid
+        """
+        validate_session_id(session_id)
+        with self._lock:
+            session = self._session(session_id)
+            if session is None:
+                return {"session_id": session_id, "summary": "", "messages": [], "tokens": 0}
+            messages = list(session.messages)
+            summary = session.summary
+            tokens = session.tokens
+
+        return {
+            "session_id": session_id,
+            "summary": summary,
+            "messages": [
+                {"role": m.role, "content": m.content, "timestamp": m.created_at} for m in messages
+            ],
+            "tokens": tokens + (estimate_tokens(summary) if summary else 0)
+        }
+
+    def context(self, session_id: str, budget: int = SESSION_CONTEXT_TOKENS) -> str:
+        """
+        Compact conversation context for an agent prompt
+
+        The summary comes first (if any), then as many of the most recent turns
+        as fit in the token budget
+
+        Args:
+            session_id: Session ID
+            budget: Token budget for the whole context
+
+        Returns:
+            Context text, or "" for a new or unknown session
+        """
+        with self._lock:
+            session = self._session(session_id)
+            if session is None:
+                return ""
+            summary = session.summary
+            messages = list(session.messages)
+
+        return format_context(messages, summary, budget)
+
+    def clear(self, session_id: str) -> bool:
+        """
+        Delete a session and its messages
+
+        Returns:
+            True if the session existed
+
+        Raises:
+            ValueError: If the session ID is invalid
+        """
+        validate_session_id(session_id)
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            with self.pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+                deleted = conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,)).rowcount
+                conn.execute("COMMIT")
+        return deleted > 0
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """
+        Delete sessions idle for longer than the TTL
+
+        Returns:
+            Number of sessions deleted
+        """
+        now = time.time() if now is None else now
+        cutoff = now - self.ttl_seconds
+        with self._lock:
+            self._last_eviction = now
+            with self.pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "DELETE FROM chat_messages WHERE session_id IN "
+                    "(SELECT session_id FROM chat_sessions WHERE updated_at < ?)",
+                    (cutoff,)
+                )
+                expired = conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (cutoff,)).rowcount
+                conn.execute("COMMIT")
+            for session_id in [sid for sid, s in self._sessions.items() if s.updated_at < cutoff]:
+                del self._sessions[session_id]
+            self._counters["expired"] += expired
+        return expired
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cached_sessions": len(self._sessions),
+                "cached_tokens": sum(s.tokens for s in self._sessions.values()),
+                **self._counters,
+            }
+
+
+def format_context(messages: Sequence[Any], summary: str = "", budget: int = SESSION_CONTEXT_TOKENS) -> str:
+    """
+    Render a summary plus the newest turns that fit in a token budget
+
+    Args:
+        messages: ChatMessage tuples or objects/dicts with role and content, oldest first
+        summary: Running summary of older turns
+        budget: Token budget for the returned text
+
+    Returns:
+        "Earlier in this conversation: ...\\nUser: ...\\nAssistant: ..." (or "")
+    """
+    lines: List[str] = []
+    remaining = budget
+    if summary:
+        header = f"Earlier in this conversation:\n{summary}"
+        remaining -= estimate_tokens(header)
+    for message in reversed(messages):
+        role = message["role"] if isinstance(message, dict) else message.role
+        content = message["content"] if isinstance(message, dict) else message.content
+        line = f"{'User' if role == 'user' else 'Assistant'}: {' '.join(content.split())}"
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            break
+        lines.append(line)
+        remaining -= cost
+    lines.reverse()
+    if summary and remaining >= 0:
+        lines.insert(0, header)
+    return "\n".join(lines)
+
+
+_CONTEXT_HEADER = "Conversation so far (for context):\n"
+_QUESTION_HEADER = "\n\nCurrent question: "
+_CONTEXT_BLOCK = re.compile(re.escape(_CONTEXT_HEADER) + ".*" + re.escape(_QUESTION_HEADER), re.DOTALL)
+
+
+def with_context(message: str, context: str) -> str:
+    """Agent input: the new question, preceded by conversation context when there is any"""
+    if not context:
+        return message
+    return f"{_CONTEXT_HEADER}{context}{_QUESTION_HEADER}{message}"
+
+
+def redact_context(text: str) -> str:
+    """Text with the conversation context of a with_context() input replaced by a placeholder"""
+    if _CONTEXT_HEADER not in text:
+        return text
+    return _CONTEXT_BLOCK.sub(lambda _: f"{_CONTEXT_HEADER}[redacted]{_QUESTION_HEADER}", text)
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import os
+    import shutil
+    import tempfile
+    import tracemalloc
+
+    print("\n" + "="*80)
+    print("CHAT SESSION STORE BENCHMARK")
+    print("="*80)
+
+    workdir = tempfile.mkdtemp()
+    try:
+        store = SessionStore(db_path=os.path.join(workdir, "sessions.db"), cache_size=100)
+        question = "Which cardiologists have open slots next week near zip code 10002?"
+        answer = ("Dr. Sarah Anderson (Cardiology) has slots on Monday at 10 AM and 3 PM. "
+                  "Dr. James Lee has Wednesday at 11 AM. Would you like me to book one of these?")
+
+        # One long conversation: the window and summary stay bounded
+        turns = 200
+        start = time.perf_counter()
+        for i in range(turns):
+            store.append("long-session", "user", f"{question} (turn {i})")
+            store.append("long-session", "assistant", answer)
+        append_us = (time.perf_counter() - start) / (2 * turns) * 1e6
+        history = store.history("long-session")
+        print(f"{2 * turns} turns appended: {append_us:.0f} µs per append")
+        print(f"Kept {len(history['messages'])} verbatim messages + summary; "
+              f"{history['tokens']} tokens (budget {SESSION_HISTORY_TOKENS} + {SESSION_SUMMARY_TOKENS})")
+        assert history["tokens"] <= SESSION_HISTORY_TOKENS + SESSION_SUMMARY_TOKENS
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            context = store.context("long-session")
+        print(f"context(): {(time.perf_counter() - start) * 1000:.1f} µs per call, "
+              f"{estimate_tokens(context)} tokens (budget {SESSION_CONTEXT_TOKENS})")
+
+        # Many sessions: memory is bounded by the LRU, not by traffic
+        tracemalloc.start()
+        for s in range(500):
+            for i in range(6):
+                store.append(f"user-{s}", "user" if i % 2 == 0 else "assistant", answer)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"500 sessions written, {store.stats()['cached_sessions']} kept in memory "
+              f"({current / 1024:.0f} KiB traced)")
+
+        # A cold session reloads from SQLite
+        fresh = SessionStore(db_path=os.path.join(workdir, "sessions.db"), cache_size=100)
+        start = time.perf_counter()
+        reloaded = fresh.history("user-7")
+        print(f"Cold reload from SQLite: {(time.perf_counter() - start) * 1000:.2f} ms, "
+              f"{len(reloaded['messages'])} messages")
+
+        print(f"Expired after TTL: {store.evict_expired(now=time.time() + SESSION_TTL_SECONDS + 1)} sessions")
+        print(store.stats())
+        print(f"\n✅ Session memory stays within {SESSION_HISTORY_TOKENS + SESSION_SUMMARY_TOKENS} tokens "
+              f"per session and {store.cache_size} sessions in memory")
+    finally:
+        shutil.rmtree(workdir)
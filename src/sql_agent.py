@@ -0,0 +1,351 @@
+"""
+SQL Agent
+Shared setup of the doctor and emergency SQL agents: table schemas embedded in the prompt and a bounded agent loop
+plus a validated direct-SQL fast path (one LLM call writes the query, one phrases the rows)
+"""
+
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain.agents import AgentExecutor, create_openai_tools_agent
+from langchain_community.agent_toolkits import SQLDatabaseToolkit
+from langchain_community.utilities import SQLDatabase
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.prompts.chat import (
+    ChatPromptTemplate,
+    HumanMessagePromptTemplate,
+    MessagesPlaceholder,
+)
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import BaseTool
+
+from src.chat_stream import NO_STREAM_TAG, count_rows
+from src.constants import (
+    SQL_AGENT_MAX_EXECUTION_SECONDS,
+    SQL_AGENT_MAX_ITERATIONS,
+    SQL_AGENT_TOP_K,
+    SQL_SCHEMA_SAMPLE_ROWS,
+)
+from src.metrics import SQL_FAST_PATH_RESULTS
+
+# Longest query result (characters) passed to the answer-writing call
+MAX_RESULT_CHARS = 6000
+
+AGENT_PREFIX = """You are an agent answering questions from a {dialect} database with the sql_db_query tool.
+The schema of every table you may query, with sample rows, is below. It is complete and current:
+do not look for other tables, go straight to writing the query.
+
+{table_info}
+
+Write syntactically correct {dialect} queries. Unless the user asks for a specific number of results,
+return at most {top_k} rows. Select only the columns needed to answer, and quote column names that contain
+spaces with double quotes. If a query fails, read the error, fix the query and run it again.
+{instructions}"""
+
+WRITE_SQL_PROMPT = """You write {dialect} queries. The schema of every table you may query, with sample rows:
+
+{table_info}
+
+Write exactly one SELECT statement that answers the user's question. Unless the user asks for a specific
+number of results, return at most {top_k} rows. Select only the columns needed to answer, and quote column
+names that contain spaces with double quotes.
+{instructions}
+Reply with the SQL only. If a single SELECT cannot answer the question, reply NONE."""
+
+ANSWER_PROMPT = """Answer the user's question using only the SQL query result below.
+Be concise and helpful. If the result is truncated, say that more matches exist."""
+
+# sqlite3 authorizer actions a read-only query needs
+_READ_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    getattr(sqlite3, "SQLITE_RECURSIVE", 33),
+}
+
+_SQL_FENCE = re.compile(r"^```(?:sql|sqlite)?\s*|\s*```$", re.IGNORECASE)
+
+
+def connect_database(db_path: str, tables: Sequence[str]) -> SQLDatabase:
+    """
+    LangChain SQLDatabase limited to `tables`
+
+    Its table info (CREATE statements plus SQL_SCHEMA_SAMPLE_ROWS sample rows per
+    table) is what the prompts embed, so the agent never has to fetch it. The
+    connection is read-only: agents change data through dedicated tools only
+    """
+    return SQLDatabase.from_uri(
+        f"sqlite:///file:{db_path}?mode=ro&uri=true",
+        include_tables=list(tables),
+        sample_rows_in_table_info=SQL_SCHEMA_SAMPLE_ROWS
+    )
+
+
+def build_sql_agent(
+    llm: Any,
+    db: SQLDatabase,
+    schema: str,
+    instructions: str = "",
+    extra_tools: Sequence[BaseTool] = ()
+) -> AgentExecutor:
+    """
+    Tool-calling SQL agent with the schema in its system prompt
+
+    Of the SQL toolkit only sql_db_query is offered: listing tables and
+    fetching schemas is unnecessary with the schema embedded, and the query
+    checker costs an extra LLM call per query
+
+    Args:
+        llm: Chat model
+        db: Database the query tool runs against
+        schema: Precomputed table info (db.get_table_info())
+        instructions: Agent-specific rules appended to the prompt
+        extra_tools: Agent-specific tools offered next to sql_db_query
+
+    Returns:
+        AgentExecutor capped at SQL_AGENT_MAX_ITERATIONS steps and
+        SQL_AGENT_MAX_EXECUTION_SECONDS seconds
+    """
+    tools = [tool for tool in SQLDatabaseToolkit(db=db, llm=llm).get_tools() if tool.name == "sql_db_query"]
+    tools += list(extra_tools)
+    prompt = ChatPromptTemplate.from_messages([
+        # A literal message: sample rows may contain braces
+        SystemMessage(content=AGENT_PREFIX.format(
+            dialect=db.dialect, table_info=schema, top_k=SQL_AGENT_TOP_K, instructions=instructions
+        )),
+        HumanMessagePromptTemplate.from_template("{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad")
+    ])
+    return AgentExecutor(
+        agent=create_openai_tools_agent(llm, tools, prompt),
+        tools=tools,
+        verbose=False,
+        max_iterations=SQL_AGENT_MAX_ITERATIONS,
+        max_execution_time=SQL_AGENT_MAX_EXECUTION_SECONDS
+    )
+
+
+def extract_sql(text: str) -> Optional[str]:
+    """SQL statement from a model reply (code fences and trailing ';' removed), or None for NONE / empty"""
+    sql = _SQL_FENCE.sub("", (text or "").strip()).strip().rstrip(";").strip()
+    if not sql or sql.upper() == "NONE":
+        return None
+    return sql
+
+
+def _authorize(action: int, arg1: Optional[str], arg2: Optional[str], *_: Any) -> int:
+    if action not in _READ_ACTIONS:
+        return sqlite3.SQLITE_DENY
+    if action == sqlite3.SQLITE_FUNCTION and (arg2 or "").lower() == "load_extension":
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+def validate_read_only(db_path: str, sql: str) -> str:
+    """
+    Check that `sql` is a single read-only statement valid against the database
+
+    The statement is only compiled (EXPLAIN), on a read-only connection with an
+    authorizer that rejects anything but reads, so nothing is executed
+
+    Args:
+        db_path: SQLite database file
+        sql: Candidate statement
+
+    Returns:
+        The statement, unchanged
+
+    Raises:
+        ValueError: If it is not a single SELECT, writes, or references unknown tables/columns
+    """
+    if not re.match(r"^\s*(SELECT|WITH)\b", sql, re.IGNORECASE):
+        raise ValueError("Only SELECT statements are allowed")
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        conn.set_authorizer(_authorize)
+        conn.execute(f"EXPLAIN {sql}")
+    except (sqlite3.DatabaseError, sqlite3.ProgrammingError, sqlite3.Warning) as e:
+        raise ValueError(f"Invalid query: {e}") from e
+    finally:
+        conn.close()
+    return sql
+
+
+class SQLFastPath:
+    """
+    Answers a read-only question with two LLM calls instead of an agent loop
+
+    Features:
+    - Call 1 writes one SELECT from the embedded schema (not streamed to the user)
+    - The query is validated read-only and compiled against the database, then
+      run through the agent's own sql_db_query tool, so metrics and traces
+      record it like any agent step
+    - Call 2 phrases the rows as the answer (streamed)
+    - Falls back to the (budgeted) agent when no single query fits, validation
+      or execution fails, or the query matches nothing (a LIKE pattern that
+      missed is better retried by the agent than reported as "none found")
+    - Exposed as `runnable`: invoke / ainvoke / astream_events({"input": question}),
+      like the AgentExecutor it stands in for
+    """
+
+    def __init__(self, agent: str, llm: Any, db: SQLDatabase, db_path: str, schema: str,
+                 agent_executor: Any, instructions: str = ""):
+        """
+        Args:
+            agent: Metric label ('doctor', 'emergency')
+            llm: Chat model
+            db: Database the query tool runs against
+            db_path: SQLite file (for validation on a read-only connection)
+            schema: Precomputed table info
+            agent_executor: Fallback for questions the fast path cannot answer
+            instructions: Agent-specific query rules for the SQL-writing prompt
+        """
+        self.agent = agent
+        self.llm = llm
+        self.db_path = db_path
+        self.agent_executor = agent_executor
+        self.query_tool = next(
+            tool for tool in SQLDatabaseToolkit(db=db, llm=llm).get_tools() if tool.name == "sql_db_query"
+        )
+        self.write_sql_prompt = WRITE_SQL_PROMPT.format(
+            dialect=db.dialect, table_info=schema, top_k=SQL_AGENT_TOP_K, instructions=instructions
+        )
+        # The SQL text is an intermediate step, not part of the answer
+        self.sql_writer = llm.with_config(tags=[NO_STREAM_TAG], run_name="write_sql")
+        self.runnable = RunnableLambda(self._run, afunc=self._arun).with_config(run_name="SQLFastPath")
+
+    def _write_sql_messages(self, question: str) -> List[Any]:
+        return [SystemMessage(content=self.write_sql_prompt), HumanMessage(content=question)]
+
+    def _answer_messages(self, question: str, sql: str, result: str) -> List[Any]:
+        if len(result) > MAX_RESULT_CHARS:
+            result = result[:MAX_RESULT_CHARS] + " ... (truncated)"
+        return [
+            SystemMessage(content=ANSWER_PROMPT),
+            HumanMessage(content=f"Question: {question}\n\nSQL: {sql}\n\nResult: {result}")
+        ]
+
+    def _checked(self, reply: Any) -> Optional[str]:
+        """Validated SQL from the SQL-writing reply, or None (outcome recorded) to fall back"""
+        sql = extract_sql(getattr(reply, "content", reply))
+        if sql is None:
+            SQL_FAST_PATH_RESULTS.inc(agent=self.agent, outcome="no_sql")
+            return None
+        try:
+            return validate_read_only(self.db_path, sql)
+        except ValueError:
+            SQL_FAST_PATH_RESULTS.inc(agent=self.agent, outcome="invalid")
+            return None
+
+    def _usable(self, result: Any) -> bool:
+        """Whether a query tool result can be answered from (outcome recorded if not)"""
+        text = str(result)
+        if text.startswith("Error"):
+            SQL_FAST_PATH_RESULTS.inc(agent=self.agent, outcome="error")
+            return False
+        if count_rows(text) == 0:
+            SQL_FAST_PATH_RESULTS.inc(agent=self.agent, outcome="empty")
+            return False
+        return True
+
+    def _run(self, payload: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+        question = payload["input"]
+        sql = self._checked(self.sql_writer.invoke(self._write_sql_messages(question), config=config))
+        if sql is not None:
+            result = self.query_tool.invoke({"query": sql}, config=config)
+            if self._usable(result):
+                answer = self.llm.invoke(self._answer_messages(question, sql, str(result)), config=config)
+                SQL_FAST_PATH_RESULTS.inc(agent=self.agent, outcome="answered")
+                return {"input": question, "output": answer.content, "sql": sql}
+        return self.agent_executor.invoke({"input": question}, config=config)
+
+    async def _arun(self, payload: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+        question = payload["input"]
+        reply = await self.sql_writer.ainvoke(self._write_sql_messages(question), config=config)
+        sql = self._checked(reply)
+        if sql is not None:
+            result = await self.query_tool.ainvoke({"query": sql}, config=config)
+            if self._usable(result):
+                answer = await self.llm.ainvoke(self._answer_messages(question, sql, str(result)), config=config)
+                SQL_FAST_PATH_RESULTS.inc(agent=self.agent, outcome="answered")
+                return {"input": question, "output": answer.content, "sql": sql}
+        return await self.agent_executor.ainvoke({"input": question}, config=config)
+
+
+# Benchmark: schema precompute, validation cost and LLM calls per answered question
+if __name__ == "__main__":
+    import os
+    import shutil
+    import tempfile
+    import time
+
+    from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+    from langchain_core.messages import AIMessage
+
+    from src.agent_callbacks import MetricsCallbackHandler
+    from src.ingestion import DOCTORS_TABLE, SLOTS_TABLE, ingest_doctor_data
+    from src.metrics import LLM_ROUND_TRIPS, track_agent_query
+
+    class ScriptedModel(FakeMessagesListChatModel):
+        """Replays canned replies; tool binding is a no-op"""
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+    print("\n" + "="*80)
+    print("SQL AGENT FAST PATH")
+    print("="*80)
+
+    workdir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(workdir, "appointments.db")
+        ingest_doctor_data("data/doctors_info_data.csv", "data/doctors_slots_data.csv", db_path)
+
+        start = time.perf_counter()
+        db = connect_database(db_path, [DOCTORS_TABLE.name, SLOTS_TABLE.name])
+        schema = db.get_table_info()
+        schema_ms = (time.perf_counter() - start) * 1000
+
+        sql = ("SELECT d.name, s.datetime FROM doctors d JOIN slots s ON s.doctor_id = d.id "
+               "WHERE lower(d.specialization) LIKE '%cardio%' AND s.is_available = 1 LIMIT 20")
+        runs = 500
+        start = time.perf_counter()
+        for _ in range(runs):
+            validate_read_only(db_path, sql)
+        validate_us = (time.perf_counter() - start) / runs * 1e6
+        for unsafe in ("UPDATE slots SET is_available = 0", "SELECT 1; DELETE FROM slots",
+                       "WITH x AS (SELECT 1) DELETE FROM slots", "SELECT missing FROM doctors"):
+            try:
+                validate_read_only(db_path, unsafe)
+                raise AssertionError(f"accepted: {unsafe}")
+            except ValueError:
+                pass
+
+        def answer(agent: str, replies: List[Any], question: str) -> float:
+            llm = ScriptedModel(responses=replies)
+            executor = build_sql_agent(llm, db, schema)
+            fast_path = SQLFastPath(agent, llm, db, db_path, schema, executor)
+            with track_agent_query(agent):
+                fast_path.runnable.invoke({"input": question}, config={"callbacks": [MetricsCallbackHandler(agent)]})
+            _, calls, count = LLM_ROUND_TRIPS.snapshot(agent=agent)
+            return calls / count
+
+        fast_calls = answer("bench_fast", [AIMessage(content=f"```sql\n{sql};\n```"),
+                                           AIMessage(content="Dr. Anderson has slots at 8:00 and 8:30.")],
+                            "Which cardiologists have free slots?")
+        retry_sql = "SELECT name FROM doctors WHERE lower(name) LIKE '%anderson%'"
+        fallback_calls = answer("bench_fallback", [
+            AIMessage(content="SELECT name FROM doctors WHERE name = 'anderson'"),
+            AIMessage(content="", tool_calls=[{"name": "sql_db_query", "args": {"query": retry_sql}, "id": "call_1"}]),
+            AIMessage(content="Dr. Sarah Anderson is a cardiologist."),
+        ], "Tell me about Dr. Anderson")
+
+        print(f"schema + sample rows computed once: {schema_ms:.1f} ms ({len(schema)} chars in the prompt)")
+        print(f"read-only validation: {validate_us:.0f} µs per query (write / multi-statement / unknown column rejected)")
+        print(f"LLM calls, fast path answered: {fast_calls:.0f}")
+        print(f"LLM calls, fast path missed -> agent with embedded schema: {fallback_calls:.0f}")
+        print("previously: list tables -> fetch schema -> check query (LLM) -> run query -> answer = 4-6 calls")
+        print("\n✅ Read-only questions take 2 LLM calls; the bounded agent loop is the fallback")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,444 @@
+"""
+Text Index
+In-memory inverted index with BM25 ranking, prefix expansion and typo tolerance
+Built for search-as-you-type over short multi-field records (hospital names, cities)
+"""
+
+import bisect
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Score multipliers for non-exact term matches
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHTS = {1: 0.6, 2: 0.4}
+
+# Cap on vocabulary terms a single prefix can expand to (most frequent kept);
+# one- and two-letter prefixes get the smaller cap
+MAX_PREFIX_EXPANSIONS = 64
+MAX_SHORT_PREFIX_EXPANSIONS = 16
+
+# Query-token expansions remembered per index (typeahead re-expands earlier words on every keystroke)
+EXPANSION_CACHE_SIZE = 4096
+
+# A prefix token is matched by scanning candidates' own terms (no expansion cap) below this many candidates
+FORWARD_SCAN_CANDIDATES = 512
+
+# Results of one- and two-letter queries (the first keystrokes, and the most expensive) are kept
+SHORT_QUERY_LENGTH = 2
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens ("St. Mary's" -> ["st", "mary", "s"])"""
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(str(text).lower())
+
+
+def trigrams(term: str) -> List[str]:
+    """Padded character trigrams of a term ("mary" -> ["$ma", "mar", "ary", "ry$"])"""
+    padded = f"${term}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions)
+
+    Returns limit + 1 as soon as the distance is known to exceed `limit`
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def max_typos(term: str) -> int:
+    """Edits tolerated for a query token of this length"""
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+class TextIndex:
+    """
+    Multi-field inverted index
+
+    Features:
+    - Per-field postings with BM25 impacts precomputed at build time, so a
+      query only sums dictionary entries
+    - Field weights (e.g. name matches outrank address matches)
+    - Prefix expansion through a sorted vocabulary (typeahead on the last token)
+    - Typo tolerance via a trigram index over the vocabulary plus bounded
+      edit distance
+    - AND semantics across query tokens (rarest first, later tokens scored only
+      against surviving candidates), falling back to OR if nothing matches all
+    """
+
+    def __init__(
+        self,
+        documents: Iterable[Tuple[int, Dict[str, Optional[str]]]],
+        field_weights: Dict[str, float],
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        """
+        Build the index
+
+        Args:
+            documents: (document ID, {field: text}) pairs
+            field_weights: Indexed fields and their score multipliers
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+        """
+        self.field_weights = dict(field_weights)
+        self.document_count = 0
+
+        term_counts: Dict[str, Dict[str, Dict[int, int]]] = {f: defaultdict(dict) for f in field_weights}
+        lengths: Dict[str, Dict[int, int]] = {f: {} for f in field_weights}
+
+        for doc_id, fields in documents:
+            self.document_count += 1
+            for field in field_weights:
+                tokens = tokenize(fields.get(field))
+                lengths[field][doc_id] = len(tokens)
+                for term, count in Counter(tokens).items():
+                    term_counts[field][term][doc_id] = count
+
+        # impacts[field][term][doc] = field weight * BM25 contribution
+        self._impacts: Dict[str, Dict[str, Dict[int, float]]] = {}
+        for field, weight in field_weights.items():
+            field_lengths = lengths[field]
+            average_length = (sum(field_lengths.values()) / len(field_lengths)) if field_lengths else 0.0
+            impacts = {}
+            for term, postings in term_counts[field].items():
+                idf = math.log(1 + (self.document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                impacts[term] = {
+                    doc_id: weight * idf * tf * (k1 + 1)
+                    / (tf + k1 * (1 - b + b * field_lengths[doc_id] / (average_length or 1)))
+                    for doc_id, tf in postings.items()
+                }
+            self._impacts[field] = impacts
+
+        self._document_frequency: Dict[str, int] = Counter()
+        for impacts in self._impacts.values():
+            for term, postings in impacts.items():
+                self._document_frequency[term] = max(self._document_frequency[term], len(postings))
+
+        self._vocabulary = sorted(self._document_frequency)
+
+        # Trigram -> terms, bucketed by term length so typo lookups skip terms too long or short
+        self._trigrams: Dict[Tuple[str, int], List[str]] = defaultdict(list)
+        for term in self._vocabulary:
+            for gram in set(trigrams(term)):
+                self._trigrams[(gram, len(term))].append(term)
+
+        # Merged postings across every field, used when a query does not restrict fields
+        self._all_fields = tuple(field_weights)
+        self._merged = self._merge_fields(self._all_fields)
+        self._field_postings: Dict[Tuple[str, ...], Dict[str, Dict[int, float]]] = {self._all_fields: self._merged}
+
+        # Forward index (document -> term -> merged impact) for scoring the last token
+        # against a small candidate set
+        self._forward: Dict[int, Dict[str, float]] = defaultdict(dict)
+        for term, postings in self._merged.items():
+            for doc_id, score in postings.items():
+                self._forward[doc_id][term] = score
+
+        self._expansion_cache: Dict[Tuple[str, bool, bool], Dict[str, float]] = {}
+        self._short_query_cache: Dict[Tuple, List[Tuple[int, float]]] = {}
+
+    def _merge_fields(self, fields: Sequence[str]) -> Dict[str, Dict[int, float]]:
+        merged: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for field in fields:
+            for term, postings in self._impacts[field].items():
+                target = merged[term]
+                for doc_id, score in postings.items():
+                    target[doc_id] = target.get(doc_id, 0.0) + score
+        return dict(merged)
+
+    def __len__(self) -> int:
+        return self.document_count
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._vocabulary)
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "￿", lo=start)
+        terms = self._vocabulary[start:end]
+        cap = MAX_PREFIX_EXPANSIONS if len(prefix) > 2 else MAX_SHORT_PREFIX_EXPANSIONS
+        if len(terms) > cap:
+            terms = heapq.nlargest(cap, terms, key=self._document_frequency.__getitem__)
+        return terms
+
+    @staticmethod
+    def _prefix_weight(prefix: str, term: str) -> float:
+        """Completions close to what was typed score higher ("mary" -> "marys" over "maryville")"""
+        return PREFIX_WEIGHT * math.sqrt(len(prefix) / len(term))
+
+    def _fuzzy_terms(self, token: str) -> List[Tuple[str, int]]:
+        limit = max_typos(token)
+        if not limit:
+            return []
+
+        grams = set(trigrams(token))
+        shared = Counter()
+        for length in range(len(token) - limit, len(token) + limit + 1):
+            for gram in grams:
+                shared.update(self._trigrams.get((gram, length), ()))
+
+        # An edit destroys at most 3 trigrams (4 for a transposition)
+        needed = max(1, len(grams) - 4 * limit)
+        matches = []
+        for term, count in shared.items():
+            if count < needed or term == token:
+                continue
+            distance = edit_distance(token, term, limit)
+            if distance <= limit:
+                matches.append((term, distance))
+        return matches
+
+    def expand(self, token: str, prefix: bool = False, fuzzy: bool = True) -> Dict[str, float]:
+        """
+        Vocabulary terms a query token matches and their score multipliers
+
+        Args:
+            token: Normalized query token
+            prefix: Also match terms starting with the token
+            fuzzy: Also match terms within a small edit distance
+
+        Returns:
+            Dict of term -> multiplier (1.0 exact, lower for prefix and typo matches)
+        """
+        key = (token, prefix, fuzzy)
+        cached = self._expansion_cache.get(key)
+        if cached is not None:
+            return cached
+
+        expansions: Dict[str, float] = {}
+        if token in self._document_frequency:
+            expansions[token] = 1.0
+
+        if prefix:
+            for term in self._prefix_terms(token):
+                expansions.setdefault(term, self._prefix_weight(token, term))
+
+        if fuzzy and not expansions:
+            for term, distance in self._fuzzy_terms(token):
+                expansions[term] = max(expansions.get(term, 0.0), FUZZY_WEIGHTS[distance])
+            if prefix and not expansions and len(token) >= 5:
+                # Typo before the end of a half-typed word: fuzzy-match the typed stem
+                for stem, distance in self._fuzzy_terms(token[:-1]):
+                    for term in self._prefix_terms(stem):
+                        expansions.setdefault(term, FUZZY_WEIGHTS[distance] * self._prefix_weight(stem, term))
+
+        if len(self._expansion_cache) >= EXPANSION_CACHE_SIZE:
+            self._expansion_cache.clear()
+        self._expansion_cache[key] = expansions
+        return expansions
+
+    def _score_token(
+        self,
+        postings: Dict[str, Dict[int, float]],
+        expansions: Dict[str, float],
+        candidates: Optional[Dict[int, float]] = None
+    ) -> Dict[int, float]:
+        """
+        Best expansion score per document for one query token
+
+        With a candidate set, walks whichever is smaller: the expansions' posting
+        lists, or the candidates' forward entries
+        """
+        if candidates is not None and postings is self._merged:
+            posting_total = sum(len(postings.get(term, ())) for term in expansions)
+            if len(candidates) * len(expansions) < posting_total:
+                scores: Dict[int, float] = {}
+                for doc_id in candidates:
+                    terms = self._forward[doc_id]
+                    best = 0.0
+                    for term, multiplier in expansions.items():
+                        impact = terms.get(term)
+                        if impact is not None and impact * multiplier > best:
+                            best = impact * multiplier
+                    if best:
+                        scores[doc_id] = best
+                return scores
+
+        scores = {}
+        for term, multiplier in expansions.items():
+            for doc_id, impact in postings.get(term, {}).items():
+                score = impact * multiplier
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
+
+    def _score_prefix_in_candidates(
+        self,
+        token: str,
+        expansions: Dict[str, float],
+        candidates: Dict[int, float]
+    ) -> Dict[int, float]:
+        """Score a half-typed token against every term of each candidate, so no completion is capped away"""
+        scores: Dict[int, float] = {}
+        for doc_id in candidates:
+            best = 0.0
+            for term, impact in self._forward[doc_id].items():
+                if term.startswith(token):
+                    multiplier = 1.0 if term == token else self._prefix_weight(token, term)
+                else:
+                    multiplier = expansions.get(term)
+                    if multiplier is None:
+                        continue
+                if impact * multiplier > best:
+                    best = impact * multiplier
+            if best:
+                scores[doc_id] = best
+        return scores
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = 10,
+        prefix: bool = True,
+        fuzzy: bool = True,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank documents for a free-text query
+
+        Args:
+            query: Query text; the last token is treated as a prefix (typeahead)
+            limit: Maximum number of results, or None for every match
+            prefix: Expand the last query token as a prefix
+            fuzzy: Tolerate typos in query tokens
+            fields: Restrict matching to these fields (default: all indexed fields)
+
+        Returns:
+            (document ID, score) pairs, best first
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        cache_key = None
+        if len(tokens) == 1 and len(tokens[0]) <= SHORT_QUERY_LENGTH:
+            cache_key = (tokens[0], limit, prefix, fuzzy, tuple(fields or ()))
+            cached = self._short_query_cache.get(cache_key)
+            if cached is not None:
+                return list(cached)
+
+        field_key = tuple(fields) if fields else self._all_fields
+        postings = self._field_postings.get(field_key)
+        if postings is None:
+            postings = self._field_postings.setdefault(field_key, self._merge_fields(field_key))
+        expansions = [
+            self.expand(token, prefix=prefix and position == len(tokens) - 1, fuzzy=fuzzy)
+            for position, token in enumerate(tokens)
+        ]
+
+        # AND: start from the token with the shortest postings and narrow from there
+        order = sorted(
+            range(len(tokens)),
+            key=lambda i: sum(len(postings.get(term, ())) for term in expansions[i])
+        )
+        combined: Optional[Dict[int, float]] = None
+        last = len(tokens) - 1
+        for i in order:
+            if (
+                i == last and prefix and combined is not None
+                and postings is self._merged and len(combined) <= FORWARD_SCAN_CANDIDATES
+            ):
+                scores = self._score_prefix_in_candidates(tokens[i], expansions[i], combined)
+            else:
+                scores = self._score_token(postings, expansions[i], combined)
+            combined = scores if combined is None else {
+                doc_id: total + scores[doc_id] for doc_id, total in combined.items() if doc_id in scores
+            }
+            if not combined:
+                break
+
+        if not combined and len(tokens) > 1:
+            # OR fallback: rank by whatever matched
+            combined = {}
+            for token_expansions in expansions:
+                for doc_id, score in self._score_token(postings, token_expansions).items():
+                    combined[doc_id] = combined.get(doc_id, 0.0) + score
+
+        if not combined:
+            return []
+
+        top = combined if limit is None else heapq.nlargest(limit, combined, key=combined.__getitem__)
+        results = sorted(((doc_id, combined[doc_id]) for doc_id in top), key=lambda item: (-item[1], item[0]))
+
+        if cache_key is not None:
+            if len(self._short_query_cache) >= EXPANSION_CACHE_SIZE:
+                self._short_query_cache.clear()
+            self._short_query_cache[cache_key] = results
+        return results
+
+
+# Benchmark: typeahead latency over the hospital dataset
+if __name__ == "__main__":
+    import csv
+    import time
+
+    from src.constants import HOSPITAL_INFO_FILE_PATH
+
+    print("\n" + "="*80)
+    print("TEXT INDEX BENCHMARK")
+    print("="*80)
+
+    with open(HOSPITAL_INFO_FILE_PATH, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    start = time.perf_counter()
+    index = TextIndex(
+        (
+            (i, {"name": r["Hospital Name"], "city": r["City"], "county": r["County Name"], "address": r["Address"]})
+            for i, r in enumerate(rows)
+        ),
+        field_weights={"name": 3.0, "city": 1.5, "county": 1.0, "address": 0.5},
+    )
+    print(f"Build: {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{len(index)} documents, {index.vocabulary_size} terms")
+
+    # Every keystroke of a few searches, including typos
+    searches = ["memorial hospital", "st mary", "mayo clinic", "childrens houston", "cedars sinai", "memorail", "clevland clinic"]
+    keystrokes = [s[:n] for s in searches for n in range(1, len(s) + 1)]
+
+    timings = []
+    for _ in range(20):
+        for text in keystrokes:
+            t0 = time.perf_counter()
+            index.search(text, limit=8)
+            timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    print(f"{len(timings)} typeahead queries: p50={timings[len(timings) // 2]:.3f} ms, "
+          f"p95={timings[int(len(timings) * 0.95)]:.3f} ms, max={timings[-1]:.3f} ms")
+
+    for text in searches:
+        results = index.search(text, limit=3)
+        print(f"\n{text!r}:")
+        for doc_id, score in results:
+            print(f"  {score:6.2f}  {rows[doc_id]['Hospital Name']} ({rows[doc_id]['City']}, {rows[doc_id]['State']})")
@@ -0,0 +1,196 @@
+"""
+Trace Store
+Keeps the most recent agent traces (structured LangChain chain / LLM / tool spans) in a ring buffer
+Optionally appends every finished trace to a JSONL file for offline analysis
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from src.constants import TRACE_BUFFER_SIZE, TRACE_JSONL_PATH
+
+# Trace fields returned by listings (everything except the spans)
+SUMMARY_FIELDS = (
+    "trace_id", "agent", "name", "input", "started_at", "duration_ms", "error",
+    "llm_calls", "tool_calls", "sql_queries", "prompt_tokens", "completion_tokens", "span_count"
+)
+
+
+def summarize(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """A trace without its span list"""
+    return {field: trace.get(field) for field in SUMMARY_FIELDS}
+
+
+class TraceStore:
+    """
+    Bounded in-memory store of finished agent traces
+
+    Features:
+    - Ring buffer: the oldest trace is dropped once max_traces is reached
+    - Slowest-first listing filtered by agent or minimum tool calls
+    - Optional JSONL sink (one trace per line, appended as traces finish)
+    """
+
+    def __init__(self, max_traces: int = TRACE_BUFFER_SIZE, jsonl_path: Optional[str] = TRACE_JSONL_PATH):
+        """
+        Args:
+            max_traces: Traces kept in memory
+            jsonl_path: File to append finished traces to; empty or None disables it
+        """
+        self.max_traces = max_traces
+        self.jsonl_path = jsonl_path or None
+        self._traces: deque = deque(maxlen=max_traces)
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._recorded = 0
+        self._write_errors = 0
+
+    def add(self, trace: Dict[str, Any]):
+        """
+        Store a finished trace
+
+        Args:
+            trace: Dict with at least trace_id and duration_ms (see TracingCallbackHandler)
+        """
+        line = json.dumps(trace, default=str) if self.jsonl_path else None
+        with self._lock:
+            if len(self._traces) == self._traces.maxlen:
+                self._by_id.pop(self._traces[0]["trace_id"], None)
+            self._traces.append(trace)
+            self._by_id[trace["trace_id"]] = trace
+            self._recorded += 1
+            if line is not None:
+                self._write(line)
+
+    def _write(self, line: str):
+        try:
+            if self._file is None:
+                directory = os.path.dirname(self.jsonl_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.jsonl_path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+        except OSError as e:
+            self._write_errors += 1
+            if self._write_errors == 1:
+                print(f"Warning: Could not write traces to {self.jsonl_path}: {e}")
+
+    def slowest(self, limit: int = 20, agent: Optional[str] = None, min_tool_calls: int = 0) -> List[Dict[str, Any]]:
+        """
+        Slowest recent traces, slowest first
+
+        Args:
+            limit: Maximum traces returned
+            agent: Only traces of this agent
+            min_tool_calls: Only traces with at least this many tool calls
+
+        Returns:
+            Trace summaries (no spans)
+        """
+        with self._lock:
+            traces = list(self._traces)
+        matching = [
+            trace for trace in traces
+            if (agent is None or trace.get("agent") == agent)
+            and (trace.get("tool_calls") or 0) >= min_tool_calls
+        ]
+        matching.sort(key=lambda trace: trace.get("duration_ms") or 0, reverse=True)
+        return [summarize(trace) for trace in matching[:max(0, limit)]]
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """Full trace including its spans, or None if it has been evicted"""
+        with self._lock:
+            return self._by_id.get(trace_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Buffer size, totals and average LLM / tool calls per trace"""
+        with self._lock:
+            traces = list(self._traces)
+            recorded = self._recorded
+        count = len(traces)
+        return {
+            "traces": count,
+            "max_traces": self.max_traces,
+            "recorded": recorded,
+            "jsonl_path": self.jsonl_path,
+            "write_errors": self._write_errors,
+            "avg_llm_calls": round(sum(t.get("llm_calls") or 0 for t in traces) / count, 2) if count else None,
+            "avg_tool_calls": round(sum(t.get("tool_calls") or 0 for t in traces) / count, 2) if count else None,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+            self._by_id.clear()
+
+
+_store: Optional[TraceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_trace_store() -> TraceStore:
+    """Process-wide trace store shared by every agent"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TraceStore()
+    return _store
+
+
+# Benchmark: recording cost and slowest-trace listing over a full buffer
+if __name__ == "__main__":
+    import random
+    import tempfile
+    import time
+
+    print("\n" + "="*80)
+    print("TRACE STORE BENCHMARK")
+    print("="*80)
+
+    def fake_trace(i: int) -> Dict[str, Any]:
+        tool_calls = random.choice([1, 2, 3, 5, 7])
+        spans = [{"kind": "tool", "name": "sql_db_query", "start_ms": 10.0 * s, "duration_ms": 3.5,
+                  "sql": "SELECT * FROM slots WHERE is_available = 1 LIMIT 10", "rows": 10}
+                 for s in range(tool_calls)]
+        return {"trace_id": f"t{i}", "agent": random.choice(["doctor", "emergency"]), "name": "AgentExecutor",
+                "input": "Which cardiologists are free tomorrow?", "started_at": time.time(),
+                "duration_ms": 800.0 * tool_calls + random.random() * 500, "error": None,
+                "llm_calls": tool_calls + 1, "tool_calls": tool_calls, "sql_queries": tool_calls,
+                "prompt_tokens": 900 * (tool_calls + 1), "completion_tokens": 60 * (tool_calls + 1),
+                "span_count": len(spans), "spans": spans}
+
+    traces = [fake_trace(i) for i in range(5000)]
+
+    store = TraceStore(max_traces=500, jsonl_path=None)
+    start = time.perf_counter()
+    for trace in traces:
+        store.add(trace)
+    add_us = (time.perf_counter() - start) / len(traces) * 1e6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "traces.jsonl")
+        file_store = TraceStore(max_traces=500, jsonl_path=path)
+        start = time.perf_counter()
+        for trace in traces[:1000]:
+            file_store.add(trace)
+        jsonl_us = (time.perf_counter() - start) / 1000 * 1e6
+        with open(path, encoding="utf-8") as f:
+            assert sum(1 for _ in f) == 1000
+        file_store._file.close()
+
+    start = time.perf_counter()
+    slow = store.slowest(20, min_tool_calls=5)
+    list_ms = (time.perf_counter() - start) * 1000
+
+    assert store.stats()["traces"] == 500 and store.get("t0") is None and store.get("t4999") is not None
+    assert all(t["tool_calls"] >= 5 for t in slow)
+    print(f"add(): {add_us:.1f} µs in memory, {jsonl_us:.1f} µs with the JSONL sink")
+    print(f"slowest(20, min_tool_calls=5) over 500 traces: {list_ms:.2f} ms")
+    print(f"slowest: {slow[0]['duration_ms']:.0f} ms with {slow[0]['tool_calls']} tool calls")
+    print("\n✅ Tracing costs microseconds per agent run; a full buffer is listed in well under a millisecond")
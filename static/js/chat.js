@@ -23,6 +23,19 @@ const sidebarOverlay = document.getElementById('sidebarOverlay');
 let conversationHistory = [];
 let isWaitingForResponse = false;
 
+// The server keeps the conversation; the browser only remembers which one
+const SESSION_STORAGE_KEY = 'healthsenseChatSession';
+let sessionId = localStorage.getItem(SESSION_STORAGE_KEY);
+
+function setSessionId(id) {
+    sessionId = id || null;
+    if (sessionId) {
+        localStorage.setItem(SESSION_STORAGE_KEY, sessionId);
+    } else {
+        localStorage.removeItem(SESSION_STORAGE_KEY);
+    }
+}
+
 // Initialize
 function init() {
     setupEventListeners();
@@ -35,6 +48,37 @@ function init() {
     if (query) {
         chatInput.value = query;
         sendMessage();
+    } else {
+        restoreSession();
+    }
+}
+
+// Show the stored conversation of the current session
+async function restoreSession() {
+    if (!sessionId) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`/chat/history?session_id=${encodeURIComponent(sessionId)}`);
+        if (!response.ok) {
+            throw new Error('Failed to load chat history');
+        }
+
+        const data = await response.json();
+        if (!data.history || data.history.length === 0) {
+            return;
+        }
+
+        if (welcomeMessage) {
+            welcomeMessage.style.display = 'none';
+        }
+        data.history.forEach(item => {
+            addMessage(item.content, item.role === 'user' ? 'user' : 'assistant');
+            conversationHistory.push({ role: item.role, content: item.content });
+        });
+    } catch (error) {
+        console.error('Error:', error);
     }
 }
 
@@ -158,31 +202,21 @@ async function sendMessage() {
     });
 
     try {
-        // Call backend API
-        const response = await fetch('/chat', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-                message: message,
-                history: conversationHistory
-            })
-        });
-
-        if (!response.ok) {
-            throw new Error('Failed to get response from server');
+        let assistantMessage;
+        try {
+            // Stream the answer so it renders as it is generated
+            assistantMessage = await streamReply(message);
+        } catch (streamError) {
+            if (streamError.rendered) {
+                throw streamError;
+            }
+            // Streaming unsupported or unavailable: fall back to a single response
+            console.warn('Streaming failed, retrying without it:', streamError);
+            assistantMessage = await fetchReply(message);
+            typingIndicator.classList.remove('active');
+            addMessage(assistantMessage, 'assistant');
         }
 
-        const data = await response.json();
-
-        // Hide typing indicator
-        typingIndicator.classList.remove('active');
-
-        // Add assistant response
-        const assistantMessage = data.response || data.message || 'I apologize, but I encountered an error. Please try again.';
-        addMessage(assistantMessage, 'assistant');
-
         // Update conversation history
         conversationHistory.push({
             role: 'assistant',
@@ -195,6 +229,11 @@ async function sendMessage() {
         // Hide typing indicator
         typingIndicator.classList.remove('active');
 
+        // A partially streamed answer stays as it is
+        if (error.rendered) {
+            return;
+        }
+
         // Show mock response for demo
         setTimeout(() => {
             const mockResponse = generateMockResponse(message);
@@ -212,7 +251,162 @@ async function sendMessage() {
     }
 }
 
-// Add Message to Chat
+// Request a complete reply from POST /chat
+async function fetchReply(message) {
+    const response = await fetch('/chat', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            message: message,
+            session_id: sessionId
+        })
+    });
+
+    if (!response.ok) {
+        throw new Error('Failed to get response from server');
+    }
+
+    const data = await response.json();
+    setSessionId(data.session_id);
+    return data.response || data.message || 'I apologize, but I encountered an error. Please try again.';
+}
+
+// Stream a reply from POST /chat/stream (server-sent events), rendering
+// agent steps and answer tokens as they arrive. Resolves to the final text.
+async function streamReply(message) {
+    const response = await fetch('/chat/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream',
+        },
+        body: JSON.stringify({
+            message: message,
+            session_id: sessionId
+        })
+    });
+
+    if (!response.ok || !response.body) {
+        throw new Error('Failed to open response stream');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let bubble = null;
+    let steps = null;
+    let text = '';
+    let finalText = null;
+
+    // Create the assistant message on the first step or token
+    function ensureMessage() {
+        if (!bubble) {
+            typingIndicator.classList.remove('active');
+            bubble = addMessage('', 'assistant');
+            steps = document.createElement('div');
+            steps.className = 'message-steps';
+            bubble.parentNode.insertBefore(steps, bubble);
+        }
+    }
+
+    function handleEvent(name, data) {
+        switch (name) {
+            case 'step': {
+                const line = describeStep(data);
+                if (line) {
+                    ensureMessage();
+                    const stepDiv = document.createElement('div');
+                    stepDiv.className = 'message-step';
+                    stepDiv.textContent = line;
+                    steps.appendChild(stepDiv);
+                    scrollToBottom();
+                }
+                break;
+            }
+            case 'token':
+                ensureMessage();
+                text += data.delta;
+                bubble.textContent = text;
+                scrollToBottom();
+                break;
+            case 'error':
+                console.error('Agent error:', data.message);
+                break;
+            case 'done':
+                setSessionId(data.session_id);
+                finalText = data.response || text;
+                ensureMessage();
+                bubble.textContent = finalText;
+                scrollToBottom();
+                break;
+        }
+    }
+
+    try {
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+
+            // Frames are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let name = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        name = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        data += line.slice(5).trim();
+                    }
+                });
+                if (data) {
+                    handleEvent(name, JSON.parse(data));
+                }
+            }
+        }
+    } catch (error) {
+        // Text already on screen: do not retry and render the answer twice
+        error.rendered = bubble !== null;
+        throw error;
+    }
+
+    if (finalText === null) {
+        const error = new Error('Response stream ended early');
+        error.rendered = bubble !== null;
+        throw error;
+    }
+    return finalText;
+}
+
+// Describe an intermediate agent step for display
+function describeStep(step) {
+    if (step.stage === 'tool_start') {
+        if (step.sql) {
+            return `🔎 Running SQL: ${step.sql}`;
+        }
+        return `⚙️ Using ${step.tool}`;
+    }
+    if (step.stage === 'agent_end') {
+        const seconds = (step.elapsed_ms / 1000).toFixed(1);
+        return step.status === 'ok'
+            ? `✅ ${step.tool} answered (${seconds}s)`
+            : `⚠️ ${step.tool} did not answer (${step.status}, ${seconds}s)`;
+    }
+    if (step.stage === 'tool_end' && step.rows !== undefined && step.rows !== null) {
+        return `📄 ${step.rows} row${step.rows === 1 ? '' : 's'} returned`;
+    }
+    return null;
+}
+
+// Add Message to Chat (returns the bubble so it can be updated while streaming)
 function addMessage(content, type) {
     const messageDiv = document.createElement('div');
     messageDiv.className = `message ${type}`;
@@ -241,6 +435,7 @@ function addMessage(content, type) {
     chatMessages.appendChild(messageDiv);
 
     scrollToBottom();
+    return bubble;
 }
 
 // Format Time
@@ -262,6 +457,7 @@ function scrollToBottom() {
 // Start New Chat
 function startNewChat() {
     conversationHistory = [];
+    setSessionId(null);
     chatMessages.innerHTML = '';
 
     // Re-add welcome message